@@ -0,0 +1,125 @@
+"""
+Micro-benchmark del puntaje de calidad contra la validación original.
+
+Uso (desde backend/):
+    python benchmarks/bench_calidad_contenido.py [--repeticiones 200]
+
+Antes de medir verifica que ambas implementaciones den el mismo veredicto
+en todos los textos de prueba.
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calidad_contenido import puntuar_contenido, puntuar_lote  # noqa: E402
+
+MIN_PALABRAS_CONTENIDO_VALIDO = 30
+
+
+def validar_contenido_noticia_original(texto, titulo):
+    """Copia de la versión anterior de `validar_contenido_noticia` (sin prints)."""
+    if not texto or len(texto.split()) < MIN_PALABRAS_CONTENIDO_VALIDO:
+        return False
+
+    patrones_no_deseados = [
+        r'<!DOCTYPE', r'<html', r'<head>', r'<body>',
+        r'function\s*\(', r'classList\.', r'addEventListener',
+        r'@media', r'font-family', r'background-color',
+        r'window\.', r'document\.', r'\.getElementById',
+        r'\.querySelector', r'\.addClass', r'\.removeClass'
+    ]
+
+    for patron in patrones_no_deseados:
+        matches = re.findall(patron, texto, re.IGNORECASE)
+        if len(matches) > 2:
+            return False
+
+    palabras_clave_noticia = [
+        'anunció', 'confirmó', 'informó', 'declaró', 'según', 'fuentes',
+        'investigación', 'estudio', 'datos', 'informe', 'autoridades',
+        'gobierno', 'empresa', 'mercado', 'economía', 'política',
+        'afirmó', 'señaló', 'explicó', 'indicó', 'manifestó',
+        'expresó', 'reveló', 'destacó', 'comentó', 'mencionó',
+        'país', 'ciudad', 'presidente', 'ministro', 'director',
+        'año', 'mes', 'día', 'semana', 'horas', 'minutos'
+    ]
+
+    palabras_encontradas = sum(1 for palabra in palabras_clave_noticia if palabra in texto.lower())
+    tiene_suficientes_palabras_clave = palabras_encontradas >= 1
+
+    es_texto_legible = (
+        len(re.findall(r'[.!?]', texto)) > 2 or
+        len(re.findall(r'\b[a-zA-Záéíóúñ]{4,}\b', texto)) > 20
+    )
+
+    return tiene_suficientes_palabras_clave and es_texto_legible
+
+
+_VOCABULARIO = (
+    "el la los las de del en por para con según fuentes gobierno presidente "
+    "anunció mercado economía datos informe ciudad país semana horas lunes "
+    "martes empresa trabajadores proyecto reunión acuerdo sector inversión "
+    "crecimiento inflación tasa banco central medidas".split()
+)
+_CODIGO = (
+    "document.getElementById('menu').classList.add('open'); "
+    "window.addEventListener('load', function() {}); "
+    "@media (max-width: 600px) { body { font-family: Arial; background-color: #fff } } "
+)
+
+
+def generar_textos(cantidad, semilla=7):
+    generador = random.Random(semilla)
+    textos = []
+    for i in range(cantidad):
+        palabras = [generador.choice(_VOCABULARIO) for _ in range(generador.randint(10, 600))]
+        texto = " ".join(palabras)
+        if i % 3 == 0:
+            texto = texto.replace(" de ", ". De ")
+        if i % 5 == 0:
+            texto += " " + _CODIGO * generador.randint(1, 4)
+        if i % 7 == 0:
+            texto = " ".join(p for p in texto.split() if len(p) < 4 or p == "datos")
+        textos.append(texto)
+    return textos + ["", "corto", "<!DOCTYPE html>" * 40, "mesa " * 50]
+
+
+def medir(funcion, textos, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(textos)
+    return (time.perf_counter() - inicio) / (repeticiones * len(textos)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--textos", type=int, default=300)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    textos = generar_textos(args.textos)
+
+    diferencias = [
+        i for i, texto in enumerate(textos)
+        if validar_contenido_noticia_original(texto, "") != puntuar_contenido(texto).es_valido
+    ]
+    if diferencias:
+        print(f"❌ Veredictos distintos en {len(diferencias)} textos: {diferencias[:10]}")
+        sys.exit(1)
+    validos = sum(1 for texto in textos if puntuar_contenido(texto).es_valido)
+    print(f"✅ Paridad OK en {len(textos)} textos ({validos} válidos)")
+
+    original = medir(lambda lote: [validar_contenido_noticia_original(t, "") for t in lote],
+                     textos, args.repeticiones)
+    nuevo = medir(puntuar_lote, textos, args.repeticiones)
+    print(f"Original: {original:8.1f} µs/texto")
+    print(f"Nuevo:    {nuevo:8.1f} µs/texto  ({original / nuevo:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark offline de `scrapear_texto_robusto` sobre páginas HTML guardadas.
+
+Uso (desde backend/):
+    python benchmarks/bench_extraccion.py [--repeticiones 5] [--hilos 1]
+    python benchmarks/bench_extraccion.py --regenerar
+
+Las páginas de `fixtures/html/` se sirven con un http.server local, así que
+la cadena completa (descarga, trafilatura, selectores, párrafos, regex y
+descripción de respaldo) corre igual que en el crawler pero sin red. Reporta
+páginas por segundo, latencia de cada extractor, memoria pico y, por página,
+las palabras extraídas y la similitud contra la salida de referencia guardada
+en `fixtures/golden.json`. `--regenerar` reescribe esa referencia con la
+salida actual (hacerlo solo después de revisar que el cambio es deseado).
+"""
+import os
+import io
+import sys
+import json
+import time
+import logging
+import resource
+import argparse
+import threading
+import tracemalloc
+import contextlib
+import http.server
+from concurrent.futures import ThreadPoolExecutor
+
+DIRECTORIO_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, DIRECTORIO_BACKEND)
+
+# El crawler exige estas variables al importarse; el benchmark no llama a
+# GNews, Gemini ni Supabase, así que alcanzan valores ficticios. También se
+# apagan los cachés y estados persistentes para medir siempre la cadena entera.
+for variable, valor in {
+    "GNEWS_API_KEY": "benchmark", "GEMINI_API_KEY": "benchmark",
+    "SUPABASE_URL": "http://127.0.0.1:9", "SUPABASE_KEY": "benchmark",
+    "CRAWLER_CACHE_PAGINAS": "false", "CRAWLER_PERFILES_EXTRACTORES": "false",
+    "CRAWLER_CIRCUIT_BREAKER": "false", "SCRAPING_INTERVALO_DOMINIO": "0",
+    "SCRAPING_MAX_POR_DOMINIO": "64",
+}.items():
+    os.environ.setdefault(variable, valor)
+# db.py intenta conectarse al importarse: sus errores no interesan acá
+logging.disable(logging.CRITICAL)
+
+import procesar_y_guardar_db as crawler  # noqa: E402
+from extractores import (  # noqa: E402
+    crear_documento, extraer_con_trafilatura, extraer_con_selectores,
+    extraer_parrafos, extraer_con_regex
+)
+from metricas_crawl import percentil  # noqa: E402
+
+UMBRAL_SIMILITUD = 0.9  # Por debajo se marca la página como regresión de calidad
+
+EXTRACTORES = {
+    "trafilatura": lambda html: extraer_con_trafilatura(html),
+    "selectores": lambda html: extraer_con_selectores(crear_documento(html))[0],
+    "parrafos": lambda html: extraer_parrafos(crear_documento(html)),
+    "regex": lambda html: extraer_con_regex(html.decode("utf-8", errors="replace")),
+}
+
+
+class _ManejadorSilencioso(http.server.SimpleHTTPRequestHandler):
+    # Como la mayoría de los medios, se declara el charset en la cabecera
+    extensions_map = {**http.server.SimpleHTTPRequestHandler.extensions_map,
+                      ".html": "text/html; charset=utf-8"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=os.path.join(DIRECTORIO_FIXTURES, "html"), **kwargs)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def servidor_local():
+    """Sirve las fixtures en un puerto libre de 127.0.0.1 mientras dura el bloque."""
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorSilencioso)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def cargar_fixtures():
+    with open(os.path.join(DIRECTORIO_FIXTURES, "manifiesto.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def similitud(texto, referencia):
+    """Jaccard entre los conjuntos de palabras (1.0 si ambos están vacíos)."""
+    a, b = set((texto or "").lower().split()), set((referencia or "").lower().split())
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def medir_cadena(base, fixtures, repeticiones, hilos):
+    """Corre la cadena completa sobre todas las páginas. Devuelve (salidas, segundos, latencias)."""
+    trabajos = [(nombre, f"{base}/{nombre}", datos["descripcion"]) for nombre, datos in fixtures.items()]
+    salidas, latencias = {}, []
+
+    def correr(trabajo):
+        nombre, url, descripcion = trabajo
+        inicio = time.perf_counter()
+        texto = crawler.scrapear_texto_robusto(url, descripcion)
+        return nombre, texto, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for _ in range(repeticiones):
+            for nombre, texto, segundos in executor.map(correr, trabajos):
+                salidas[nombre] = texto
+                latencias.append(segundos)
+    return salidas, time.perf_counter() - inicio, sorted(latencias)
+
+
+def medir_extractores(fixtures, repeticiones):
+    """Latencia y palabras de cada extractor por separado sobre cada página."""
+    resultados = {metodo: {"latencias": [], "exitos": 0, "intentos": 0} for metodo in EXTRACTORES}
+    for nombre in fixtures:
+        with open(os.path.join(DIRECTORIO_FIXTURES, "html", nombre), "rb") as f:
+            html = f.read()
+        for metodo, extractor in EXTRACTORES.items():
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                texto = extractor(html)
+                resultados[metodo]["latencias"].append(time.perf_counter() - inicio)
+            resultados[metodo]["intentos"] += 1
+            resultados[metodo]["exitos"] += bool(texto)
+    return resultados
+
+
+def memoria_pico(base, fixtures):
+    """Memoria pico (MB, según tracemalloc) de una pasada secuencial por las páginas."""
+    tracemalloc.start()
+    try:
+        for nombre, datos in fixtures.items():
+            crawler.scrapear_texto_robusto(f"{base}/{nombre}", datos["descripcion"])
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--hilos", type=int, default=1)
+    parser.add_argument("--regenerar", action="store_true",
+                        help="Reescribe fixtures/golden.json con la salida actual")
+    args = parser.parse_args()
+
+    fixtures = cargar_fixtures()
+    ruta_golden = os.path.join(DIRECTORIO_FIXTURES, "golden.json")
+
+    # La cadena imprime una línea por intento: se descarta para no medir la consola.
+    # Se redirige una sola vez porque redirect_stdout no es seguro entre hilos.
+    with servidor_local() as base, contextlib.redirect_stdout(io.StringIO()):
+        # Pasada de calentamiento: imports perezosos de trafilatura, conexiones, etc.
+        salidas, _, _ = medir_cadena(base, fixtures, 1, 1)
+        if not args.regenerar:
+            salidas, segundos, latencias = medir_cadena(base, fixtures, args.repeticiones, args.hilos)
+            pico_mb = memoria_pico(base, fixtures)
+
+    if args.regenerar:
+        golden = {
+            nombre: {"palabras": len(texto.split()) if texto else 0, "texto": texto}
+            for nombre, texto in salidas.items()
+        }
+        with open(ruta_golden, "w", encoding="utf-8") as f:
+            json.dump(golden, f, ensure_ascii=False, indent=2)
+        print(f"💾 Referencia regenerada para {len(golden)} páginas en {ruta_golden}")
+        return
+
+    paginas = len(fixtures) * args.repeticiones
+    print(f"📄 {len(fixtures)} páginas x {args.repeticiones} repeticiones, {args.hilos} hilo(s)")
+    print(f"⚡ {paginas / segundos:.1f} páginas/s  "
+          f"(p50 {percentil(latencias, 50) * 1000:.1f} ms, p95 {percentil(latencias, 95) * 1000:.1f} ms por página)")
+    # tracemalloc solo ve memoria de Python; el RSS máximo incluye lxml y los buffers en C
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"🧠 Memoria pico: {pico_mb:.1f} MB en objetos Python, RSS máximo del proceso {rss_mb:.0f} MB")
+
+    print("\nExtractor       p50 ms   p95 ms   con texto")
+    for metodo, datos in medir_extractores(fixtures, args.repeticiones).items():
+        ordenadas = sorted(datos["latencias"])
+        print(f"{metodo:<14} {percentil(ordenadas, 50) * 1000:7.2f}  {percentil(ordenadas, 95) * 1000:7.2f}"
+              f"   {datos['exitos']}/{datos['intentos']}")
+
+    try:
+        with open(ruta_golden, "r", encoding="utf-8") as f:
+            golden = json.load(f)
+    except FileNotFoundError:
+        print("\n⚠️ No hay referencia: correr con --regenerar para crearla")
+        return
+
+    print("\nPágina                          palabras   ref   similitud")
+    regresiones = []
+    for nombre, texto in salidas.items():
+        referencia = golden.get(nombre, {})
+        palabras = len(texto.split()) if texto else 0
+        valor = similitud(texto, referencia.get("texto"))
+        marca = "✅" if valor >= UMBRAL_SIMILITUD else "❌"
+        if valor < UMBRAL_SIMILITUD:
+            regresiones.append(nombre)
+        print(f"{marca} {nombre:<30} {palabras:6d}  {referencia.get('palabras', 0):5d}   {valor:.3f}")
+
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} páginas por debajo de {UMBRAL_SIMILITUD} de similitud: {', '.join(regresiones)}")
+        sys.exit(1)
+    print(f"\n✅ Calidad igual a la referencia en las {len(salidas)} páginas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark de selectores y párrafos: lxml (DocumentoHTML) contra BeautifulSoup.
+
+Uso (desde backend/):
+    python benchmarks/bench_parseo_lxml.py [--repeticiones 20] [--multiplicar 40]
+
+Usa las páginas de `fixtures/html/` y, para medir páginas grandes, versiones
+con el cuerpo repetido `--multiplicar` veces. Antes de medir verifica que los
+dos caminos devuelvan el mismo texto para cada selector de SELECTORES y para
+el fallback de párrafos.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractores import (  # noqa: E402
+    LXML_DISPONIBLE, SELECTORES, crear_documento, crear_soup,
+    extraer_con_selector, extraer_con_selectores, extraer_parrafos
+)
+
+DIRECTORIO_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+
+def cargar_paginas(multiplicar):
+    paginas = {}
+    for nombre in sorted(os.listdir(DIRECTORIO_HTML)):
+        with open(os.path.join(DIRECTORIO_HTML, nombre), "rb") as f:
+            html = f.read()
+        paginas[nombre] = html
+        # Página grande: el <body> repetido, como un portal con muchas notas relacionadas
+        cuerpo = re.search(rb"<body>(.*)</body>", html, re.S)
+        if cuerpo and multiplicar > 1:
+            grande = html.replace(cuerpo.group(1), cuerpo.group(1) * multiplicar)
+            paginas[f"{nombre} x{multiplicar}"] = grande
+    return paginas
+
+
+def extraer_soup(html):
+    soup = crear_soup(html)
+    return extraer_con_selectores(soup)[0] or extraer_parrafos(soup)
+
+
+def extraer_lxml(html):
+    documento = crear_documento(html)
+    return extraer_con_selectores(documento)[0] or extraer_parrafos(documento)
+
+
+def diferencias(html):
+    """Selectores (y 'parrafos') cuyo texto difiere entre los dos caminos."""
+    soup, documento = crear_soup(html), crear_documento(html)
+    distintos = [
+        selector for selector in SELECTORES
+        if extraer_con_selector(soup, selector) != extraer_con_selector(documento, selector)
+    ]
+    if extraer_parrafos(soup) != extraer_parrafos(documento):
+        distintos.append("parrafos")
+    return distintos
+
+
+def medir(funcion, html, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(html)
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--multiplicar", type=int, default=40)
+    args = parser.parse_args()
+
+    if not LXML_DISPONIBLE:
+        print("❌ lxml no está instalado: no hay camino rápido que medir")
+        sys.exit(1)
+
+    paginas = cargar_paginas(args.multiplicar)
+
+    con_diferencias = {nombre: d for nombre, html in paginas.items() if (d := diferencias(html))}
+    if con_diferencias:
+        for nombre, distintos in con_diferencias.items():
+            print(f"❌ {nombre}: texto distinto en {', '.join(distintos)}")
+        sys.exit(1)
+    print(f"✅ Paridad OK en {len(paginas)} páginas ({len(SELECTORES)} selectores + párrafos)")
+
+    print("\nPágina                                   KB   soup ms   lxml ms")
+    total_soup = total_lxml = 0.0
+    for nombre, html in paginas.items():
+        soup_ms = medir(extraer_soup, html, args.repeticiones)
+        lxml_ms = medir(extraer_lxml, html, args.repeticiones)
+        total_soup += soup_ms
+        total_lxml += lxml_ms
+        print(f"{nombre:<38} {len(html) / 1024:6.0f}  {soup_ms:8.2f}  {lxml_ms:8.2f}  ({soup_ms / lxml_ms:.1f}x)")
+    print(f"\nTotal: soup {total_soup:.1f} ms, lxml {total_lxml:.1f} ms ({total_soup / total_lxml:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
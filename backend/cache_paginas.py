@@ -0,0 +1,242 @@
+"""
+Caché en disco de las páginas scrapeadas.
+
+El HTML se guarda direccionado por contenido (sha256 del cuerpo), de modo que
+dos URLs con el mismo cuerpo comparten archivo. Un índice JSON asocia cada URL
+con su objeto, su ETag/Last-Modified y los tiempos de guardado y último acceso.
+
+Durante la ejecución el índice vive en memoria: el desalojo y la escritura del
+JSON (O(n) sobre todas las entradas) se hacen una vez en `persistir`, al final
+del crawl, en lugar de en cada miss con el lock tomado. Si el proceso muere
+antes, se pierden solo las entradas nuevas y esas páginas se vuelven a bajar.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PaginaDescargada:
+    """Página HTML lista para los extractores, venga de la red o del caché."""
+
+    def __init__(self, url: str, contenido: bytes, codificacion: Optional[str] = None,
+                 desde_cache: bool = False):
+        self.url = url
+        self.content = contenido
+        self.encoding = codificacion
+        self.desde_cache = desde_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @classmethod
+    def desde_response(cls, response) -> "PaginaDescargada":
+        codificacion = response.encoding or response.apparent_encoding
+        return cls(response.url or "", response.content, codificacion)
+
+
+class CacheHTTPDisco:
+    """
+    Caché HTTP persistente con revalidación condicional.
+
+    - Dentro de `ttl_segundos` una entrada se sirve sin tocar la red.
+    - Pasado el TTL se revalida con If-None-Match / If-Modified-Since; un 304
+      renueva la entrada sin volver a bajar el cuerpo.
+    - Las entradas con más de `max_edad_segundos` se descartan, y si el total
+      en disco supera `max_bytes` se desalojan las menos usadas (LRU).
+    """
+
+    def __init__(self, directorio: str, ttl_segundos: float = 6 * 3600,
+                 max_edad_segundos: float = 3 * 24 * 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.directorio = directorio
+        self.directorio_objetos = os.path.join(directorio, "objetos")
+        self.ruta_indice = os.path.join(directorio, "indice.json")
+        self.ttl_segundos = ttl_segundos
+        self.max_edad_segundos = max_edad_segundos
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidaciones = 0
+        self.desalojos = 0
+
+        self._lock = threading.RLock()
+        self._modificado = False
+        os.makedirs(self.directorio_objetos, exist_ok=True)
+        self._indice: Dict[str, Dict[str, Any]] = self._cargar_indice()
+
+    # ------------------------------------------------------------------ índice
+
+    def _cargar_indice(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Índice de caché ilegible, se empieza vacío: {e}")
+            return {}
+
+    def _guardar_indice(self):
+        temporal = f"{self.ruta_indice}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self._indice, f)
+        os.replace(temporal, self.ruta_indice)
+
+    @staticmethod
+    def _clave(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _ruta_objeto(self, hash_contenido: str) -> str:
+        return os.path.join(self.directorio_objetos, f"{hash_contenido}.html")
+
+    # ------------------------------------------------------------------ lectura
+
+    def _leer(self, entrada: Dict[str, Any]) -> Optional[bytes]:
+        try:
+            with open(self._ruta_objeto(entrada["hash"]), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _pagina_de_entrada(self, url: str, entrada: Dict[str, Any]) -> Optional[PaginaDescargada]:
+        contenido = self._leer(entrada)
+        if contenido is None:
+            return None
+        entrada["ultimo_acceso"] = time.time()
+        self._modificado = True
+        return PaginaDescargada(url, contenido, entrada.get("codificacion"), desde_cache=True)
+
+    # ---------------------------------------------------------------- escritura
+
+    def _guardar(self, url: str, pagina: PaginaDescargada, etag: Optional[str],
+                 last_modified: Optional[str]):
+        """Escribe el objeto sin el lock (temporal propio del hilo) y solo toma el lock para el índice."""
+        hash_contenido = hashlib.sha256(pagina.content).hexdigest()
+        ruta = self._ruta_objeto(hash_contenido)
+        if not os.path.exists(ruta):
+            temporal = f"{ruta}.{threading.get_ident()}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(pagina.content)
+            os.replace(temporal, ruta)
+
+        ahora = time.time()
+        with self._lock:
+            self._indice[self._clave(url)] = {
+                "url": url,
+                "hash": hash_contenido,
+                "tamano": len(pagina.content),
+                "codificacion": pagina.encoding,
+                "etag": etag,
+                "last_modified": last_modified,
+                "guardado": ahora,
+                "ultimo_acceso": ahora,
+            }
+            self._modificado = True
+
+    def _eliminar_entrada(self, clave: str, referencias: Counter):
+        entrada = self._indice.pop(clave)
+        self.desalojos += 1
+        referencias[entrada["hash"]] -= 1
+        # El objeto puede estar compartido por otra URL con el mismo contenido
+        if referencias[entrada["hash"]] <= 0:
+            try:
+                os.remove(self._ruta_objeto(entrada["hash"]))
+            except OSError:
+                pass
+            return entrada["tamano"]
+        return 0
+
+    def _desalojar(self):
+        referencias = Counter(e["hash"] for e in self._indice.values())
+        total = sum({e["hash"]: e["tamano"] for e in self._indice.values()}.values())
+        limite_edad = time.time() - self.max_edad_segundos
+
+        for clave, entrada in sorted(self._indice.items(), key=lambda item: item[1]["ultimo_acceso"]):
+            if entrada["guardado"] >= limite_edad and total <= self.max_bytes:
+                continue
+            total -= self._eliminar_entrada(clave, referencias)
+
+    # ------------------------------------------------------------------- API
+
+    def obtener(self, url: str, descargar: Callable[[Dict[str, str]], Any]) -> PaginaDescargada:
+        """
+        Devuelve la página de `url`, usando el caché cuando es posible.
+
+        `descargar(headers)` debe hacer el GET con las cabeceras condicionales
+        recibidas y devolver la respuesta de requests. Los errores HTTP se
+        propagan con `raise_for_status`, igual que sin caché.
+        """
+        clave = self._clave(url)
+        with self._lock:
+            entrada = self._indice.get(clave)
+            if entrada and time.time() - entrada["guardado"] <= self.ttl_segundos:
+                pagina = self._pagina_de_entrada(url, entrada)
+                if pagina is not None:
+                    self.hits += 1
+                    return pagina
+                entrada = None
+
+            headers = {}
+            if entrada:
+                if entrada.get("etag"):
+                    headers["If-None-Match"] = entrada["etag"]
+                if entrada.get("last_modified"):
+                    headers["If-Modified-Since"] = entrada["last_modified"]
+
+        response = descargar(headers)
+
+        with self._lock:
+            if response.status_code == 304 and entrada:
+                entrada["guardado"] = time.time()
+                pagina = self._pagina_de_entrada(url, entrada)
+                if pagina is not None:
+                    self.revalidaciones += 1
+                    self.hits += 1
+                    return pagina
+
+        if response.status_code == 304:
+            # El objeto en disco desapareció: se pide la página completa
+            response = descargar({})
+
+        response.raise_for_status()
+        with self._lock:
+            self.misses += 1
+        pagina = PaginaDescargada.desde_response(response)
+        if response.status_code == 200:
+            self._guardar(url, pagina, response.headers.get("ETag"),
+                          response.headers.get("Last-Modified"))
+        return pagina
+
+    def persistir(self):
+        """
+        Desaloja lo vencido o lo que excede `max_bytes` y guarda el índice
+        (incluye los tiempos de último acceso de los hits). Sin cambios desde
+        la última vez no escribe nada.
+        """
+        with self._lock:
+            if not self._modificado:
+                return
+            self._desalojar()
+            self._guardar_indice()
+            self._modificado = False
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidaciones": self.revalidaciones,
+                "desalojos": self.desalojos,
+                "hit_rate": round(self.hits / consultas, 3) if consultas else 0.0,
+                "entradas": len(self._indice),
+                "bytes": sum({e["hash"]: e["tamano"] for e in self._indice.values()}.values()),
+            }
@@ -0,0 +1,118 @@
+"""
+Caché persistente de resúmenes generados por Gemini.
+
+Las agencias de noticias hacen que el mismo cuerpo aparezca con distintas
+URLs y títulos en varias categorías. La clave es un hash del texto
+normalizado más la versión del prompt, así que cambiar el prompt invalida
+las entradas anteriores sin tener que borrarlas a mano.
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, Unicode NFKC y espacios colapsados."""
+    texto = unicodedata.normalize("NFKC", texto).lower()
+    return _ESPACIOS.sub(" ", texto).strip()
+
+
+class CacheResumenes:
+    """Caché SQLite de resúmenes con desalojo LRU al superar `max_entradas`."""
+
+    def __init__(self, ruta: str, version_prompt: str, max_entradas: int = 5000):
+        self.ruta = ruta
+        self.version_prompt = version_prompt
+        self.max_entradas = max_entradas
+
+        self.hits = 0
+        self.misses = 0
+        self.guardados = 0
+        self.desalojos = 0
+
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            """CREATE TABLE IF NOT EXISTS resumenes (
+                clave TEXT PRIMARY KEY,
+                resumen TEXT NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL,
+                usos INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_resumenes_acceso ON resumenes (ultimo_acceso)"
+        )
+        self._conexion.commit()
+
+    def clave(self, texto: str) -> str:
+        contenido = f"{self.version_prompt}\n{normalizar_texto(texto)}"
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def obtener(self, texto: str) -> Optional[str]:
+        clave = self.clave(texto)
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT resumen FROM resumenes WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                self.misses += 1
+                return None
+            self._conexion.execute(
+                "UPDATE resumenes SET ultimo_acceso = ?, usos = usos + 1 WHERE clave = ?",
+                (time.time(), clave)
+            )
+            self._conexion.commit()
+            self.hits += 1
+            return fila[0]
+
+    def guardar(self, texto: str, resumen: str):
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                """INSERT INTO resumenes (clave, resumen, creado, ultimo_acceso)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(clave) DO UPDATE SET resumen = excluded.resumen,
+                                                    ultimo_acceso = excluded.ultimo_acceso""",
+                (self.clave(texto), resumen, ahora, ahora)
+            )
+            self.guardados += 1
+
+            total = self._conexion.execute("SELECT COUNT(*) FROM resumenes").fetchone()[0]
+            sobrantes = total - self.max_entradas
+            if sobrantes > 0:
+                self._conexion.execute(
+                    """DELETE FROM resumenes WHERE clave IN (
+                           SELECT clave FROM resumenes ORDER BY ultimo_acceso ASC LIMIT ?
+                       )""",
+                    (sobrantes,)
+                )
+                self.desalojos += sobrantes
+            self._conexion.commit()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas = self._conexion.execute("SELECT COUNT(*) FROM resumenes").fetchone()[0]
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "guardados": self.guardados,
+                "desalojos": self.desalojos,
+                "hit_rate": round(self.hits / consultas, 3) if consultas else 0.0,
+                "entradas": entradas,
+            }
@@ -0,0 +1,140 @@
+"""
+Puntaje de calidad del texto scrapeado.
+
+Reemplaza las ~15 búsquedas regex sin compilar y el bucle de palabras clave
+de `validar_contenido_noticia`: el texto se parte y se pasa a minúsculas una
+sola vez, los marcadores de código se cuentan con una única alternación
+compilada y el resultado queda en un objeto con las métricas calculadas para
+no tener que recalcularlas en otras etapas.
+
+En CPython una alternación grande de `re` (o un autómata Aho-Corasick escrito
+en Python) es más lenta que varias búsquedas `in`, que corren en C. Por eso
+las palabras clave se buscan con `in` sobre el texto en minúsculas, y la
+alternación de marcadores solo se ejecuta cuando alguno de sus literales
+aparece en el texto. Ver `benchmarks/bench_calidad_contenido.py`.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MIN_PALABRAS_CONTENIDO_VALIDO = 30  # REDUCIDO de 50 a 30
+MAX_REPETICIONES_MARCADOR = 2  # Solo rechazar si aparece más de 2 veces
+MIN_PALABRAS_CLAVE = 1  # ACEPTAR incluso si tiene solo 1 palabra clave
+MIN_SIGNOS_PUNTUACION = 2
+MIN_PALABRAS_LARGAS = 20
+
+# PATRONES MUCHO MÁS ESPECÍFICOS para evitar falsos positivos
+MARCADORES_CODIGO = [
+    r'<!DOCTYPE', r'<html', r'<head>', r'<body>',
+    r'function\s*\(', r'classList\.', r'addEventListener',
+    r'@media', r'font-family', r'background-color',
+    r'window\.', r'document\.', r'\.getElementById',
+    r'\.querySelector', r'\.addClass', r'\.removeClass'
+]
+
+# PALABRAS CLAVE MÁS FLEXIBLES
+PALABRAS_CLAVE_NOTICIA = [
+    'anunció', 'confirmó', 'informó', 'declaró', 'según', 'fuentes',
+    'investigación', 'estudio', 'datos', 'informe', 'autoridades',
+    'gobierno', 'empresa', 'mercado', 'economía', 'política',
+    'afirmó', 'señaló', 'explicó', 'indicó', 'manifestó',
+    'expresó', 'reveló', 'destacó', 'comentó', 'mencionó',
+    'país', 'ciudad', 'presidente', 'ministro', 'director',
+    'año', 'mes', 'día', 'semana', 'horas', 'minutos'
+]
+
+# Subcadena literal que contiene toda coincidencia de cada marcador. Permite
+# descartar con búsquedas `in` el caso común: un texto sin ningún marcador.
+_LITERALES_CODIGO = tuple(
+    re.sub(r'\\s\*\\\(|\\', '', patron).lower() for patron in MARCADORES_CODIGO
+)
+
+# Una sola alternación compilada con grupos nombrados. El lookahead hace que
+# el match tenga ancho cero, así que dos marcadores solapados (por ejemplo
+# `document.` y `.getElementById`) se cuentan igual que con búsquedas separadas.
+_MATCHER_CODIGO = re.compile(
+    "(?=(?:" + "|".join(f"(?P<m{i}>{patron})" for i, patron in enumerate(MARCADORES_CODIGO)) + "))",
+    re.IGNORECASE
+)
+_PALABRA_LARGA = re.compile(r'\b[a-zA-Záéíóúñ]{4,}\b')
+
+
+@dataclass
+class PuntajeContenido:
+    """Métricas de calidad de un texto y veredicto final."""
+    palabras: int
+    signos_puntuacion: int = 0
+    palabras_largas: Optional[int] = None  # Solo se cuenta si la puntuación no alcanza
+    palabras_clave: Tuple[str, ...] = ()
+    marcadores_codigo: Dict[str, int] = field(default_factory=dict)
+    es_valido: bool = False
+    motivo: str = ""
+
+    @property
+    def densidad_puntuacion(self) -> float:
+        """Signos de puntuación por palabra."""
+        return self.signos_puntuacion / self.palabras if self.palabras else 0.0
+
+
+def contar_marcadores_codigo(texto: str, texto_minusculas: str) -> Dict[str, int]:
+    """Repeticiones de cada marcador de código/CSS presente en el texto."""
+    if not any(literal in texto_minusculas for literal in _LITERALES_CODIGO):
+        return {}
+    marcadores = {}
+    for match in _MATCHER_CODIGO.finditer(texto):
+        patron = MARCADORES_CODIGO[int(match.lastgroup[1:])]
+        marcadores[patron] = marcadores.get(patron, 0) + 1
+    return marcadores
+
+
+def buscar_palabras_clave(texto_minusculas: str) -> Tuple[str, ...]:
+    """Palabras clave de noticia contenidas en el texto (por subcadena, como antes)."""
+    return tuple(palabra for palabra in PALABRAS_CLAVE_NOTICIA if palabra in texto_minusculas)
+
+
+def puntuar_contenido(texto: str, min_palabras: int = MIN_PALABRAS_CONTENIDO_VALIDO) -> PuntajeContenido:
+    """Calcula el puntaje de calidad de `texto` con los criterios de `validar_contenido_noticia`."""
+    if not texto:
+        return PuntajeContenido(palabras=0, motivo="Contenido muy corto: 0 palabras")
+
+    palabras = len(texto.split())
+    if palabras < min_palabras:
+        return PuntajeContenido(palabras=palabras, motivo=f"Contenido muy corto: {palabras} palabras")
+
+    texto_minusculas = texto.lower()
+    marcadores = contar_marcadores_codigo(texto, texto_minusculas)
+
+    # Se informa el primer marcador de la lista que supera el límite, como antes
+    for patron in MARCADORES_CODIGO:
+        repeticiones = marcadores.get(patron, 0)
+        if repeticiones > MAX_REPETICIONES_MARCADOR:
+            return PuntajeContenido(
+                palabras=palabras, marcadores_codigo=marcadores,
+                motivo=f"Contenido rechazado por patrón múltiple: {patron} ({repeticiones} veces)"
+            )
+
+    puntaje = PuntajeContenido(
+        palabras=palabras,
+        signos_puntuacion=texto.count('.') + texto.count('!') + texto.count('?'),
+        palabras_clave=buscar_palabras_clave(texto_minusculas),
+        marcadores_codigo=marcadores,
+    )
+
+    # Verificar que sea texto legible (no código)
+    es_texto_legible = puntaje.signos_puntuacion > MIN_SIGNOS_PUNTUACION
+    if not es_texto_legible:
+        puntaje.palabras_largas = len(_PALABRA_LARGA.findall(texto))
+        es_texto_legible = puntaje.palabras_largas > MIN_PALABRAS_LARGAS
+    tiene_palabras_clave = len(puntaje.palabras_clave) >= MIN_PALABRAS_CLAVE
+
+    puntaje.es_valido = es_texto_legible and tiene_palabras_clave
+    if not tiene_palabras_clave:
+        puntaje.motivo = "Sin palabras clave de noticia"
+    elif not es_texto_legible:
+        puntaje.motivo = "Texto poco legible (sin puntuación ni palabras largas)"
+    return puntaje
+
+
+def puntuar_lote(textos: Iterable[str], min_palabras: int = MIN_PALABRAS_CONTENIDO_VALIDO) -> List[PuntajeContenido]:
+    """Puntúa todos los textos de un crawl reutilizando los matchers compilados."""
+    return [puntuar_contenido(texto, min_palabras) for texto in textos]
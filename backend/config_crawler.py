@@ -0,0 +1,29 @@
+"""
+Configuración del crawler que también necesita el servidor de la API.
+
+El servidor solo lee estos valores (categorías, tamaño de un crawl, cuotas y
+directorio de estado) para planificar los crawls. Están acá y no en
+`procesar_y_guardar_db` porque importar ese módulo levanta todo el estado del
+crawler (caches, cuota de Gemini, marcas de GNews, perfiles, circuitos), que
+en el proceso de la API no hace falta.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CATEGORIAS = {
+    "business": "Negocios", "entertainment": "Entretenimiento", "health": "Salud",
+    "science": "Ciencia", "sports": "Deportes", "technology": "Tecnología", "general": "General"
+}
+
+MAX_NOTICIAS_POR_CATEGORIA = 3  # Aumenté ligeramente para compensar filtros más flexibles
+
+# Páginas de GNews por categoría en un fetch incremental
+MAX_PAGINAS_GNEWS = int(os.getenv("GNEWS_MAX_PAGINAS", "3"))
+
+# Estado del crawler entre ejecuciones (caches, cuotas, marcas, diario)
+DIRECTORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Cuota de Gemini: requests por día (se reinicia a medianoche del Pacífico)
+CUOTA_GEMINI_DIARIA = int(os.getenv("GEMINI_CUOTA_DIARIA", "250"))
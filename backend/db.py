@@ -5,6 +5,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import hashlib
 import random
+import time
 import logging
 
 
@@ -337,51 +338,165 @@ def search_noticias(query: str, tipo: str = "titulo") -> List[Dict[str, Any]]:
 
 # ==================== FUNCIONES DE ESCRITURA (SERVICE ROLE) ====================
 
-def insert_noticia(noticia: Dict[str, Any]) -> Dict[str, Any]:
-    """Inserta una nueva noticia con manejo elegante de duplicados."""
+def _es_error_duplicado(error: Exception) -> bool:
+    error_msg = str(error)
+    return "duplicate key" in error_msg or "23505" in error_msg
+
+def _es_error_de_fila(error: Exception) -> bool:
+    """Errores de datos/restricciones (clase 22/23 de Postgres) atribuibles a filas concretas."""
+    codigo = str(getattr(error, "code", "") or "")
+    return _es_error_duplicado(error) or codigo.startswith("22") or codigo.startswith("23")
+
+def _upsert_filas(client: Client, filas: List[Dict[str, Any]]) -> List[str]:
+    """
+    Upsert de un lote con ON CONFLICT (url) DO NOTHING.
+    
+    PostgREST admite un solo objetivo de conflicto por request, así que un
+    choque con el índice único de `titulo_hash` hace fallar el lote entero;
+    en ese caso se divide en mitades hasta aislar las filas conflictivas.
+    """
+    try:
+        response = client.table("noticias").upsert(
+            filas, on_conflict="url", ignore_duplicates=True
+        ).execute()
+        insertadas = {fila["url"] for fila in (_handle_response(response) or [])}
+        return ["insertada" if fila["url"] in insertadas else "duplicada" for fila in filas]
+    except Exception as e:
+        if not _es_error_de_fila(e):
+            logger.error(f"❌ Error en upsert de lote ({len(filas)} filas): {e}")
+            return ["fallida"] * len(filas)
+        if len(filas) == 1:
+            if _es_error_duplicado(e):
+                return ["duplicada"]
+            logger.error(f"❌ Fila rechazada por la base: {filas[0]['titulo'][:50]}... ({e})")
+            return ["fallida"]
+        mitad = len(filas) // 2
+        return _upsert_filas(client, filas[:mitad]) + _upsert_filas(client, filas[mitad:])
+
+def upsert_noticias_lote(noticias: List[Dict[str, Any]]) -> List[str]:
+    """
+    Inserta varias noticias en un solo request, ignorando las que ya existen.
+    
+    Returns:
+        Un resultado por noticia, en el mismo orden: "insertada", "duplicada" o "fallida".
+    """
+    if not noticias:
+        return []
+    
     client = _get_client(use_service_role=True)
     if not client:
-        raise Exception("❌ No hay cliente de servicio disponible para escritura")
+        logger.error("❌ No hay cliente de servicio disponible para escritura")
+        return ["fallida"] * len(noticias)
+    
+    resultados = [None] * len(noticias)
+    filas, posiciones = [], []
+    urls_lote, hashes_lote = set(), set()
+    
+    # Duplicados dentro del mismo lote: se resuelven sin ir a la base
+    for i, noticia in enumerate(noticias):
+        if noticia["url"] in urls_lote or noticia.get("titulo_hash") in hashes_lote:
+            resultados[i] = "duplicada"
+            continue
+        urls_lote.add(noticia["url"])
+        hashes_lote.add(noticia.get("titulo_hash"))
+        filas.append(noticia)
+        posiciones.append(i)
+    
+    if filas:
+        for posicion, resultado in zip(posiciones, _upsert_filas(client, filas)):
+            resultados[posicion] = resultado
+    
+    logger.info(f"✅ Lote de {len(noticias)} noticias: {resultados.count('insertada')} insertadas, "
+                f"{resultados.count('duplicada')} duplicadas, {resultados.count('fallida')} fallidas")
+    return resultados
+
+def obtener_indice_deduplicacion(tamano_pagina: int = 1000, dias: Optional[int] = None) -> Dict[str, set]:
+    """
+    Carga en bloque las URLs y los hashes de título existentes.
+    
+    Pagina la tabla completa (PostgREST corta en 1000 filas por request) para
+    que el crawler pueda deduplicar en memoria, sin una consulta por candidato.
+    Con `dias` solo carga las noticias de los últimos `dias` días.
+    """
+    indice = {"urls": set(), "titulo_hashes": set()}
+    client = _get_client(use_service_role=False)
+    if not client:
+        return indice
     
     try:
-        response = client.table("noticias").insert(noticia).execute()
-        logger.info(f"✅ Noticia insertada: {noticia['titulo'][:50]}...")
-        return _handle_response(response)
+        inicio = 0
+        while True:
+            consulta = client.table("noticias").select("url, titulo_hash")
+            if dias is not None:
+                consulta = consulta.gte("fecha", (datetime.now() - timedelta(days=dias)).date().isoformat())
+            response = consulta.order("id").range(
+                inicio, inicio + tamano_pagina - 1
+            ).execute()
+            filas = _handle_response(response) or []
+            
+            for fila in filas:
+                if fila.get("url"):
+                    indice["urls"].add(fila["url"])
+                if fila.get("titulo_hash"):
+                    indice["titulo_hashes"].add(fila["titulo_hash"])
+            
+            if len(filas) < tamano_pagina:
+                break
+            inicio += tamano_pagina
+        
+        logger.info(f"✅ Índice de deduplicación: {len(indice['urls'])} URLs, {len(indice['titulo_hashes'])} títulos")
+        return indice
     except Exception as e:
-        error_msg = str(e)
-        if "duplicate key" in error_msg or "23505" in error_msg:
-            logger.warning(f"⚠️ Noticia duplicada: {noticia['titulo'][:50]}...")
-            raise Exception("Noticia duplicada") from e
-        else:
-            logger.error(f"❌ Error insertando noticia: {e}")
-            raise e
+        logger.error(f"❌ Error obteniendo índice de deduplicación: {e}")
+        return indice
 
-def noticia_existe(titulo: str, url: str) -> bool:
-    """Verifica si una noticia ya existe por título o URL."""
+def obtener_titulos_recientes(dias: int = 3, tamano_pagina: int = 1000) -> List[Dict[str, Any]]:
+    """Obtiene id y título de las noticias de los últimos `dias` días (paginado)."""
     client = _get_client(use_service_role=False)
     if not client:
-        return False
+        return []
     
     try:
-        titulo_hash = generar_hash_titulo(titulo)
-        response = client.table("noticias").select("id").or_(f"url.eq.{url},titulo_hash.eq.{titulo_hash}").execute()
-        return len(response.data) > 0
+        fecha_desde = (datetime.now() - timedelta(days=dias)).date().isoformat()
+        titulos = []
+        inicio = 0
+        while True:
+            response = client.table("noticias").select("id, titulo").gte("fecha", fecha_desde).order("id").range(
+                inicio, inicio + tamano_pagina - 1
+            ).execute()
+            filas = _handle_response(response) or []
+            titulos.extend(filas)
+            if len(filas) < tamano_pagina:
+                break
+            inicio += tamano_pagina
+        return titulos
     except Exception as e:
-        logger.error(f"❌ Error verificando existencia: {e}")
-        return False
+        logger.error(f"❌ Error obteniendo títulos recientes: {e}")
+        return []
 
-def obtener_urls_existentes() -> set:
-    """Obtiene todas las URLs existentes en la base de datos."""
+def obtener_clics_recientes(dias: int = 30, tamano_pagina: int = 1000) -> List[Dict[str, Any]]:
+    """Fuente, categoría y clics de las noticias de los últimos `dias` días (paginado)."""
     client = _get_client(use_service_role=False)
     if not client:
-        return set()
-    
+        return []
+
     try:
-        response = client.table("noticias").select("url").execute()
-        return {item["url"] for item in response.data if item["url"]}
+        fecha_desde = (datetime.now() - timedelta(days=dias)).date().isoformat()
+        filas_totales = []
+        inicio = 0
+        while True:
+            response = client.table("noticias").select("fuente, categoria, clics").gte("fecha", fecha_desde).order("id").range(
+                inicio, inicio + tamano_pagina - 1
+            ).execute()
+            filas = _handle_response(response) or []
+            filas_totales.extend(filas)
+            if len(filas) < tamano_pagina:
+                break
+            inicio += tamano_pagina
+        return filas_totales
     except Exception as e:
-        logger.error(f"❌ Error obteniendo URLs existentes: {e}")
-        return set()
+        logger.error(f"❌ Error obteniendo clics recientes: {e}")
+        return []
 
 def increment_clics(noticia_id: int) -> bool:
     """Incrementa el contador de clics de una noticia - VERSIÓN ATÓMICA."""
@@ -415,67 +530,170 @@ def increment_clics(noticia_id: int) -> bool:
         logger.error(f"❌ Error incrementando clics: {e}")
         return False
 
-def eliminar_noticia_por_id(noticia_id: int) -> bool:
-    """Elimina una noticia específica por ID de la base de datos."""
+def _filtro_ilike(columna: str, texto: str) -> str:
+    """
+    Arma una condición `columna.ilike."*texto*"` para un filtro `or` de PostgREST.
+
+    Los comodines de LIKE se escapan y el valor va entre comillas, porque los
+    patrones pueden traer puntos, comas o paréntesis (reservados en `or`).
+    """
+    texto = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    texto = texto.replace("\\", "\\\\").replace('"', '\\"')
+    return f'{columna}.ilike."*{texto}*"'
+
+def _patrones_minimos(patrones: List[str]) -> List[str]:
+    """Quita los patrones que contienen a otro: ese otro ya los cubre con ilike."""
+    unicos = list(dict.fromkeys(p.strip() for p in patrones if p and p.strip()))
+    return [
+        p for p in unicos
+        if not any(q != p and q.lower() in p.lower() for q in unicos)
+    ]
+
+def eliminar_noticias_por_patrones(patrones: List[str], columna: str = "resumen",
+                                   tamano_pagina: int = 1000, tamano_lote: int = 200) -> Dict[str, int]:
+    """
+    Elimina en bloque las noticias cuya `columna` contiene alguno de los patrones.
+
+    El filtro corre en el servidor (un `or` de `ilike`), así que solo viajan
+    los ids que coinciden. Se recorre la tabla completa paginando por id
+    (keyset, estable aunque se borren filas en el medio) y cada página se
+    borra con un DELETE ... WHERE id IN (...) por lote de `tamano_lote` ids.
+
+    Returns:
+        Conteos: encontradas, eliminadas, fallidas y requests de borrado.
+    """
+    resultado = {"encontradas": 0, "eliminadas": 0, "fallidas": 0, "lotes": 0}
+    patrones = _patrones_minimos(patrones)
     client = _get_client(use_service_role=True)
-    if not client:
-        logger.error("❌ No hay cliente de servicio disponible para eliminar")
-        return False
-    
-    try:
+    if not client or not patrones:
+        if not client:
+            logger.error("❌ No hay cliente de servicio disponible para eliminar")
+        return resultado
+
+    filtro = ",".join(_filtro_ilike(columna, patron) for patron in patrones)
+    ultimo_id = None
+
+    while True:
+        query = client.table("noticias").select("id").or_(filtro).order("id").limit(tamano_pagina)
+        if ultimo_id is not None:
+            query = query.gt("id", ultimo_id)
+        try:
+            ids = [fila["id"] for fila in (_handle_response(query.execute()) or [])]
+        except Exception as e:
+            logger.error(f"❌ Error buscando noticias por patrones: {e}")
+            break
+
+        if not ids:
+            break
+        resultado["encontradas"] += len(ids)
+        ultimo_id = ids[-1]
+
+        for inicio in range(0, len(ids), tamano_lote):
+            lote = ids[inicio:inicio + tamano_lote]
+            resultado["lotes"] += 1
+            try:
+                # Sin devolver las filas borradas: alcanza con el conteo
+                response = client.table("noticias").delete(count="exact", returning="minimal").in_("id", lote).execute()
+                eliminadas = response.count or 0
+            except Exception as e:
+                logger.error(f"❌ Error eliminando lote de {len(lote)} noticias: {e}")
+                eliminadas = 0
+            resultado["eliminadas"] += eliminadas
+            resultado["fallidas"] += len(lote) - eliminadas
+
+        if len(ids) < tamano_pagina:
+            break
+
+    logger.info(
+        f"🗑️  Limpieza por patrones en '{columna}': {resultado['eliminadas']}/{resultado['encontradas']} "
+        f"eliminadas en {resultado['lotes']} requests"
+    )
+    return resultado
+
+def _contar_anteriores_a(client: Client, fecha_limite: str) -> int:
+    """COUNT(*) en el servidor (HEAD con Prefer: count=exact), sin traer filas."""
+    response = client.table("noticias").select("id", count="exact", head=True).lt("fecha", fecha_limite).execute()
+    return response.count or 0
+
+def purgar_noticias_antiguas(max_months: int = 6, tamano_lote: int = 500,
+                             max_segundos: float = 60, incluir_stats: bool = False) -> Dict[str, Any]:
+    """
+    Elimina por lotes las noticias más antiguas que `max_months` meses.
 
-        response_info = client.table("noticias").select("titulo").eq("id", noticia_id).execute()
-        titulo = response_info.data[0]['titulo'][:50] + "..." if response_info.data else "Desconocido"
-        
+    Cada lote toma los ids más viejos (ordenados por fecha) y los borra con
+    un DELETE ... WHERE id IN (...) que devuelve solo el conteo. Se corta al
+    superar `max_segundos`, así la purga tiene duración acotada y lo que
+    quede se borra en la próxima ejecución. Los conteos son server-side;
+    `get_stats` (que recorre la tabla) solo corre con `incluir_stats=True`.
 
-        response = client.table("noticias").delete().eq("id", noticia_id).execute()
-        deleted_count = len(response.data) if response.data else 0
-        
-        if deleted_count > 0:
-            logger.info(f"🗑️  Noticia eliminada: ID {noticia_id} - '{titulo}'")
-            return True
-        else:
-            logger.warning(f"⚠️ No se encontró noticia con ID {noticia_id} para eliminar")
-            return False
-            
-    except Exception as e:
-        logger.error(f"❌ Error eliminando noticia {noticia_id}: {e}")
-        return False
+    Returns:
+        Reporte de la purga: eliminadas, lotes, segundos, restantes, etc.
+    """
+    inicio = time.monotonic()
+    fecha_limite = (datetime.now() - timedelta(days=30 * max_months)).date().isoformat()
+    reporte: Dict[str, Any] = {
+        "exito": False,
+        "fecha_limite": fecha_limite,
+        "a_eliminar": 0,
+        "eliminadas": 0,
+        "lotes": 0,
+        "restantes": 0,
+        "completa": False,
+        "segundos": 0.0,
+    }
 
-def delete_old_noticias(max_months: int = 6) -> bool:
-    """Elimina noticias más antiguas que X meses."""
     client = _get_client(use_service_role=True)
     if not client:
-        return False
-    
+        return reporte
+
     try:
-        fecha_limite = (datetime.now() - timedelta(days=30 * max_months)).date().isoformat()
         logger.info(f"🗑️  Buscando noticias anteriores a: {fecha_limite} ({max_months} meses)")
-        
+        reporte["a_eliminar"] = _contar_anteriores_a(client, fecha_limite)
 
-        count_response = client.table("noticias").select("id", count="exact").lt("fecha", fecha_limite).execute()
-        total_a_eliminar = count_response.count or 0
-        
-        if total_a_eliminar == 0:
+        if reporte["a_eliminar"] == 0:
             logger.info("✅ No hay noticias antiguas para eliminar")
-            return True
-        
-        stats_antes = get_stats()
-        
+            reporte.update(exito=True, completa=True, segundos=round(time.monotonic() - inicio, 3))
+            return reporte
 
-        delete_response = client.table("noticias").delete().lt("fecha", fecha_limite).execute()
-        deleted_count = len(delete_response.data) if delete_response.data else 0
-        
-        stats_despues = get_stats()
-        
-        logger.info(f"✅ Eliminadas {deleted_count} noticias con más de {max_months} meses")
-        logger.info(f"📊 Estadísticas: {stats_antes['total_noticias']} → {stats_despues['total_noticias']} noticias")
-        
-        return True
-        
+        if incluir_stats:
+            reporte["stats_antes"] = get_stats()
+
+        # Al menos un lote por ejecución, aunque el conteo inicial haya sido lento
+        while True:
+            response = client.table("noticias").select("id").lt("fecha", fecha_limite).order("fecha").order("id").limit(tamano_lote).execute()
+            ids = [fila["id"] for fila in (_handle_response(response) or [])]
+            if not ids:
+                break
+
+            delete_response = client.table("noticias").delete(count="exact", returning="minimal").in_("id", ids).execute()
+            reporte["eliminadas"] += delete_response.count or 0
+            reporte["lotes"] += 1
+
+            if len(ids) < tamano_lote or time.monotonic() - inicio >= max_segundos:
+                break
+
+        reporte["restantes"] = _contar_anteriores_a(client, fecha_limite)
+        reporte["completa"] = reporte["restantes"] == 0
+        reporte["exito"] = True
+
+        if incluir_stats:
+            reporte["stats_despues"] = get_stats()
     except Exception as e:
         logger.error(f"❌ Error eliminando noticias antiguas: {e}")
-        return False
+
+    reporte["segundos"] = round(time.monotonic() - inicio, 3)
+    logger.info(
+        f"✅ Eliminadas {reporte['eliminadas']} noticias con más de {max_months} meses "
+        f"en {reporte['lotes']} lotes ({reporte['segundos']}s, quedan {reporte['restantes']})"
+    )
+    if incluir_stats and "stats_despues" in reporte:
+        logger.info(f"📊 Estadísticas: {reporte['stats_antes']['total_noticias']} → "
+                    f"{reporte['stats_despues']['total_noticias']} noticias")
+    return reporte
+
+def delete_old_noticias(max_months: int = 6) -> bool:
+    """Elimina noticias más antiguas que X meses."""
+    return purgar_noticias_antiguas(max_months=max_months)["exito"]
 
 # ==================== FUNCIONES APOD (CACHÉ) ====================
 
@@ -516,6 +734,63 @@ def save_apod_translation(apod_date: str, content_hash: str, translated_title: s
         logger.error(f"❌ Error guardando caché APOD: {e}")
         return False
 
+# ==================== REPORTES DE EJECUCIONES DEL CRAWLER ====================
+#
+# Tabla esperada en Supabase:
+#
+#   create table crawl_runs (
+#       id bigint generated always as identity primary key,
+#       iniciado timestamptz not null,
+#       finalizado timestamptz not null,
+#       duracion_segundos double precision,
+#       exitoso boolean,
+#       nuevas_guardadas integer,
+#       resultado jsonb,
+#       metricas jsonb
+#   );
+#   create index on crawl_runs (iniciado desc);
+
+def guardar_crawl_run(iniciado: datetime, resultado: Dict[str, Any]) -> bool:
+    """Guarda el resultado y las métricas por etapa de una ejecución del crawler."""
+    client = _get_client(use_service_role=True)
+    if not client:
+        return False
+    
+    try:
+        finalizado = datetime.now()
+        resultado_sin_metricas = {k: v for k, v in resultado.items() if k != "metricas"}
+        data = {
+            "iniciado": iniciado.isoformat(),
+            "finalizado": finalizado.isoformat(),
+            "duracion_segundos": round((finalizado - iniciado).total_seconds(), 3),
+            "exitoso": bool(resultado.get("proceso_exitoso", "error" not in resultado)),
+            "nuevas_guardadas": resultado.get("nuevas_guardadas", 0),
+            "resultado": resultado_sin_metricas,
+            "metricas": resultado.get("metricas"),
+        }
+        client.table("crawl_runs").insert(data).execute()
+        logger.info(f"✅ Reporte de ejecución guardado en crawl_runs ({data['duracion_segundos']}s)")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error guardando crawl_run: {e}")
+        return False
+
+def get_crawl_runs(limit: int = 20, incluir_metricas: bool = True) -> List[Dict[str, Any]]:
+    """Obtiene las últimas ejecuciones del crawler, de la más nueva a la más vieja."""
+    client = _get_client(use_service_role=True)
+    if not client:
+        return []
+    
+    columnas = "id, iniciado, finalizado, duracion_segundos, exitoso, nuevas_guardadas, resultado"
+    if incluir_metricas:
+        columnas += ", metricas"
+    try:
+        response = client.table("crawl_runs").select(columnas).order("iniciado", desc=True).limit(limit).execute()
+        return _handle_response(response) or []
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo crawl_runs: {e}")
+        return []
+
 # ==================== FUNCIONES UTILITARIAS ====================
 
 def generar_hash_titulo(titulo: str) -> str:
@@ -0,0 +1,221 @@
+"""
+Diario de checkpoints del crawler para reanudar ejecuciones interrumpidas.
+
+Cada artículo aceptado en una ejecución queda registrado en SQLite con la
+etapa a la que llegó y sus artefactos intermedios (texto scrapeado y
+resumen). Si el proceso muere a mitad de camino (reinicio de Render, timeout
+de `/procesar`), la siguiente ejecución retoma los artículos pendientes desde
+la etapa en la que quedaron en lugar de volver a pagar scraping y Gemini.
+
+Etapas: candidato → scrapeado → resumido → guardado. Los artículos
+rechazados, duplicados o fallidos se marcan como descartado. Al terminar una
+ejecución sus artículos se borran y solo queda la fila de la ejecución.
+
+Los artículos diferidos (sin presupuesto o sin cuota de Gemini) siguen
+pendientes y la ejecución se retoma en la siguiente corrida. La antigüedad se
+mide por artículo: cada diferimiento renueva su marca de tiempo, así que una
+espera larga (la cuota de Gemini se reinicia recién a la medianoche del
+Pacífico) no los pierde mientras el crawler siga corriendo.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ETAPAS_PENDIENTES = ("candidato", "scrapeado", "resumido")
+ETAPAS_FINALES = ("guardado", "descartado")
+
+
+class DiarioCrawl:
+    """Diario SQLite de una ejecución del crawler, seguro para usar desde varios hilos."""
+
+    def __init__(self, ruta: str, max_horas_reanudar: float = 24, max_ejecuciones: int = 50):
+        self.ruta = ruta
+        self.max_horas_reanudar = max_horas_reanudar
+        self.max_ejecuciones = max_ejecuciones
+        self.ejecucion_id: Optional[str] = None
+        self.reanudada = False
+
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(
+            """CREATE TABLE IF NOT EXISTS ejecuciones (
+                id TEXT PRIMARY KEY,
+                iniciada REAL NOT NULL,
+                finalizada REAL,
+                estado TEXT NOT NULL,
+                resultado TEXT
+            );
+            CREATE TABLE IF NOT EXISTS articulos (
+                ejecucion_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etapa TEXT NOT NULL,
+                articulo TEXT NOT NULL,
+                texto TEXT,
+                resumen TEXT,
+                actualizado REAL NOT NULL,
+                PRIMARY KEY (ejecucion_id, url)
+            );"""
+        )
+        self._conexion.commit()
+
+    # --------------------------------------------------------------- ejecución
+
+    def reanudar_o_iniciar(self) -> List[Dict[str, Any]]:
+        """
+        Abre la ejecución a usar y devuelve los trabajos pendientes de reanudar.
+
+        Se retoma la ejecución sin terminar más reciente si empezó hace menos
+        de `max_horas_reanudar` o si todavía tiene artículos pendientes
+        tocados en ese lapso (p. ej. diferidos); de ella se descartan solo los
+        pendientes más viejos, cuyas noticias ya no son de actualidad. Las
+        demás se abandonan. Cada trabajo es {"art", "texto", "resumen"}.
+        """
+        ahora = time.time()
+        limite = ahora - self.max_horas_reanudar * 3600
+        marcadores = ",".join("?" for _ in ETAPAS_PENDIENTES)
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id, iniciada FROM ejecuciones WHERE estado = 'en_curso' ORDER BY iniciada DESC"
+            ).fetchall()
+
+            reanudar = None
+            for ejecucion_id, iniciada in filas:
+                vigentes = self._conexion.execute(
+                    f"""SELECT COUNT(*) FROM articulos
+                        WHERE ejecucion_id = ? AND etapa IN ({marcadores}) AND actualizado >= ?""",
+                    (ejecucion_id, *ETAPAS_PENDIENTES, limite)
+                ).fetchone()[0]
+                if reanudar is None and (iniciada >= limite or vigentes):
+                    reanudar = ejecucion_id
+                else:
+                    logger.info(f"🗑️ Ejecución {ejecucion_id} demasiado vieja para reanudar, se abandona")
+                    self._cerrar(ejecucion_id, "abandonada")
+
+            if reanudar is None:
+                self.ejecucion_id = uuid.uuid4().hex[:12]
+                self.reanudada = False
+                self._conexion.execute(
+                    "INSERT INTO ejecuciones (id, iniciada, estado) VALUES (?, ?, 'en_curso')",
+                    (self.ejecucion_id, time.time())
+                )
+                self._conexion.commit()
+                return []
+
+            self.ejecucion_id = reanudar
+            self.reanudada = True
+            viejos = self._conexion.execute(
+                f"""UPDATE articulos SET etapa = 'descartado', texto = NULL, resumen = NULL
+                    WHERE ejecucion_id = ? AND etapa IN ({marcadores}) AND actualizado < ?""",
+                (reanudar, *ETAPAS_PENDIENTES, limite)
+            ).rowcount
+            if viejos:
+                logger.info(f"🗑️ {viejos} artículos pendientes demasiado viejos para reanudar, se descartan")
+            # La ejecución sigue viva: su antigüedad se cuenta desde la última reanudación
+            self._conexion.execute("UPDATE ejecuciones SET iniciada = ? WHERE id = ?", (ahora, reanudar))
+            self._conexion.commit()
+            pendientes = self._conexion.execute(
+                f"""SELECT articulo, texto, resumen FROM articulos
+                    WHERE ejecucion_id = ? AND etapa IN ({marcadores})
+                    ORDER BY actualizado""",
+                (reanudar, *ETAPAS_PENDIENTES)
+            ).fetchall()
+
+        return [
+            {"art": json.loads(articulo), "texto": texto, "resumen": resumen}
+            for articulo, texto, resumen in pendientes
+        ]
+
+    def finalizar(self, resultado: Optional[Dict[str, Any]] = None):
+        """Marca la ejecución como terminada y compacta el diario."""
+        if self.ejecucion_id is None:
+            return
+        with self._lock:
+            self._cerrar(self.ejecucion_id, "finalizada", resultado)
+            # Solo se conservan las filas de las últimas ejecuciones terminadas
+            self._conexion.execute(
+                """DELETE FROM ejecuciones WHERE estado != 'en_curso' AND id NOT IN (
+                       SELECT id FROM ejecuciones ORDER BY iniciada DESC LIMIT ?
+                   )""",
+                (self.max_ejecuciones,)
+            )
+            self._conexion.commit()
+            self._conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.ejecucion_id = None
+
+    def _cerrar(self, ejecucion_id: str, estado: str, resultado: Optional[Dict[str, Any]] = None):
+        self._conexion.execute("DELETE FROM articulos WHERE ejecucion_id = ?", (ejecucion_id,))
+        self._conexion.execute(
+            "UPDATE ejecuciones SET estado = ?, finalizada = ?, resultado = ? WHERE id = ?",
+            (estado, time.time(), json.dumps(resultado, default=str) if resultado else None, ejecucion_id)
+        )
+
+    # --------------------------------------------------------------- artículos
+
+    def _escribir(self, consulta: str, parametros: tuple):
+        if self.ejecucion_id is None:
+            return
+        with self._lock:
+            self._conexion.execute(consulta, parametros)
+            self._conexion.commit()
+
+    def registrar_candidato(self, art: Dict[str, Any]):
+        self._escribir(
+            """INSERT OR IGNORE INTO articulos (ejecucion_id, url, etapa, articulo, actualizado)
+               VALUES (?, ?, 'candidato', ?, ?)""",
+            (self.ejecucion_id, art.get("url"), json.dumps(art, ensure_ascii=False), time.time())
+        )
+
+    def registrar_texto(self, url: str, texto: str):
+        self._escribir(
+            """UPDATE articulos SET etapa = 'scrapeado', texto = ?, actualizado = ?
+               WHERE ejecucion_id = ? AND url = ?""",
+            (texto, time.time(), self.ejecucion_id, url)
+        )
+
+    def registrar_resumen(self, url: str, resumen: str):
+        self._escribir(
+            """UPDATE articulos SET etapa = 'resumido', resumen = ?, actualizado = ?
+               WHERE ejecucion_id = ? AND url = ?""",
+            (resumen, time.time(), self.ejecucion_id, url)
+        )
+
+    def marcar_diferido(self, url: str):
+        """El artículo sigue pendiente para la próxima ejecución; se renueva su antigüedad."""
+        self._escribir(
+            "UPDATE articulos SET actualizado = ? WHERE ejecucion_id = ? AND url = ?",
+            (time.time(), self.ejecucion_id, url)
+        )
+
+    def marcar(self, url: str, etapa: str):
+        """Pasa un artículo a una etapa final ('guardado' o 'descartado') y libera sus artefactos."""
+        if etapa not in ETAPAS_FINALES:
+            raise ValueError(f"Etapa final desconocida: {etapa}")
+        self._escribir(
+            """UPDATE articulos SET etapa = ?, texto = NULL, resumen = NULL, actualizado = ?
+               WHERE ejecucion_id = ? AND url = ?""",
+            (etapa, time.time(), self.ejecucion_id, url)
+        )
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            por_etapa = dict(self._conexion.execute(
+                "SELECT etapa, COUNT(*) FROM articulos WHERE ejecucion_id = ? GROUP BY etapa",
+                (self.ejecucion_id,)
+            ).fetchall())
+        return {"ejecucion_id": self.ejecucion_id, "reanudada": self.reanudada, "etapas": por_etapa}
@@ -0,0 +1,301 @@
+"""
+Extractores de texto para el scraper de noticias.
+
+Trabajan sobre HTML ya descargado (no hacen requests), así que la página se
+baja una sola vez y se reutiliza en toda la cadena de extracción.
+
+Los selectores y el fallback de párrafos corren sobre un `DocumentoHTML`: el
+HTML se parsea una sola vez con lxml, se vacían scripts y estilos (los
+comentarios no aportan texto), y cada selector CSS se evalúa con un XPath compilado una vez por
+proceso. El texto se arma igual que `get_text(strip=True)` de BeautifulSoup,
+que sigue usándose si lxml no está instalado o para selectores que el
+traductor no soporta. Ver `benchmarks/bench_parseo_lxml.py`.
+"""
+import re
+import time
+from bs4 import BeautifulSoup
+import trafilatura
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_DISPONIBLE = True
+except ImportError:  # lxml llega con trafilatura, pero el camino con BeautifulSoup sigue andando sin él
+    LXML_DISPONIBLE = False
+
+MIN_PALABRAS_TRAFILATURA = 50  # REDUCIDO de 100 a 50
+MIN_PALABRAS_SELECTOR = 50  # REDUCIDO de 100 a 50
+MIN_PALABRAS_PARRAFOS = 40  # REDUCIDO de 100 a 40
+MIN_CARACTERES_PARRAFO = 30  # REDUCIDO de 50 a 30
+MIN_PALABRAS_REGEX = 80  # REDUCIDO de 300 a 80
+MAX_PALABRAS_REGEX = 500  # REDUCIDO el límite
+
+SELECTORES = [
+    'article .article-content', 'article .story-content', '.news-content',
+    '.entry-content', '.post-content', '[class*="content"]',
+    'article p', '.article-body', '.news-body', '.story-text', '.news-text'
+]
+
+PATRON_ETIQUETAS = re.compile('<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});')
+
+# Subconjunto de CSS que se traduce a XPath: etiqueta, .clase, #id y
+# [atributo], [atributo="v"], [atributo*="v"], [atributo^="v"], [atributo$="v"],
+# combinados con espacios (descendiente), que es lo que usa SELECTORES.
+_PATRON_COMPUESTO = re.compile(r'(?P<etiqueta>[a-zA-Z][\w-]*|\*)?(?P<resto>(?:[.#][\w-]+|\[[^\]]+\])*)$')
+_PATRON_FILTRO = re.compile(
+    r'\.(?P<clase>[\w-]+)|#(?P<id>[\w-]+)'
+    r'|\[\s*(?P<atributo>[\w-]+)\s*(?:(?P<operador>[*^$]?=)\s*(?P<valor>"[^"]*"|\'[^\']*\'|[^\]\s]*)\s*)?\]'
+)
+_xpath_selectores = {}
+
+
+def extraer_con_trafilatura(html):
+    """Extrae el cuerpo con trafilatura. `html` puede ser str o bytes."""
+    content = trafilatura.extract(
+        html,
+        include_comments=False,
+        include_tables=False,
+        no_fallback=True
+    )
+    if content and len(content.split()) > MIN_PALABRAS_TRAFILATURA:
+        return content
+    return None
+
+
+def crear_soup(html):
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _literal_xpath(valor):
+    if "'" not in valor:
+        return f"'{valor}'"
+    if '"' not in valor:
+        return f'"{valor}"'
+    return "concat(" + ", \"'\", ".join(f"'{parte}'" for parte in valor.split("'")) + ")"
+
+
+def _css_a_xpath(selector):
+    """Traduce `selector` a una expresión XPath, o None si usa algo no soportado."""
+    pasos = []
+    for compuesto in selector.split():
+        match = _PATRON_COMPUESTO.match(compuesto)
+        if not match:
+            return None
+        condiciones = []
+        resto = match.group('resto')
+        posicion = 0
+        for filtro in _PATRON_FILTRO.finditer(resto):
+            if filtro.start() != posicion:
+                return None
+            posicion = filtro.end()
+            if filtro.group('clase'):
+                condiciones.append(
+                    f"contains(concat(' ', normalize-space(@class), ' '), {_literal_xpath(' ' + filtro.group('clase') + ' ')})"
+                )
+            elif filtro.group('id'):
+                condiciones.append(f"@id = {_literal_xpath(filtro.group('id'))}")
+            else:
+                atributo, operador = filtro.group('atributo').lower(), filtro.group('operador')
+                if not operador:
+                    condiciones.append(f"@{atributo}")
+                    continue
+                valor = filtro.group('valor').strip('"\'')
+                literal = _literal_xpath(valor)
+                if operador == '=':
+                    condiciones.append(f"@{atributo} = {literal}")
+                elif not valor:
+                    # En CSS *=, ^= y $= con valor vacío no coinciden con nada
+                    condiciones.append("false()")
+                elif operador == '*=':
+                    condiciones.append(f"contains(@{atributo}, {literal})")
+                elif operador == '^=':
+                    condiciones.append(f"starts-with(@{atributo}, {literal})")
+                else:
+                    condiciones.append(
+                        f"substring(@{atributo}, string-length(@{atributo}) - {len(valor) - 1}) = {literal}"
+                    )
+        if posicion != len(resto):
+            return None
+        etiqueta = (match.group('etiqueta') or '*').lower()
+        pasos.append(etiqueta + ''.join(f"[{condicion}]" for condicion in condiciones))
+    if not pasos:
+        return None
+    return '//' + '//'.join(pasos)
+
+
+def _xpath_de(selector):
+    """XPath compilado de `selector` (se compila una sola vez por proceso)."""
+    if selector not in _xpath_selectores:
+        expresion = _css_a_xpath(selector) if LXML_DISPONIBLE else None
+        _xpath_selectores[selector] = etree.XPath(expresion) if expresion else None
+    return _xpath_selectores[selector]
+
+
+def _parsear_lxml(html):
+    """Árbol lxml con scripts y estilos vacíos; None si no se puede parsear."""
+    if isinstance(html, bytes):
+        # Casi todos los medios son UTF-8; si no decodifica, lxml usa el <meta charset>
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    try:
+        try:
+            raiz = lxml.html.document_fromstring(html)
+        except ValueError:
+            # Un str con declaración de encoding XML: se parsean los bytes
+            raiz = lxml.html.document_fromstring(html.encode('utf-8'))
+    except etree.ParserError:
+        # Documento vacío o solo espacios
+        return None
+    # Se vacían en lugar de quitarse: si se borran, lxml pega el texto de antes
+    # y el de después en un solo fragmento y el resultado deja de coincidir con
+    # get_text(strip=True). Los comentarios ya los saltea itertext.
+    for elemento in raiz.iter('script', 'style'):
+        elemento.text = None
+        for hijo in list(elemento):
+            elemento.remove(hijo)
+    return raiz
+
+
+def _texto_lxml(elemento):
+    """Igual que `get_text(strip=True)`: fragmentos sin espacios de los bordes, pegados."""
+    return ''.join(fragmento.strip() for fragmento in elemento.itertext())
+
+
+class DocumentoHTML:
+    """
+    Página parseada una sola vez para los selectores y el fallback de párrafos.
+
+    Usa lxml si está disponible; el árbol de BeautifulSoup solo se construye
+    si hace falta (sin lxml, o con un selector que no se pudo traducir).
+    """
+
+    def __init__(self, html):
+        self.html = html
+        self.raiz = _parsear_lxml(html) if LXML_DISPONIBLE else None
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = crear_soup(self.html)
+        return self._soup
+
+
+def crear_documento(html):
+    return DocumentoHTML(html)
+
+
+def extraer_con_selector(soup, selector):
+    """
+    Texto de los elementos que cumplen `selector`, si supera el mínimo de palabras.
+    `soup` puede ser un DocumentoHTML (camino rápido con lxml) o un BeautifulSoup.
+    """
+    if isinstance(soup, DocumentoHTML):
+        xpath = _xpath_de(selector)
+        if soup.raiz is not None and xpath is not None:
+            elements = xpath(soup.raiz)
+            if elements:
+                text_content = ' '.join([_texto_lxml(elem) for elem in elements])
+                if len(text_content.split()) > MIN_PALABRAS_SELECTOR:
+                    return text_content
+            return None
+        soup = soup.soup
+
+    elements = soup.select(selector)
+    if elements:
+        text_content = ' '.join([elem.get_text(strip=True) for elem in elements])
+        if len(text_content.split()) > MIN_PALABRAS_SELECTOR:
+            return text_content
+    return None
+
+
+def extraer_con_selectores(soup, selectores=SELECTORES):
+    """Prueba los selectores en orden. Devuelve (texto, selector) o (None, None)."""
+    for selector in selectores:
+        text_content = extraer_con_selector(soup, selector)
+        if text_content:
+            return text_content, selector
+    return None, None
+
+
+def extraer_parrafos(soup):
+    """Fallback: concatena los párrafos con contenido suficiente."""
+    if isinstance(soup, DocumentoHTML):
+        if soup.raiz is not None:
+            textos = [_texto_lxml(p) for p in soup.raiz.iter('p')]
+            text_content = ' '.join([texto for texto in textos if len(texto) > MIN_CARACTERES_PARRAFO])
+            if len(text_content.split()) > MIN_PALABRAS_PARRAFOS:
+                return text_content
+            return None
+        soup = soup.soup
+
+    paragraphs = soup.find_all('p')
+    if paragraphs:
+        text_content = ' '.join([p.get_text(strip=True) for p in paragraphs
+                                 if len(p.get_text(strip=True)) > MIN_CARACTERES_PARRAFO])
+        if len(text_content.split()) > MIN_PALABRAS_PARRAFOS:
+            return text_content
+    return None
+
+
+def extraer_con_regex(html):
+    """Último recurso: elimina etiquetas y entidades con una regex."""
+    text = ' '.join(PATRON_ETIQUETAS.sub(' ', html).split())
+    palabras = text.split()
+    if len(palabras) > MIN_PALABRAS_REGEX:
+        return ' '.join(palabras[:MAX_PALABRAS_REGEX])
+    return None
+
+
+def _extraer_con_metodo(metodo, contenido, codificacion, selectores, estado):
+    """Un método de la cadena. Devuelve (texto sin recortar, selector)."""
+    if metodo == "trafilatura":
+        return extraer_con_trafilatura(contenido), None
+
+    if metodo in ("selectores", "parrafos"):
+        # Se parsea una sola vez (lxml) para los selectores y los párrafos
+        if "documento" not in estado:
+            estado["documento"] = crear_documento(contenido)
+        if metodo == "selectores":
+            return extraer_con_selectores(estado["documento"], selectores)
+        return extraer_parrafos(estado["documento"]), None
+
+    if metodo == "regex":
+        return extraer_con_regex(contenido.decode(codificacion or "utf-8", errors="replace")), None
+
+    raise ValueError(f"Método de extracción desconocido: {metodo}")
+
+
+def extraer_cadena(contenido, codificacion, metodos, selectores=SELECTORES, max_palabras=None):
+    """
+    Prueba `metodos` en orden sobre el HTML descargado hasta que uno da texto.
+
+    Devuelve (texto, intentos), con un dict por método probado: metodo,
+    segundos, exito, palabras, selector y error. No hace I/O ni toca estado
+    global, así que puede correr en un ProcessPoolExecutor. El texto de
+    trafilatura, selectores y párrafos se recorta a `max_palabras`; el de
+    regex ya viene acotado.
+    """
+    intentos = []
+    estado = {}
+    for metodo in metodos:
+        intento = {"metodo": metodo, "exito": False, "palabras": 0, "selector": None, "error": None}
+        inicio = time.perf_counter()
+        texto = None
+        try:
+            texto, intento["selector"] = _extraer_con_metodo(metodo, contenido, codificacion, selectores, estado)
+        except Exception as e:
+            intento["error"] = str(e)
+        intento["segundos"] = time.perf_counter() - inicio
+        intentos.append(intento)
+
+        if texto:
+            palabras = texto.split()
+            intento["exito"] = True
+            intento["palabras"] = len(palabras)
+            if max_palabras and metodo != "regex":
+                texto = ' '.join(palabras[:max_palabras])
+            return texto, intentos
+    return None, intentos
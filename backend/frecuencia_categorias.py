@@ -0,0 +1,154 @@
+"""
+Frecuencia de crawl adaptativa por categoría.
+
+En lugar de crawlear las siete categorías juntas cuatro veces por día, cada
+categoría tiene su propio intervalo. Después de cada crawl se registra
+cuántas noticias nuevas trajo GNews desde la marca anterior (ver
+marcas_gnews) y cuánto tiempo pasó. Con eso se actualiza un promedio móvil
+exponencial (EWMA) de noticias por hora. Si el crawl cortó la paginación
+antes de llegar a la marca, el conteo está censurado: es solo un mínimo, así
+que puede subir la tasa pero nunca bajarla.
+
+El presupuesto diario de crawls de categoría sale de la cuota de GNews y de
+Gemini. Se reparte así: cada categoría recibe un mínimo y el resto va en
+proporción a su tasa, con un máximo por categoría. Una categoría movida
+(General, Deportes) se revisa cada pocas horas y una tranquila una vez por
+día.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ALFA_EWMA = 0.3            # Peso de la última observación en la tasa
+TASA_BASE = 0.1            # Noticias/hora que se suman a toda categoría para que ninguna quede sin reparto
+MIN_HORAS_OBSERVACION = 0.25  # Observaciones más cortas que esto no dicen nada de la tasa
+
+
+def repartir_crawls(tasas: Dict[str, float], total: float, minimo: float, maximo: float) -> Dict[str, float]:
+    """
+    Reparte `total` crawls por día entre las categorías de `tasas`: `minimo`
+    para cada una y el resto en proporción a la tasa (más TASA_BASE), sin
+    pasar de `maximo`. Lo que una categoría no puede absorber se redistribuye
+    entre las demás.
+    """
+    if not tasas:
+        return {}
+    minimo = min(minimo, maximo)
+    asignados = {categoria: minimo for categoria in tasas}
+    restante = total - minimo * len(tasas)
+    libres = set(tasas)
+    while restante > 1e-9 and libres:
+        pesos = {categoria: tasas[categoria] + TASA_BASE for categoria in libres}
+        suma_pesos = sum(pesos.values())
+        repartido = 0.0
+        for categoria in list(libres):
+            extra = min(restante * pesos[categoria] / suma_pesos, maximo - asignados[categoria])
+            asignados[categoria] += extra
+            repartido += extra
+            if asignados[categoria] >= maximo - 1e-9:
+                libres.discard(categoria)
+        restante -= repartido
+        if repartido <= 1e-9:
+            break
+    return asignados
+
+
+class FrecuenciaCategorias:
+    """
+    Tasas de llegada y último crawl por categoría, persistidos en un JSON.
+    Seguro para usar desde varios hilos.
+    """
+
+    def __init__(self, ruta: str, categorias: Iterable[str], crawls_por_dia: float,
+                 min_por_dia: float = 1.0, max_por_dia: float = 24.0):
+        self.ruta = ruta
+        self.categorias = list(categorias)
+        self.crawls_por_dia = crawls_por_dia
+        self.min_por_dia = min_por_dia
+        self.max_por_dia = max_por_dia
+        self._lock = threading.Lock()
+        self._estado: Dict[str, Dict[str, Any]] = self._cargar()
+
+    def _cargar(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Frecuencias de categorías ilegibles, se empieza de cero: {e}")
+            return {}
+
+    def persistir(self):
+        with self._lock:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._estado, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+
+    def registrar_crawl(self, categorias: Iterable[str], llegadas: Dict[str, int], ahora: Optional[float] = None,
+                        censuradas: Iterable[str] = ()):
+        """
+        Anota que `categorias` se crawlearon en `ahora`. `llegadas` tiene las
+        noticias nuevas que trajo GNews por categoría; una categoría sin
+        entrada (sin marca previa) no actualiza su tasa. Las de `censuradas`
+        tienen un conteo que es solo un mínimo.
+        """
+        ahora = time.time() if ahora is None else ahora
+        censuradas = set(censuradas)
+        with self._lock:
+            for categoria in categorias:
+                estado = self._estado.setdefault(categoria, {"tasa": None, "ultimo": None, "observaciones": 0})
+                if estado["ultimo"] is not None and categoria in llegadas:
+                    horas = (ahora - estado["ultimo"]) / 3600
+                    if horas >= MIN_HORAS_OBSERVACION:
+                        observada = llegadas[categoria] / horas
+                        anterior = estado["tasa"]
+                        if categoria in censuradas:
+                            # La tasa real es al menos la observada: se sube hasta ahí, nunca se baja
+                            if anterior is None or observada > anterior:
+                                estado["tasa"] = observada
+                        else:
+                            estado["tasa"] = observada if anterior is None else ALFA_EWMA * observada + (1 - ALFA_EWMA) * anterior
+                        estado["observaciones"] += 1
+                estado["ultimo"] = ahora
+
+    def plan(self, ahora: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Por categoría: tasa (noticias/hora), crawls por día, intervalo en horas y próximo crawl."""
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            estados = {categoria: dict(self._estado.get(categoria, {})) for categoria in self.categorias}
+        conocidas = [e["tasa"] for e in estados.values() if e.get("tasa") is not None]
+        # Sin observaciones todavía, la categoría se trata como una de tasa promedio
+        tasa_defecto = sum(conocidas) / len(conocidas) if conocidas else 0.0
+        tasas = {c: e["tasa"] if e.get("tasa") is not None else tasa_defecto for c, e in estados.items()}
+        reparto = repartir_crawls(tasas, self.crawls_por_dia, self.min_por_dia, self.max_por_dia)
+
+        plan = {}
+        for categoria, crawls in reparto.items():
+            intervalo = 24 / crawls if crawls else None
+            ultimo = estados[categoria].get("ultimo")
+            proximo = ultimo + intervalo * 3600 if ultimo is not None and intervalo else ahora
+            plan[categoria] = {
+                "tasa_por_hora": round(tasas[categoria], 3),
+                "observaciones": estados[categoria].get("observaciones", 0),
+                "crawls_por_dia": round(crawls, 2),
+                "intervalo_horas": round(intervalo, 2) if intervalo else None,
+                "ultimo": ultimo,
+                "proximo": proximo,
+                "vencida": proximo <= ahora,
+            }
+        return plan
+
+    def vencidas(self, ahora: Optional[float] = None) -> List[str]:
+        """Categorías cuyo próximo crawl ya llegó, la más atrasada primero."""
+        plan = self.plan(ahora)
+        return sorted((c for c, p in plan.items() if p["vencida"]), key=lambda c: plan[c]["proximo"])
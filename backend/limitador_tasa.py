@@ -0,0 +1,89 @@
+import threading
+import time
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class LimitadorTokenBucket:
+    """
+    Limitador de tasa tipo token bucket, seguro entre hilos.
+
+    Se rellena a `tasa` tokens por segundo hasta un máximo de `capacidad`.
+    Cada request consume un token; si no hay disponibles, `adquirir` bloquea
+    solo el tiempo justo hasta que se genere el siguiente.
+    """
+
+    def __init__(self, tasa: float, capacidad: int = 1):
+        if tasa <= 0:
+            raise ValueError("La tasa del limitador debe ser mayor a 0")
+        self.tasa = float(tasa)
+        self.capacidad = max(1, int(capacidad))
+        self._tokens = float(self.capacidad)
+        self._ultima_recarga = time.monotonic()
+        self._bloqueado_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def _recargar(self, ahora: float):
+        transcurrido = ahora - self._ultima_recarga
+        if transcurrido > 0:
+            self._tokens = min(self.capacidad, self._tokens + transcurrido * self.tasa)
+            self._ultima_recarga = ahora
+
+    def adquirir(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta obtener `tokens`. Devuelve False si se supera `timeout`."""
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._recargar(ahora)
+
+                espera_pausa = self._bloqueado_hasta - ahora
+                if espera_pausa <= 0 and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+
+                faltante = max(0.0, tokens - self._tokens)
+                espera = max(espera_pausa, faltante / self.tasa)
+
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            time.sleep(espera)
+
+    def pausar(self, segundos: float):
+        """Detiene a todos los consumidores (p. ej. tras un 429 con Retry-After)."""
+        with self._lock:
+            self._bloqueado_hasta = max(self._bloqueado_hasta, time.monotonic() + segundos)
+            self._tokens = 0.0
+
+
+def segundos_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Interpreta la cabecera Retry-After (segundos o fecha HTTP)."""
+    if not valor:
+        return None
+
+    valor = valor.strip()
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+
+    try:
+        fecha = parsedate_to_datetime(valor)
+        if fecha.tzinfo is None:
+            fecha = fecha.replace(tzinfo=timezone.utc)
+        return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def calcular_backoff(intento: int, base: float = 2.0, maximo: float = 60.0,
+                     retry_after: Optional[str] = None) -> float:
+    """Espera antes del reintento `intento` (0, 1, 2...), respetando Retry-After si existe."""
+    segundos = segundos_retry_after(retry_after)
+    if segundos is not None:
+        return min(segundos, maximo)
+    exponencial = min(maximo, base * (2 ** intento))
+    return exponencial * random.uniform(0.5, 1.0)
@@ -0,0 +1,122 @@
+"""
+Marcas de agua de GNews por categoría.
+
+Cada categoría guarda el `publishedAt` más reciente que se examinó de GNews.
+La próxima ejecución lo manda como parámetro `from`, así la respuesta trae
+solo noticias publicadas desde entonces en lugar de los mismos titulares que
+ya están en la base. Como GNews entrega lo más reciente primero, la marca
+solo avanza cuando se examinó todo lo publicado desde la anterior (ver
+`iterar_noticias_por_categoria`). Las marcas se persisten en un JSON entre
+ejecuciones.
+
+Una noticia que se difiere (sin presupuesto o sin cuota de Gemini) no puede
+quedar detrás de la marca: `retener` la baja hasta justo antes de ella, así la
+próxima ejecución la vuelve a pedir aunque no esté en el diario.
+"""
+import os
+import json
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+FORMATO_FECHA_GNEWS = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def fecha_gnews(valor: Optional[str]) -> Optional[datetime]:
+    """`publishedAt` de GNews como datetime, o None si falta o no tiene el formato esperado."""
+    try:
+        return datetime.strptime(valor, FORMATO_FECHA_GNEWS)
+    except (ValueError, TypeError):
+        return None
+
+
+class MarcasGNews:
+    """Marcas persistidas en un archivo JSON; seguro para usar desde varios hilos."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._marcas: Dict[str, str] = self._cargar()
+        self._iniciales: Dict[str, str] = dict(self._marcas)
+        self._topes: Dict[str, datetime] = {}  # Marca máxima por categoría según lo diferido en la ejecución
+
+    def _cargar(self) -> Dict[str, str]:
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                marcas = json.load(f)
+            return {categoria: marca for categoria, marca in marcas.items() if fecha_gnews(marca)}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Marcas de GNews ilegibles, se pide todo de nuevo: {e}")
+            return {}
+
+    def persistir(self):
+        with self._lock:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._marcas, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, self.ruta)
+
+    def desde(self, categoria: str) -> Optional[str]:
+        """
+        Valor para el parámetro `from` de `categoria`, o None si todavía no
+        hay marca. Es un segundo después de la marca porque `from` incluye el
+        instante exacto y la noticia de la marca ya se procesó.
+        """
+        with self._lock:
+            marca = fecha_gnews(self._marcas.get(categoria))
+        if marca is None:
+            return None
+        return (marca + timedelta(seconds=1)).strftime(FORMATO_FECHA_GNEWS)
+
+    def actualizar(self, categoria: str, articulos: Iterable[dict]):
+        """Avanza la marca al `publishedAt` más reciente de `articulos` (solo `retener` la hace retroceder)."""
+        fechas = [fecha for fecha in (fecha_gnews(a.get("publishedAt")) for a in articulos) if fecha]
+        if not fechas:
+            return
+        with self._lock:
+            actual = fecha_gnews(self._marcas.get(categoria))
+            nueva = max(fechas)
+            if categoria in self._topes:
+                nueva = min(nueva, self._topes[categoria])
+            if actual is None or nueva > actual:
+                self._marcas[categoria] = nueva.strftime(FORMATO_FECHA_GNEWS)
+
+    def comenzar_ejecucion(self):
+        """Toma las marcas actuales como punto de partida de la ejecución (ver `retener`)."""
+        with self._lock:
+            self._iniciales = dict(self._marcas)
+            self._topes = {}
+
+    def retener(self, categoria: Optional[str], publicada: Optional[str], con_diario: bool = True):
+        """
+        Baja la marca de `categoria` a un segundo antes de `publicada` (una
+        noticia diferida). Con `con_diario` nunca por debajo de la marca con la
+        que empezó la ejecución: lo anterior a esa marca ya viene retomado del
+        diario. Sin diario la marca es lo único que conserva la noticia, así
+        que baja lo necesario.
+        """
+        fecha = fecha_gnews(publicada)
+        if not categoria or fecha is None:
+            return
+        with self._lock:
+            inicial = fecha_gnews(self._iniciales.get(categoria))
+            if con_diario and inicial is not None and fecha <= inicial:
+                return
+            nueva = fecha - timedelta(seconds=1)
+            # El tope cubre también el caso en que la categoría todavía no terminó de avanzar su marca
+            self._topes[categoria] = min(nueva, self._topes.get(categoria, nueva))
+            actual = fecha_gnews(self._marcas.get(categoria))
+            if actual is not None and nueva < actual:
+                self._marcas[categoria] = nueva.strftime(FORMATO_FECHA_GNEWS)
+
+    def marcas(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._marcas)
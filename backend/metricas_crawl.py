@@ -0,0 +1,167 @@
+"""
+Métricas por etapa de una ejecución del crawler.
+
+Cada medición guarda la duración de una etapa (fetch de GNews, descarga,
+cada intento de extractor, validación, Gemini, escritura en Supabase) y,
+si corresponde, el dominio del medio. El reporte resume p50/p95 por etapa y
+por dominio, más los tokens consumidos en Gemini, para ver qué etapa y qué
+medios dominan el tiempo de crawl a lo largo de varias ejecuciones.
+"""
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+MAX_DOMINIOS_REPORTE = 20
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+def _resumen_duraciones(duraciones: List[float], fallos: int) -> Dict[str, Any]:
+    ordenadas = sorted(duraciones)
+    return {
+        "n": len(ordenadas),
+        "fallos": fallos,
+        "total_s": round(sum(ordenadas), 3),
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 1),
+        "p95_ms": round(percentil(ordenadas, 95) * 1000, 1),
+        "max_ms": round(ordenadas[-1] * 1000, 1) if ordenadas else 0.0,
+    }
+
+
+class Medicion:
+    """Resultado de una medición en curso; la etapa puede marcarla como fallida."""
+
+    def __init__(self):
+        self.exito = True
+
+
+class MetricasCrawl:
+    """Acumulador de mediciones seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.iniciado = time.time()
+            self._por_etapa: Dict[str, List[float]] = {}
+            self._por_dominio: Dict[str, Dict[str, List[float]]] = {}
+            self._fallos: Dict[tuple, int] = {}
+            self.tokens = {"requests": 0, "entrada": 0, "salida": 0, "total": 0}
+
+    def registrar(self, etapa: str, segundos: float, dominio: Optional[str] = None, exito: bool = True):
+        with self._lock:
+            self._por_etapa.setdefault(etapa, []).append(segundos)
+            if dominio:
+                self._por_dominio.setdefault(dominio, {}).setdefault(etapa, []).append(segundos)
+            if not exito:
+                self._fallos[(etapa, None)] = self._fallos.get((etapa, None), 0) + 1
+                if dominio:
+                    self._fallos[(etapa, dominio)] = self._fallos.get((etapa, dominio), 0) + 1
+
+    @contextmanager
+    def medir(self, etapa: str, dominio: Optional[str] = None):
+        """Mide el bloque; si lanza una excepción se registra como fallo."""
+        medicion = Medicion()
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        except BaseException:
+            medicion.exito = False
+            raise
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio, dominio, medicion.exito)
+
+    def percentil_etapa(self, etapa: str, p: float) -> Optional[float]:
+        """Percentil `p` (en segundos) de lo que viene tardando `etapa`; None sin mediciones."""
+        with self._lock:
+            duraciones = self._por_etapa.get(etapa)
+            if not duraciones:
+                return None
+            return percentil(sorted(duraciones), p)
+
+    def sumar_tokens(self, uso):
+        """Suma el `usage_metadata` de una respuesta de Gemini (si vino)."""
+        if uso is None:
+            return
+        with self._lock:
+            self.tokens["requests"] += 1
+            self.tokens["entrada"] += getattr(uso, "prompt_token_count", 0) or 0
+            self.tokens["salida"] += getattr(uso, "candidates_token_count", 0) or 0
+            self.tokens["total"] += getattr(uso, "total_token_count", 0) or 0
+
+    def reporte(self) -> Dict[str, Any]:
+        with self._lock:
+            etapas = {
+                etapa: _resumen_duraciones(duraciones, self._fallos.get((etapa, None), 0))
+                for etapa, duraciones in self._por_etapa.items()
+            }
+            # Solo los dominios que más tiempo consumieron, para acotar el tamaño del reporte
+            totales = {
+                dominio: sum(sum(d) for d in por_etapa.values())
+                for dominio, por_etapa in self._por_dominio.items()
+            }
+            principales = sorted(totales, key=totales.get, reverse=True)[:MAX_DOMINIOS_REPORTE]
+            dominios = {
+                dominio: {
+                    etapa: _resumen_duraciones(duraciones, self._fallos.get((etapa, dominio), 0))
+                    for etapa, duraciones in self._por_dominio[dominio].items()
+                }
+                for dominio in principales
+            }
+            return {
+                "duracion_s": round(time.time() - self.iniciado, 3),
+                "etapas": etapas,
+                "dominios": dominios,
+                "tokens_gemini": dict(self.tokens),
+            }
+
+
+def agregar_reportes(reportes: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Suma los reportes de varias ejecuciones: tiempo total y mediciones por
+    etapa y por dominio, ordenados de mayor a menor tiempo.
+    """
+    etapas: Dict[str, Dict[str, float]] = {}
+    dominios: Dict[str, Dict[str, float]] = {}
+    tokens = {"requests": 0, "entrada": 0, "salida": 0, "total": 0}
+    ejecuciones = 0
+
+    for reporte in reportes:
+        if not reporte:
+            continue
+        ejecuciones += 1
+        for etapa, datos in (reporte.get("etapas") or {}).items():
+            acumulado = etapas.setdefault(etapa, {"total_s": 0.0, "n": 0, "fallos": 0})
+            acumulado["total_s"] += datos.get("total_s", 0)
+            acumulado["n"] += datos.get("n", 0)
+            acumulado["fallos"] += datos.get("fallos", 0)
+        for dominio, por_etapa in (reporte.get("dominios") or {}).items():
+            acumulado = dominios.setdefault(dominio, {"total_s": 0.0, "n": 0})
+            for datos in por_etapa.values():
+                acumulado["total_s"] += datos.get("total_s", 0)
+                acumulado["n"] += datos.get("n", 0)
+        for clave in tokens:
+            tokens[clave] += (reporte.get("tokens_gemini") or {}).get(clave, 0)
+
+    def ordenar(valores):
+        return dict(sorted(
+            ((k, {**v, "total_s": round(v["total_s"], 3)}) for k, v in valores.items()),
+            key=lambda item: item[1]["total_s"], reverse=True
+        ))
+
+    return {
+        "ejecuciones": ejecuciones,
+        "etapas": ordenar(etapas),
+        "dominios": dict(list(ordenar(dominios).items())[:MAX_DOMINIOS_REPORTE]),
+        "tokens_gemini": tokens,
+    }
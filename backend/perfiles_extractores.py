@@ -0,0 +1,119 @@
+"""
+Perfiles de extracción por dominio.
+
+Para un mismo medio casi siempre gana el mismo método (y el mismo selector).
+El perfil guarda, por dominio, cuántas veces se intentó cada método, cuántas
+funcionó, y qué selectores dieron resultado. El orden de METODOS es de
+precisión y se respeta: el perfil solo saltea los métodos que nunca
+funcionan en el dominio (reintentándolos cada tanto por si el sitio cambió)
+y, con suficientes intentos, puede anteponer selectores a trafilatura. Los
+fallbacks (párrafos y regex) nunca pasan adelante de un método preciso,
+porque casi siempre devuelven algo y el dominio quedaría atado al peor
+extractor.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+METODOS = ("trafilatura", "selectores", "parrafos", "regex")  # De más a menos preciso
+METODOS_PRECISOS = ("trafilatura", "selectores")
+MIN_INTENTOS_PARA_SALTEAR = 4   # Fallos seguidos sin un solo éxito antes de saltear un método
+REINTENTAR_CADA = 15            # Cada cuántos salteos se vuelve a probar el método
+MIN_INTENTOS_PARA_REORDENAR = 8  # Intentos de cada método preciso antes de cambiar su orden
+
+
+class PerfilesExtractores:
+    """Perfiles persistidos en un archivo JSON; seguro para usar desde varios hilos."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._perfiles: Dict[str, Dict[str, Any]] = self._cargar()
+
+    def _cargar(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ Perfiles de extractores ilegibles, se empieza vacío: {e}")
+            return {}
+
+    def persistir(self):
+        with self._lock:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._perfiles, f, ensure_ascii=False)
+            os.replace(temporal, self.ruta)
+
+    def _perfil(self, dominio: str) -> Dict[str, Any]:
+        return self._perfiles.setdefault(dominio, {"metodos": {}, "selectores": {}})
+
+    @staticmethod
+    def _tasa_exito(estadistica: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Tasa de éxito, o None si el método todavía no tiene MIN_INTENTOS_PARA_REORDENAR intentos."""
+        if not estadistica or estadistica.get("intentos", 0) < MIN_INTENTOS_PARA_REORDENAR:
+            return None
+        return estadistica["exitos"] / estadistica["intentos"]
+
+    def orden_metodos(self, dominio: str) -> List[str]:
+        """
+        Métodos a probar para `dominio`, en el orden de precisión de METODOS.
+
+        Un método con al menos MIN_INTENTOS_PARA_SALTEAR intentos y ningún
+        éxito se omite, salvo una vez cada REINTENTAR_CADA salteos. Entre los
+        métodos precisos, selectores pasa adelante de trafilatura solo si los
+        dos tienen MIN_INTENTOS_PARA_REORDENAR intentos y selectores funciona
+        más seguido; los fallbacks quedan siempre al final.
+        """
+        with self._lock:
+            perfil = self._perfil(dominio)
+            metodos = []
+            for metodo in METODOS:
+                estadistica = perfil["metodos"].get(metodo)
+                if estadistica and estadistica["exitos"] == 0 and estadistica["intentos"] >= MIN_INTENTOS_PARA_SALTEAR:
+                    estadistica["salteos"] = estadistica.get("salteos", 0) + 1
+                    if estadistica["salteos"] < REINTENTAR_CADA:
+                        continue
+                    estadistica["salteos"] = 0
+                metodos.append(metodo)
+
+            if all(m in metodos for m in METODOS_PRECISOS):
+                tasas = [self._tasa_exito(perfil["metodos"].get(m)) for m in METODOS_PRECISOS]
+                if None not in tasas and tasas[1] > tasas[0]:
+                    metodos[0], metodos[1] = metodos[1], metodos[0]
+            return metodos
+
+    def orden_selectores(self, dominio: str, selectores: List[str]) -> List[str]:
+        """Los selectores que funcionaron en el dominio primero (por cantidad de éxitos)."""
+        with self._lock:
+            exitos = self._perfil(dominio)["selectores"]
+        return sorted(selectores, key=lambda s: -exitos.get(s, 0))
+
+    def registrar(self, dominio: str, metodo: str, exito: bool, selector: Optional[str] = None):
+        with self._lock:
+            perfil = self._perfil(dominio)
+            estadistica = perfil["metodos"].setdefault(metodo, {"intentos": 0, "exitos": 0})
+            estadistica.pop("palabras_promedio", None)  # Perfiles viejos: ya no se usa
+            estadistica["intentos"] += 1
+            if exito:
+                estadistica["exitos"] += 1
+                if selector:
+                    perfil["selectores"][selector] = perfil["selectores"].get(selector, 0) + 1
+            perfil["actualizado"] = time.time()
+
+    def perfil(self, dominio: str) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._perfil(dominio)))
+
+    def __len__(self) -> int:
+        return len(self._perfiles)
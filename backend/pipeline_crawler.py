@@ -0,0 +1,136 @@
+import queue
+import logging
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()
+
+
+class Etapa:
+    """
+    Etapa del pipeline: una función aplicada por `workers` hilos en paralelo.
+
+    La función recibe un elemento y devuelve el elemento para la etapa
+    siguiente, o None si el elemento se descarta (la propia etapa es
+    responsable de contabilizar el motivo).
+
+    Con `tam_lote` > 1 la función recibe una lista de hasta `tam_lote`
+    elementos (los que lleguen en `espera_lote` segundos) y devuelve una
+    lista de resultados en el mismo orden. Si la función de lote lanza una
+    excepción, `al_fallar` se llama para todos los elementos del lote: una
+    función que ya contabilizó algunos debe manejar sus errores por elemento.
+    """
+
+    def __init__(self, nombre: str, funcion: Callable[[Any], Any], workers: int = 1,
+                 tam_lote: int = 1, espera_lote: float = 0.5):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.workers = max(1, int(workers))
+        self.tam_lote = max(1, int(tam_lote))
+        self.espera_lote = espera_lote
+
+
+class PipelineConcurrente:
+    """
+    Ejecuta etapas encadenadas con colas acotadas entre ellas.
+
+    Cada etapa tiene su propio pool de hilos, de modo que mientras se resume
+    el artículo N ya se está scrapeando el N+1. Las colas acotadas aplican
+    backpressure: si una etapa lenta se llena, las anteriores se frenan en
+    lugar de acumular trabajo en memoria.
+    """
+
+    def __init__(self, etapas: List[Etapa], tam_cola: int = 8,
+                 al_fallar: Optional[Callable[[Any, Etapa, Exception], None]] = None):
+        if not etapas:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.etapas = etapas
+        self.tam_cola = max(1, int(tam_cola))
+        self.al_fallar = al_fallar
+
+    def ejecutar(self, entradas: Iterable[Any]):
+        """Procesa todas las entradas y bloquea hasta que terminen todas las etapas."""
+        colas = [queue.Queue(maxsize=self.tam_cola) for _ in self.etapas]
+        activos = [etapa.workers for etapa in self.etapas]
+        lock = threading.Lock()
+
+        def tomar_lote(cola: queue.Queue, etapa: Etapa):
+            """Devuelve (lote, terminar). Espera el primer elemento sin límite."""
+            item = cola.get()
+            if item is _FIN:
+                return [], True
+            lote = [item]
+            limite = time.monotonic() + etapa.espera_lote
+            while len(lote) < etapa.tam_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _FIN:
+                    return lote, True
+                lote.append(item)
+            return lote, False
+
+        def fallar(item: Any, etapa: Etapa, error: Exception):
+            if not self.al_fallar:
+                return
+            try:
+                self.al_fallar(item, etapa, error)
+            except Exception:
+                # Un error al registrar el fallo no puede matar al worker: ejecutar() quedaría esperando
+                logger.exception(f"Error en al_fallar de la etapa {etapa.nombre}")
+
+        def worker(indice: int):
+            etapa = self.etapas[indice]
+            es_ultima = indice == len(self.etapas) - 1
+
+            try:
+                terminar = False
+                while not terminar:
+                    lote, terminar = tomar_lote(colas[indice], etapa)
+                    if not lote:
+                        continue
+                    try:
+                        if etapa.tam_lote > 1:
+                            resultados = etapa.funcion(lote)
+                        else:
+                            resultados = [etapa.funcion(lote[0])]
+                    except Exception as e:
+                        for item in lote:
+                            fallar(item, etapa, e)
+                        continue
+                    if not es_ultima:
+                        for resultado in resultados:
+                            if resultado is not None:
+                                colas[indice + 1].put(resultado)
+            finally:
+                # El último worker en salir avisa a la etapa siguiente
+                with lock:
+                    activos[indice] -= 1
+                    ultimo = activos[indice] == 0
+                if ultimo and not es_ultima:
+                    for _ in range(self.etapas[indice + 1].workers):
+                        colas[indice + 1].put(_FIN)
+
+        hilos = []
+        for indice, etapa in enumerate(self.etapas):
+            for n in range(etapa.workers):
+                hilo = threading.Thread(target=worker, args=(indice,),
+                                        name=f"pipeline-{etapa.nombre}-{n}", daemon=True)
+                hilo.start()
+                hilos.append(hilo)
+
+        try:
+            for item in entradas:
+                colas[0].put(item)
+        finally:
+            for _ in range(self.etapas[0].workers):
+                colas[0].put(_FIN)
+            for hilo in hilos:
+                hilo.join()
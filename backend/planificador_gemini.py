@@ -0,0 +1,255 @@
+"""
+Cuota de Gemini y valor de cada artículo para repartirla.
+
+`CuotaGemini` modela los dos límites de la API: requests por día (se
+reinicia a medianoche de la zona de la cuota, la del Pacífico para Gemini) y
+requests por minuto (ventana deslizante de 60 s). El uso del día se persiste
+en un JSON después de cada reserva, así lo comparten las ejecuciones del
+crawler de un mismo día aunque una se corte a la mitad. El límite por minuto
+solo hace esperar; cuando la cuota diaria se agota, `reservar` devuelve False
+y el crawler difiere el artículo en lugar de guardarlo con un resumen de
+respaldo.
+
+`valor_articulo` y `ordenar_por_valor` deciden en qué se gasta la cuota
+cuando no alcanza para todo: primero lo más reciente y de los medios y
+categorías que más clics reciben, intercalando categorías para que ninguna
+se quede sin noticias nuevas.
+"""
+import os
+import json
+import math
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+try:
+    from google.api_core.exceptions import TooManyRequests  # ResourceExhausted hereda de esta
+except ImportError:  # llega con google-generativeai; sin él solo se mira el código de estado
+    TooManyRequests = None
+
+logger = logging.getLogger(__name__)
+
+VIDA_MEDIA_FRESCURA_HORAS = 12.0  # A las 12 h una noticia vale la mitad que una recién publicada
+MIN_NOTICIAS_POPULARIDAD = 3      # Noticias de un medio necesarias para confiar en su promedio de clics
+FACTOR_POPULARIDAD_MIN = 0.25
+FACTOR_POPULARIDAD_MAX = 4.0
+BONUS_CATEGORIA_PRIORITARIA = 1.5
+
+
+class SinCuotaGemini(Exception):
+    """No queda cuota de Gemini para este request: el artículo se difiere."""
+
+
+class CuotaGemini:
+    """Presupuesto diario y por minuto de requests a Gemini, seguro para usar desde varios hilos."""
+
+    def __init__(self, ruta: str, por_dia: int, por_minuto: int, zona: str = "America/Los_Angeles"):
+        self.ruta = ruta
+        self.por_dia = por_dia
+        self.por_minuto = por_minuto
+        self.zona = ZoneInfo(zona)
+        self._lock = threading.Lock()
+        self._ventana = deque()
+        self._pausa_hasta = 0.0
+        self._esperas = 0
+        self._rechazados = 0
+        self._dia, self._usados, self._agotada = self._cargar()
+
+    def _hoy(self) -> str:
+        return datetime.now(self.zona).date().isoformat()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            if datos.get("dia") == self._hoy():
+                return datos["dia"], int(datos.get("usados", 0)), bool(datos.get("agotada"))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Uso de cuota de Gemini ilegible, se empieza de cero: {e}")
+        return self._hoy(), 0, False
+
+    def persistir(self):
+        with self._lock:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({"dia": self._dia, "usados": self._usados, "agotada": self._agotada}, f)
+            os.replace(temporal, self.ruta)
+
+    def _renovar_dia(self):
+        hoy = self._hoy()
+        if hoy != self._dia:
+            self._dia, self._usados, self._agotada = hoy, 0, False
+
+    def restantes_hoy(self) -> int:
+        with self._lock:
+            self._renovar_dia()
+            return 0 if self._agotada else max(0, self.por_dia - self._usados)
+
+    def reservar(self) -> bool:
+        """
+        Reserva un request y guarda el uso. Si la ventana por minuto está
+        llena (o hay una pausa por 429) espera el lugar: eso es solo ritmo, no
+        falta de cuota. Devuelve False únicamente si no queda cuota diaria.
+        """
+        while True:
+            with self._lock:
+                self._renovar_dia()
+                if self._agotada or self._usados >= self.por_dia:
+                    self._rechazados += 1
+                    return False
+                ahora = time.monotonic()
+                while self._ventana and ahora - self._ventana[0] >= 60:
+                    self._ventana.popleft()
+                espera = self._pausa_hasta - ahora
+                if len(self._ventana) >= self.por_minuto:
+                    espera = max(espera, 60 - (ahora - self._ventana[0]))
+                if espera <= 0:
+                    self._ventana.append(ahora)
+                    self._usados += 1
+                    break
+                self._esperas += 1
+            time.sleep(espera)
+        self._guardar()
+        return True
+
+    def agotar_dia(self):
+        """Gemini respondió que la cuota diaria se terminó, aunque el conteo local no llegara."""
+        with self._lock:
+            self._agotada = True
+        self._guardar()
+
+    def _guardar(self):
+        """`persistir` sin cortar el request si el disco falla: el uso se vuelve a guardar al final."""
+        try:
+            self.persistir()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el uso de cuota de Gemini: {e}")
+
+    def pausar(self, segundos: float):
+        """Detiene las reservas (p. ej. tras un 429 por minuto)."""
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            self._renovar_dia()
+            return {
+                "dia": self._dia,
+                "por_dia": self.por_dia,
+                "por_minuto": self.por_minuto,
+                "usados_hoy": self._usados,
+                "restantes_hoy": 0 if self._agotada else max(0, self.por_dia - self._usados),
+                "agotada": self._agotada,
+                "esperas_por_minuto": self._esperas,
+                "rechazados": self._rechazados,
+            }
+
+
+def es_error_de_cuota(error: Exception) -> bool:
+    """
+    Un 429 / ResourceExhausted de Gemini, por el tipo de la excepción o su
+    código de estado (no por el texto: un id o una URL con "429" no cuenta).
+    """
+    if TooManyRequests is not None and isinstance(error, TooManyRequests):
+        return True
+    for atributo in ("code", "status_code"):
+        codigo = getattr(error, atributo, None)
+        if callable(codigo):  # los errores de grpc exponen code() como método
+            try:
+                codigo = codigo()
+            except Exception:
+                continue
+        if isinstance(codigo, int) and codigo == 429:
+            return True
+    return False
+
+
+def es_cuota_diaria(error: Exception) -> bool:
+    """El 429 es por la cuota diaria (y no por la de por minuto)."""
+    return "PerDay" in str(error)
+
+
+class PopularidadEsperada:
+    """
+    Clics esperados de una noticia nueva según lo que recibieron las
+    recientes del mismo medio (o, con pocas noticias del medio, de la misma
+    categoría), relativo al promedio general.
+    """
+
+    def __init__(self, filas: Iterable[Dict[str, Any]]):
+        fuentes: Dict[str, List[int]] = {}
+        categorias: Dict[str, List[int]] = {}
+        total = []
+        for fila in filas:
+            clics = fila.get("clics") or 0
+            total.append(clics)
+            fuentes.setdefault(fila.get("fuente") or "", []).append(clics)
+            categorias.setdefault(fila.get("categoria") or "", []).append(clics)
+        self._promedio = sum(total) / len(total) if total else 0.0
+        self._fuentes = {f: sum(c) / len(c) for f, c in fuentes.items() if len(c) >= MIN_NOTICIAS_POPULARIDAD}
+        self._categorias = {c: sum(v) / len(v) for c, v in categorias.items() if v}
+
+    def factor(self, art: Dict[str, Any]) -> float:
+        """1.0 = como el promedio; sin historial de clics todo vale 1.0."""
+        if self._promedio <= 0:
+            return 1.0
+        fuente = (art.get("source") or {}).get("name") or ""
+        esperado = self._fuentes.get(fuente, self._categorias.get(art.get("categoria_asignada") or ""))
+        if esperado is None:
+            return 1.0
+        return min(FACTOR_POPULARIDAD_MAX, max(FACTOR_POPULARIDAD_MIN, esperado / self._promedio))
+
+
+def valor_articulo(art: Dict[str, Any], popularidad: Optional[PopularidadEsperada] = None,
+                   categorias_prioritarias: Iterable[str] = (), ahora: Optional[datetime] = None) -> float:
+    """Frescura (decae a la mitad cada VIDA_MEDIA_FRESCURA_HORAS) por popularidad esperada."""
+    ahora = ahora or datetime.now(timezone.utc)
+    try:
+        publicada = datetime.strptime(art.get("publishedAt"), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        horas = max(0.0, (ahora - publicada).total_seconds() / 3600)
+    except (ValueError, TypeError):
+        horas = 2 * VIDA_MEDIA_FRESCURA_HORAS
+    valor = math.pow(0.5, horas / VIDA_MEDIA_FRESCURA_HORAS)
+    if popularidad is not None:
+        valor *= popularidad.factor(art)
+    if art.get("categoria_asignada") in categorias_prioritarias:
+        valor *= BONUS_CATEGORIA_PRIORITARIA
+    return valor
+
+
+def ordenar_por_valor(trabajos: Iterable[Dict[str, Any]], popularidad: Optional[PopularidadEsperada] = None,
+                      categorias_prioritarias: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Ordena los trabajos por valor intercalando categorías: en cada vuelta
+    entra el mejor pendiente de cada categoría (la de mejor candidato
+    primero). Así, si la cuota se corta, todas las categorías tienen su
+    noticia más valiosa antes de que alguna tenga la segunda.
+    """
+    categorias_prioritarias = set(categorias_prioritarias)
+    ahora = datetime.now(timezone.utc)
+    por_categoria: Dict[str, List] = {}
+    for trabajo in trabajos:
+        art = trabajo["art"]
+        valor = valor_articulo(art, popularidad, categorias_prioritarias, ahora)
+        por_categoria.setdefault(art.get("categoria_asignada") or "", []).append((valor, trabajo))
+    for candidatos in por_categoria.values():
+        candidatos.sort(key=lambda candidato: candidato[0], reverse=True)
+
+    ordenados = []
+    vuelta = 0
+    while True:
+        ronda = [candidatos[vuelta] for candidatos in por_categoria.values() if vuelta < len(candidatos)]
+        if not ronda:
+            return ordenados
+        ronda.sort(key=lambda candidato: candidato[0], reverse=True)
+        ordenados.extend(trabajo for _, trabajo in ronda)
+        vuelta += 1
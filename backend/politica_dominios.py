@@ -0,0 +1,227 @@
+"""
+Cortesía por dominio y circuit breaker para el scraping.
+
+Cada medio tiene su propio límite de descargas simultáneas y un intervalo
+mínimo entre requests, para no martillar a un mismo host desde varios hilos.
+Además se lleva la cuenta de fallos (timeouts, bloqueos, errores 5xx) en una
+ventana de los últimos resultados: si un dominio falla seguido su circuito se
+abre y durante el enfriamiento sus artículos no se descargan (se usa la
+descripción de GNews). Al vencer, una sola descarga de prueba decide si el
+circuito se cierra o vuelve a abrirse con el doble de enfriamiento.
+
+El estado de los circuitos se persiste en JSON para que un medio caído no
+vuelva a costar todos sus timeouts en la siguiente ejecución.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_HTTP_FALLO = (403, 429)  # Bloqueos del medio; además cuentan todos los 5xx
+
+
+class Turno:
+    """Descarga en curso dentro del turno de un dominio; el llamador marca si falló."""
+
+    def __init__(self):
+        self.exito = True
+
+
+class _EstadoDominio:
+    def __init__(self, ventana: int):
+        self.semaforo: Optional[threading.BoundedSemaphore] = None
+        self.ultimo_inicio = 0.0
+        self.resultados = deque(maxlen=ventana)
+        self.fallos_consecutivos = 0
+        self.abierto_hasta = 0.0      # time.time(); 0 = circuito cerrado
+        self.enfriamiento = 0.0
+        self.prueba_hasta = 0.0       # Reserva de la descarga de prueba (semiabierto)
+        self.saltados = 0
+
+
+class PlanificadorDominios:
+    """Límites por host y circuit breaker, seguro para usar desde varios hilos."""
+
+    def __init__(self, ruta: Optional[str] = None, max_concurrencia: int = 2,
+                 intervalo_minimo: float = 1.0, ventana: int = 10,
+                 max_fallos_consecutivos: int = 3, tasa_fallos: float = 0.6,
+                 min_muestras: int = 5, enfriamiento: float = 15 * 60,
+                 max_enfriamiento: float = 6 * 3600, segundos_prueba: float = 30,
+                 circuit_breaker: bool = True):
+        self.ruta = ruta
+        self.circuit_breaker = circuit_breaker
+        self.max_concurrencia = max(1, int(max_concurrencia))
+        self.intervalo_minimo = max(0.0, float(intervalo_minimo))
+        self.ventana = ventana
+        self.max_fallos_consecutivos = max_fallos_consecutivos
+        self.tasa_fallos = tasa_fallos
+        self.min_muestras = min_muestras
+        self.enfriamiento = enfriamiento
+        self.max_enfriamiento = max_enfriamiento
+        self.segundos_prueba = segundos_prueba
+
+        self._lock = threading.Lock()
+        self._dominios: Dict[str, _EstadoDominio] = {}
+        if ruta:
+            self._cargar()
+
+    # ------------------------------------------------------------ persistencia
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ Estado de circuitos ilegible, se empieza vacío: {e}")
+            return
+
+        for dominio, guardado in datos.items():
+            estado = self._estado(dominio)
+            estado.abierto_hasta = guardado.get("abierto_hasta", 0.0)
+            estado.enfriamiento = guardado.get("enfriamiento", 0.0)
+            estado.fallos_consecutivos = guardado.get("fallos_consecutivos", 0)
+
+    def persistir(self):
+        """Guarda solo los dominios con fallos o circuito abierto."""
+        if not self.ruta or not self.circuit_breaker:
+            return
+        with self._lock:
+            datos = {
+                dominio: {
+                    "abierto_hasta": estado.abierto_hasta,
+                    "enfriamiento": estado.enfriamiento,
+                    "fallos_consecutivos": estado.fallos_consecutivos,
+                }
+                for dominio, estado in self._dominios.items()
+                if estado.abierto_hasta or estado.fallos_consecutivos
+            }
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f)
+            os.replace(temporal, self.ruta)
+
+    # ------------------------------------------------------------------ estado
+
+    def _estado(self, dominio: str) -> _EstadoDominio:
+        estado = self._dominios.get(dominio)
+        if estado is None:
+            estado = self._dominios[dominio] = _EstadoDominio(self.ventana)
+        return estado
+
+    def permitir(self, dominio: str) -> bool:
+        """
+        Indica si se puede descargar de `dominio`.
+
+        Con el circuito abierto devuelve False hasta que vence el enfriamiento;
+        después deja pasar una única descarga de prueba cada `segundos_prueba`.
+        """
+        if not self.circuit_breaker:
+            return True
+        ahora = time.time()
+        with self._lock:
+            estado = self._estado(dominio)
+            if not estado.abierto_hasta:
+                return True
+            if ahora < estado.abierto_hasta or ahora < estado.prueba_hasta:
+                estado.saltados += 1
+                return False
+            estado.prueba_hasta = ahora + self.segundos_prueba
+            logger.info(f"🔌 Circuito de {dominio} semiabierto: descarga de prueba")
+            return True
+
+    def registrar(self, dominio: str, exito: bool):
+        with self._lock:
+            estado = self._estado(dominio)
+            estado.resultados.append(exito)
+
+            if exito:
+                if estado.abierto_hasta:
+                    logger.info(f"✅ Circuito de {dominio} cerrado")
+                estado.fallos_consecutivos = 0
+                estado.abierto_hasta = estado.prueba_hasta = 0.0
+                estado.enfriamiento = 0.0
+                return
+
+            estado.fallos_consecutivos += 1
+            if not self.circuit_breaker:
+                return
+            if time.time() < estado.abierto_hasta:
+                return  # Descargas que ya estaban en curso al abrirse el circuito
+            fallos = estado.resultados.count(False)
+            supera_tasa = (len(estado.resultados) >= self.min_muestras
+                           and fallos / len(estado.resultados) >= self.tasa_fallos)
+            # En semiabierto basta un fallo de la prueba para volver a abrir
+            if estado.abierto_hasta or supera_tasa or estado.fallos_consecutivos >= self.max_fallos_consecutivos:
+                estado.enfriamiento = min(self.max_enfriamiento,
+                                          estado.enfriamiento * 2 if estado.enfriamiento else self.enfriamiento)
+                estado.abierto_hasta = time.time() + estado.enfriamiento
+                estado.prueba_hasta = 0.0
+                logger.warning(f"⛔ Circuito de {dominio} abierto por {int(estado.enfriamiento)}s "
+                               f"({estado.fallos_consecutivos} fallos seguidos, {fallos}/{len(estado.resultados)} en la ventana)")
+
+    @contextmanager
+    def turno(self, dominio: str):
+        """
+        Reserva un lugar de descarga en `dominio`: respeta la concurrencia
+        máxima y el intervalo mínimo entre inicios. Una excepción dentro del
+        bloque cuenta como fallo; el llamador puede marcar `turno.exito = False`.
+        """
+        with self._lock:
+            estado = self._estado(dominio)
+            if estado.semaforo is None:
+                estado.semaforo = threading.BoundedSemaphore(self.max_concurrencia)
+            semaforo = estado.semaforo
+
+        with semaforo:
+            while True:
+                with self._lock:
+                    espera = estado.ultimo_inicio + self.intervalo_minimo - time.monotonic()
+                    if espera <= 0:
+                        estado.ultimo_inicio = time.monotonic()
+                        break
+                time.sleep(espera)
+
+            turno = Turno()
+            try:
+                yield turno
+            except BaseException:
+                turno.exito = False
+                raise
+            finally:
+                self.registrar(dominio, turno.exito)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        ahora = time.time()
+        with self._lock:
+            abiertos = {
+                dominio: {
+                    "reabre_en_s": max(0, int(estado.abierto_hasta - ahora)),
+                    "saltados": estado.saltados,
+                }
+                for dominio, estado in self._dominios.items()
+                if estado.abierto_hasta
+            }
+            saltados = sum(estado.saltados for estado in self._dominios.values())
+        return {"dominios": len(self._dominios), "circuitos_abiertos": abiertos, "articulos_saltados": saltados}
+
+    def reiniciar_contadores(self):
+        """Pone en cero los artículos saltados (al comenzar una ejecución)."""
+        with self._lock:
+            for estado in self._dominios.values():
+                estado.saltados = 0
+
+
+def es_respuesta_fallida(status_code: int) -> bool:
+    """Respuestas que indican bloqueo o caída del medio (no un 404 puntual)."""
+    return status_code in ESTADOS_HTTP_FALLO or status_code >= 500
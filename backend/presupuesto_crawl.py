@@ -0,0 +1,58 @@
+"""
+Presupuesto de tiempo de una ejecución del crawler.
+
+Con un presupuesto en segundos, antes de lanzar un scraping o una llamada a
+Gemini se compara lo que queda contra lo que esa etapa viene tardando (p90 de
+las métricas de la ejecución, o una estimación inicial si todavía no hay
+datos). Si no alcanza, el artículo se difiere: no se cuenta como fallido y,
+con el diario activo, queda pendiente para que la próxima ejecución lo retome.
+Se reserva un margen para el cierre (vaciar inserciones, purga, estadísticas).
+"""
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+MAX_DIFERIDOS_REPORTE = 50
+
+
+class PresupuestoCrawl:
+    """Plazo de una ejecución, seguro para usar desde varios hilos."""
+
+    def __init__(self, segundos: float, margen_cierre: float = 30.0):
+        self.segundos = float(segundos)
+        self.margen_cierre = float(margen_cierre)
+        self._inicio = time.monotonic()
+        self._lock = threading.Lock()
+        self._diferidos: List[Dict[str, Any]] = []
+        self._por_etapa: Dict[str, int] = {}
+
+    def transcurrido(self) -> float:
+        return time.monotonic() - self._inicio
+
+    def restante(self) -> float:
+        return self.segundos - self.transcurrido()
+
+    def alcanza(self, segundos_estimados: float) -> bool:
+        """Si queda tiempo para algo que tarda `segundos_estimados` y además para el cierre."""
+        return self.restante() - self.margen_cierre >= segundos_estimados
+
+    def diferir(self, etapa: str, titulo: Optional[str], url: Optional[str]):
+        with self._lock:
+            self._por_etapa[etapa] = self._por_etapa.get(etapa, 0) + 1
+            if len(self._diferidos) < MAX_DIFERIDOS_REPORTE:
+                self._diferidos.append({"etapa": etapa, "titulo": titulo, "url": url})
+
+    @property
+    def diferidos(self) -> int:
+        with self._lock:
+            return sum(self._por_etapa.values())
+
+    def reporte(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "segundos": self.segundos,
+                "usados": round(self.transcurrido(), 1),
+                "diferidos": sum(self._por_etapa.values()),
+                "diferidos_por_etapa": dict(self._por_etapa),
+                "articulos_diferidos": list(self._diferidos),
+            }
@@ -2,14 +2,39 @@ import os
 import requests
 from dotenv import load_dotenv
 import google.generativeai as genai
-from time import sleep
 from tqdm import tqdm
 from datetime import datetime
 import hashlib
+import json
+import multiprocessing
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import quote, urlsplit
+from requests.adapters import HTTPAdapter
 import db 
-from bs4 import BeautifulSoup
-import trafilatura
+from cache_paginas import CacheHTTPDisco, PaginaDescargada
+from cache_resumenes import CacheResumenes
+from config_crawler import (
+    CATEGORIAS, CUOTA_GEMINI_DIARIA, DIRECTORIO_CACHE, MAX_NOTICIAS_POR_CATEGORIA, MAX_PAGINAS_GNEWS
+)
+from calidad_contenido import puntuar_contenido, puntuar_lote
+from deduplicacion import DetectorCasiDuplicados
+from diario_crawl import DiarioCrawl
+from extractores import SELECTORES, extraer_cadena
+from limitador_tasa import LimitadorTokenBucket, calcular_backoff
+from marcas_gnews import MarcasGNews, fecha_gnews
+from metricas_crawl import MetricasCrawl
+from politica_dominios import PlanificadorDominios, es_respuesta_fallida
+from perfiles_extractores import METODOS as METODOS_EXTRACCION, PerfilesExtractores
+from pipeline_crawler import Etapa, PipelineConcurrente
+from planificador_gemini import (
+    CuotaGemini, PopularidadEsperada, SinCuotaGemini, es_cuota_diaria, es_error_de_cuota, ordenar_por_valor
+)
+from presupuesto_crawl import PresupuestoCrawl
 
 load_dotenv()
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
@@ -23,13 +48,6 @@ if not GNEWS_API_KEY or not GEMINI_API_KEY:
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel("gemini-2.5-flash")
 
-CATEGORIAS = {
-    "business": "Negocios", "entertainment": "Entretenimiento", "health": "Salud",
-    "science": "Ciencia", "sports": "Deportes", "technology": "Tecnología", "general": "General"
-}
-
-MAX_NOTICIAS_POR_CATEGORIA = 3  # Aumenté ligeramente para compensar filtros más flexibles
-TIEMPO_ESPERA_ENTRE_REQUESTS = 2
 MAX_PALABRAS_RESUMEN = 350
 MAX_PALABRAS_SCRAPING = 600
 MIN_PALABRAS_CONTENIDO_VALIDO = 30  # REDUCIDO de 50 a 30
@@ -45,6 +63,147 @@ RESUMENES_INVALIDOS = [
     "limitaciones técnicas"
 ]
 
+# Cuota de GNews: el token bucket reemplaza a los sleep fijos entre categorías
+GNEWS_REQUESTS_POR_SEGUNDO = float(os.getenv("GNEWS_REQUESTS_POR_SEGUNDO", "1"))
+GNEWS_RAFAGA = int(os.getenv("GNEWS_RAFAGA", "1"))
+MAX_REINTENTOS_GNEWS = 3
+FETCH_CATEGORIAS_CONCURRENTE = os.getenv("CRAWLER_FETCH_CONCURRENTE", "true").lower() == "true"
+MAX_WORKERS_GNEWS = int(os.getenv("CRAWLER_WORKERS_GNEWS", "4"))
+
+limitador_gnews = LimitadorTokenBucket(GNEWS_REQUESTS_POR_SEGUNDO, GNEWS_RAFAGA)
+
+# Fetch incremental: `from` = último publishedAt visto por categoría, y páginas hasta alcanzarlo
+MARCAS_GNEWS_ACTIVO = os.getenv("CRAWLER_MARCAS_GNEWS", "true").lower() == "true"
+
+# Pipeline scraping → resumen → inserción con un pool de hilos por etapa
+MODO_PIPELINE = os.getenv("CRAWLER_MODO_PIPELINE", "true").lower() == "true"
+WORKERS_SCRAPING = int(os.getenv("CRAWLER_WORKERS_SCRAPING", "4"))
+WORKERS_RESUMEN = int(os.getenv("CRAWLER_WORKERS_RESUMEN", "2"))
+WORKERS_INSERCION = int(os.getenv("CRAWLER_WORKERS_INSERCION", "1"))
+TAMANO_COLA_PIPELINE = int(os.getenv("CRAWLER_TAMANO_COLA", "8"))
+
+# Resúmenes por lotes: varios artículos por request a Gemini (solo en modo pipeline)
+RESUMEN_POR_LOTES = os.getenv("CRAWLER_RESUMEN_POR_LOTES", "true").lower() == "true"
+TAMANO_LOTE_RESUMEN = int(os.getenv("CRAWLER_TAMANO_LOTE_RESUMEN", "4"))
+ESPERA_LOTE_RESUMEN = float(os.getenv("CRAWLER_ESPERA_LOTE_RESUMEN", "3"))
+
+# Escrituras por lotes: un upsert por lote en vez de un insert por noticia
+TAMANO_LOTE_INSERCION = int(os.getenv("CRAWLER_TAMANO_LOTE_INSERCION", "10"))
+INTERVALO_FLUSH_INSERCION = float(os.getenv("CRAWLER_INTERVALO_FLUSH", "15"))
+
+# Scraping: una sesión keep-alive por host y timeouts explícitos (conexión, lectura)
+TIMEOUT_SCRAPING = (
+    float(os.getenv("SCRAPING_TIMEOUT_CONEXION", "4")),
+    float(os.getenv("SCRAPING_TIMEOUT_LECTURA", "10"))
+)
+HEADERS_SCRAPING = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+_sesiones_http = {}
+_lock_sesiones_http = threading.Lock()
+
+# Extracción (trafilatura/lxml, CPU) en un pool de procesos para usar todos los núcleos; 0 = en los hilos de scraping
+PROCESOS_EXTRACCION = int(os.getenv("CRAWLER_PROCESOS_EXTRACCION", "0"))
+_pool = None
+_lock_pool = threading.Lock()
+
+# Caché en disco del HTML scrapeado (re-ejecuciones de /procesar casi sin red)
+CACHE_PAGINAS_ACTIVO = os.getenv("CRAWLER_CACHE_PAGINAS", "true").lower() == "true"
+CACHE_PAGINAS_DIR = os.getenv("CRAWLER_CACHE_DIR", os.path.join(DIRECTORIO_CACHE, "paginas"))
+CACHE_PAGINAS_TTL = int(os.getenv("CRAWLER_CACHE_TTL", str(6 * 3600)))
+CACHE_PAGINAS_MAX_MB = int(os.getenv("CRAWLER_CACHE_MAX_MB", "200"))
+
+# Caché de resúmenes por hash del texto: evita re-resumir notas de agencia repetidas.
+# Subir VERSION_PROMPT_RESUMEN al cambiar el prompt invalida las entradas viejas.
+VERSION_PROMPT_RESUMEN = "v1"
+CACHE_RESUMENES_ACTIVO = os.getenv("CRAWLER_CACHE_RESUMENES", "true").lower() == "true"
+CACHE_RESUMENES_RUTA = os.getenv("CRAWLER_CACHE_RESUMENES_RUTA", os.path.join(DIRECTORIO_CACHE, "resumenes.sqlite3"))
+CACHE_RESUMENES_MAX_ENTRADAS = int(os.getenv("CRAWLER_CACHE_RESUMENES_MAX", "5000"))
+
+cache_paginas = CacheHTTPDisco(
+    CACHE_PAGINAS_DIR,
+    ttl_segundos=CACHE_PAGINAS_TTL,
+    max_bytes=CACHE_PAGINAS_MAX_MB * 1024 * 1024
+) if CACHE_PAGINAS_ACTIVO else None
+
+cache_resumenes = CacheResumenes(
+    CACHE_RESUMENES_RUTA,
+    version_prompt=VERSION_PROMPT_RESUMEN,
+    max_entradas=CACHE_RESUMENES_MAX_ENTRADAS
+) if CACHE_RESUMENES_ACTIVO else None
+
+# Tiempos por etapa y por dominio de la ejecución en curso (se persisten en crawl_runs)
+metricas_crawl = MetricasCrawl()
+
+# Purga de retención: lotes ordenados por fecha con tiempo máximo por ejecución
+TAMANO_LOTE_PURGA = int(os.getenv("CRAWLER_PURGA_LOTE", "500"))
+MAX_SEGUNDOS_PURGA = float(os.getenv("CRAWLER_PURGA_MAX_SEGUNDOS", "30"))
+
+# Mantenimiento sobre toda la tabla (limpieza de resúmenes inválidos, purga, estadísticas, clics para
+# la popularidad e índice de deduplicación completo). Los crawls de pocas categorías lo hacen como
+# mucho cada HORAS_MANTENIMIENTO_PARCIAL y, si no, deduplican contra las noticias de los últimos días.
+HORAS_MANTENIMIENTO_PARCIAL = float(os.getenv("CRAWLER_HORAS_MANTENIMIENTO", "6"))
+MANTENIMIENTO_RUTA = os.getenv("CRAWLER_MANTENIMIENTO_RUTA", os.path.join(DIRECTORIO_CACHE, "mantenimiento_crawl.json"))
+DIAS_INDICE_PARCIAL = int(os.getenv("CRAWLER_DIAS_INDICE_PARCIAL", "7"))
+
+# Diario de checkpoints: una ejecución interrumpida se reanuda sin repetir scraping ni Gemini
+DIARIO_CRAWL_ACTIVO = os.getenv("CRAWLER_DIARIO", "true").lower() == "true"
+DIARIO_CRAWL_RUTA = os.getenv("CRAWLER_DIARIO_RUTA", os.path.join(DIRECTORIO_CACHE, "diario_crawl.sqlite3"))
+DIARIO_CRAWL_MAX_HORAS_REANUDAR = float(os.getenv("CRAWLER_DIARIO_MAX_HORAS", "12"))
+
+# Perfil por dominio de qué extractor/selector funciona (orden adaptativo entre ejecuciones)
+PERFILES_EXTRACTORES_ACTIVO = os.getenv("CRAWLER_PERFILES_EXTRACTORES", "true").lower() == "true"
+PERFILES_EXTRACTORES_RUTA = os.getenv("CRAWLER_PERFILES_EXTRACTORES_RUTA", os.path.join(DIRECTORIO_CACHE, "perfiles_extractores.json"))
+
+perfiles_extractores = PerfilesExtractores(PERFILES_EXTRACTORES_RUTA) if PERFILES_EXTRACTORES_ACTIVO else None
+
+MARCAS_GNEWS_RUTA = os.getenv("CRAWLER_MARCAS_GNEWS_RUTA", os.path.join(DIRECTORIO_CACHE, "marcas_gnews.json"))
+marcas_gnews = MarcasGNews(MARCAS_GNEWS_RUTA) if MARCAS_GNEWS_ACTIVO else None
+
+# Cortesía por dominio (concurrencia e intervalo por host) y circuit breaker de medios que fallan
+CIRCUIT_BREAKER_ACTIVO = os.getenv("CRAWLER_CIRCUIT_BREAKER", "true").lower() == "true"
+CIRCUIT_BREAKER_RUTA = os.getenv("CRAWLER_CIRCUIT_BREAKER_RUTA", os.path.join(DIRECTORIO_CACHE, "circuitos_dominios.json"))
+MAX_DESCARGAS_POR_DOMINIO = int(os.getenv("SCRAPING_MAX_POR_DOMINIO", "2"))
+INTERVALO_MINIMO_DOMINIO = float(os.getenv("SCRAPING_INTERVALO_DOMINIO", "1"))
+ENFRIAMIENTO_CIRCUITO = float(os.getenv("CRAWLER_ENFRIAMIENTO_CIRCUITO", str(15 * 60)))
+
+planificador_dominios = PlanificadorDominios(
+    CIRCUIT_BREAKER_RUTA,
+    max_concurrencia=MAX_DESCARGAS_POR_DOMINIO,
+    intervalo_minimo=INTERVALO_MINIMO_DOMINIO,
+    enfriamiento=ENFRIAMIENTO_CIRCUITO,
+    circuit_breaker=CIRCUIT_BREAKER_ACTIVO
+)
+
+# Presupuesto de tiempo por ejecución (0 = sin límite): lo que no entra se difiere a la próxima
+PRESUPUESTO_CRAWL_SEGUNDOS = float(os.getenv("CRAWLER_PRESUPUESTO_SEGUNDOS", "0"))
+MARGEN_CIERRE_PRESUPUESTO = float(os.getenv("CRAWLER_MARGEN_CIERRE", "30"))
+# Estimaciones hasta que la ejecución tenga mediciones propias
+ESTIMACION_INICIAL_SCRAPING = sum(TIMEOUT_SCRAPING)
+ESTIMACION_INICIAL_GEMINI = 15.0
+# Categorías (nombres de la API) que se procesan primero cuando hay presupuesto
+PRIORIDAD_CATEGORIAS = [c.strip() for c in os.getenv("CRAWLER_PRIORIDAD_CATEGORIAS", "general").split(",") if c.strip()]
+
+# Cuota de Gemini (requests por día y por minuto): sin cuota el artículo se difiere, no se degrada
+CUOTA_GEMINI_POR_MINUTO = int(os.getenv("GEMINI_CUOTA_POR_MINUTO", "10"))
+CUOTA_GEMINI_ZONA = os.getenv("GEMINI_CUOTA_ZONA", "America/Los_Angeles")
+CUOTA_GEMINI_RUTA = os.getenv("CRAWLER_CUOTA_GEMINI_RUTA", os.path.join(DIRECTORIO_CACHE, "cuota_gemini.json"))
+PAUSA_429_GEMINI = 30.0
+DIAS_POPULARIDAD = 30  # Ventana de clics para estimar la popularidad por medio y categoría
+
+cuota_gemini = CuotaGemini(CUOTA_GEMINI_RUTA, CUOTA_GEMINI_DIARIA, CUOTA_GEMINI_POR_MINUTO, CUOTA_GEMINI_ZONA)
+
+# Casi-duplicados (MinHash + LSH) sobre títulos, descripciones y texto scrapeado
+DETECCION_CASI_DUPLICADOS = os.getenv("CRAWLER_CASI_DUPLICADOS", "true").lower() == "true"
+UMBRAL_CASI_DUPLICADO_TITULO = float(os.getenv("CRAWLER_UMBRAL_TITULO", "0.85"))
+UMBRAL_CASI_DUPLICADO_TEXTO = float(os.getenv("CRAWLER_UMBRAL_TEXTO", "0.8"))
+DIAS_VENTANA_CASI_DUPLICADOS = int(os.getenv("CRAWLER_DIAS_CASI_DUPLICADOS", "3"))
+
 def generar_hash_titulo(titulo):
     return hashlib.md5(titulo.strip().lower().encode('utf-8')).hexdigest()
 
@@ -53,181 +212,472 @@ def limpiar_noticias_existentes_invalidas():
     print("🧹 Buscando noticias existentes con resúmenes inválidos...")
     
     try:
-        todas_noticias = db.get_noticias(limit=1000)
+        # El filtro por patrón y el borrado por lotes de ids corren en Supabase
+        resultado = db.eliminar_noticias_por_patrones(RESUMENES_INVALIDOS, columna="resumen")
         
-        noticias_invalidas = []
-        
-        for noticia in todas_noticias:
-            resumen = noticia.get('resumen', '')
-            
-            if any(invalido.lower() in resumen.lower() for invalido in RESUMENES_INVALIDOS):
-                noticias_invalidas.append(noticia['id'])
-                print(f"🚫 Encontrada noticia inválida: ID {noticia['id']} - {noticia['titulo'][:50]}...")
-        
-        if noticias_invalidas:
-            print(f"🗑️  Eliminando {len(noticias_invalidas)} noticias con resúmenes inválidos...")
-            
-            eliminadas_exitosas = 0
-            for noticia_id in noticias_invalidas:
-                try:
-                    if db.eliminar_noticia_por_id(noticia_id):
-                        eliminadas_exitosas += 1
-                        print(f"✅ Eliminada noticia ID {noticia_id}")
-                    else:
-                        print(f"⚠️ No se pudo eliminar noticia ID {noticia_id}")
-                except Exception as e:
-                    print(f"❌ Error eliminando noticia ID {noticia_id}: {e}")
-            
-            print(f"🎯 Limpieza completada: {eliminadas_exitosas}/{len(noticias_invalidas)} noticias inválidas eliminadas")
-            return eliminadas_exitosas
+        if resultado["encontradas"]:
+            print(f"🎯 Limpieza completada: {resultado['eliminadas']}/{resultado['encontradas']} "
+                  f"noticias inválidas eliminadas ({resultado['lotes']} requests de borrado)")
         else:
             print("✅ No se encontraron noticias con resúmenes inválidos")
-            return 0
+        return resultado["eliminadas"]
             
     except Exception as e:
         print(f"❌ Error en limpieza de noticias existentes: {e}")
         return 0
     
-def obtener_noticias_por_categoria(categoria, max_noticias=MAX_NOTICIAS_POR_CATEGORIA, urls_existentes=None):
-    if urls_existentes is None:
-        urls_existentes = set()
+def _mantenimiento_vencido():
+    """Pasaron HORAS_MANTENIMIENTO_PARCIAL desde el último mantenimiento completo (o nunca hubo)."""
+    try:
+        with open(MANTENIMIENTO_RUTA, "r", encoding="utf-8") as f:
+            ultimo = float(json.load(f).get("ultimo") or 0)
+    except FileNotFoundError:
+        return True
+    except Exception as e:
+        print(f"⚠️ Registro de mantenimiento ilegible, se hace ahora: {e}")
+        return True
+    return time.time() - ultimo >= HORAS_MANTENIMIENTO_PARCIAL * 3600
+
+def _registrar_mantenimiento():
+    try:
+        os.makedirs(os.path.dirname(MANTENIMIENTO_RUTA) or ".", exist_ok=True)
+        temporal = f"{MANTENIMIENTO_RUTA}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"ultimo": time.time()}, f)
+        os.replace(temporal, MANTENIMIENTO_RUTA)
+    except Exception as e:
+        print(f"⚠️ No se pudo registrar el mantenimiento: {e}")
+
+# Popularidad del último mantenimiento: los crawls parciales la reusan sin volver a leer los clics
+_popularidad_reciente = None
+
+class IndiceDeduplicacion:
+    """
+    Índice en memoria de URLs y hashes de título ya conocidos.
+    
+    Se carga una vez por crawl desde la base y se actualiza al aceptar cada
+    candidato, así que también detecta duplicados entre categorías de la
+    misma ejecución sin ninguna consulta extra a Supabase.
+    """
     
-    print(f"📡 Buscando {max_noticias} noticias NUEVAS de: '{CATEGORIAS.get(categoria, categoria)}'...")
+    def __init__(self, urls=None, titulo_hashes=None, casi_duplicados=None):
+        self.urls = set(urls or ())
+        self.titulo_hashes = set(titulo_hashes or ())
+        self.casi_duplicados = casi_duplicados
+        self._lock = threading.Lock()
     
-    noticias_nuevas = []
-    urls_encontradas = set()
+    @classmethod
+    def desde_db(cls, dias=None):
+        """Con `dias` solo carga las URLs y títulos de las noticias de los últimos `dias` días."""
+        indice = db.obtener_indice_deduplicacion(dias=dias)
+        
+        detector = None
+        if DETECCION_CASI_DUPLICADOS:
+            detector = DetectorCasiDuplicados(UMBRAL_CASI_DUPLICADO_TITULO, UMBRAL_CASI_DUPLICADO_TEXTO)
+            recientes = db.obtener_titulos_recientes(dias=DIAS_VENTANA_CASI_DUPLICADOS)
+            detector.cargar_titulos((f"id {n['id']}", n["titulo"]) for n in recientes if n.get("titulo"))
+            print(f"🧬 Índice LSH de casi-duplicados: {len(detector.titulos)} títulos recientes")
+        
+        return cls(indice["urls"], indice["titulo_hashes"], detector)
     
-    try:
-        url = (f"https://gnews.io/api/v4/top-headlines?"
-               f"category={categoria}&lang=es&max={max_noticias * 4}&apikey={GNEWS_API_KEY}")  # Aumenté el buffer
+    def __len__(self):
+        return len(self.urls)
+    
+    def reservar(self, titulo, url, descripcion=""):
+        """
+        Registra la noticia si es nueva. Devuelve False si la URL o el título
+        ya existían, o si es un casi-duplicado de una noticia conocida.
+        """
+        titulo_hash = generar_hash_titulo(titulo)
+        with self._lock:
+            if url in self.urls or titulo_hash in self.titulo_hashes:
+                return False
+            self.urls.add(url)
+            self.titulo_hashes.add(titulo_hash)
         
-        sleep(TIEMPO_ESPERA_ENTRE_REQUESTS)
+        if self.casi_duplicados is not None:
+            motivo = self.casi_duplicados.reservar_candidato(url, titulo, descripcion)
+            if motivo:
+                print(f"🧬 Casi-duplicado descartado antes de scrapear: {titulo[:50]}... ({motivo})")
+                # Si el original falla y se libera, esta copia tiene que poder entrar más adelante
+                with self._lock:
+                    self.urls.discard(url)
+                    self.titulo_hashes.discard(titulo_hash)
+                return False
+        return True
+    
+    def liberar(self, url):
+        """
+        El candidato no llegó a guardarse (sin contenido o contenido inválido):
+        sus casi-duplicados vuelven a tener lugar. La URL y el título exactos
+        siguen reservados, porque esa misma noticia fallaría igual.
+        """
+        if self.casi_duplicados is not None:
+            self.casi_duplicados.liberar(url)
+    
+    def es_texto_casi_duplicado(self, url, texto):
+        """Compara el cuerpo scrapeado con los ya procesados en esta ejecución."""
+        if self.casi_duplicados is None:
+            return False
+        motivo = self.casi_duplicados.reservar_texto(url, texto)
+        if motivo:
+            print(f"🧬 Casi-duplicado descartado antes de resumir ({motivo})")
+            return True
+        return False
+
+def _pedir_titulares_gnews(categoria, max_noticias, desde=None, pagina=1):
+    """
+    Un request a GNews (con reintentos ante 429). Devuelve la lista cruda de
+    artículos, o None si el request falló. `desde` (ISO 8601) pide solo lo
+    publicado desde ese momento; `pagina` arranca en 1.
+    """
+    url = (f"https://gnews.io/api/v4/top-headlines?"
+           f"category={categoria}&lang=es&max={max_noticias * 4}&apikey={GNEWS_API_KEY}")  # Aumenté el buffer
+    if desde:
+        url += f"&from={quote(desde)}"
+    if pagina > 1:
+        url += f"&page={pagina}"
+    
+    resp = None
+    for intento in range(MAX_REINTENTOS_GNEWS + 1):
+        with metricas_crawl.medir("gnews_espera_cuota"):
+            limitador_gnews.adquirir()
+        with metricas_crawl.medir("gnews") as medicion:
+            resp = requests.get(url, timeout=15)
+            medicion.exito = resp.status_code == 200
         
-        resp = requests.get(url, timeout=15)
+        if resp.status_code != 429:
+            break
         
-        if resp.status_code == 429:
-            print(f"⏳ Rate limit alcanzado para {categoria}, esperando...")
-            sleep(15)
-            return []
-            
-        if resp.status_code != 200:
-            print(f"❌ Error HTTP {resp.status_code} para {categoria}")
-            return []
-            
-        data = resp.json()
-        articulos = data.get("articles", [])
-       
-        for articulo in articulos:
-            if not all([articulo.get("url"), articulo.get("title"), articulo.get("description")]):
-                continue
-                
-            url_noticia = articulo.get("url")
-            
-            descripcion = articulo.get("description", "").strip()
-            titulo = articulo.get("title", "").strip()
+        if intento == MAX_REINTENTOS_GNEWS:
+            print(f"❌ Rate limit persistente para {categoria} tras {MAX_REINTENTOS_GNEWS} reintentos")
+            return None
+        
+        espera = calcular_backoff(intento, retry_after=resp.headers.get("Retry-After"))
+        print(f"⏳ Rate limit alcanzado para {categoria}, reintentando en {espera:.1f}s...")
+        limitador_gnews.pausar(espera)
+        
+    if resp.status_code != 200:
+        # Las páginas siguientes pueden no estar en el plan de la API: se corta sin más
+        print(f"❌ Error HTTP {resp.status_code} para {categoria}" + (f" (página {pagina})" if pagina > 1 else ""))
+        return None
+        
+    data = resp.json()
+    return data.get("articles", [])
+
+def iterar_noticias_por_categoria(categoria, max_noticias=MAX_NOTICIAS_POR_CATEGORIA, indice_dedup=None, ejecucion=None):
+    """
+    Genera las noticias nuevas de una categoría a medida que pasan los filtros y la deduplicación.
+    Si GNews respondió, anota en `ejecucion` (si hay) la consulta y las noticias llegadas desde la marca.
+    """
+    if indice_dedup is None:
+        indice_dedup = IndiceDeduplicacion()
+    
+    print(f"📡 Buscando {max_noticias} noticias NUEVAS de: '{CATEGORIAS.get(categoria, categoria)}'...")
+    
+    desde = marcas_gnews.desde(categoria) if marcas_gnews is not None else None
+    if desde:
+        print(f"🔖 Solo noticias publicadas desde {desde}")
+    marca = fecha_gnews(desde)
+    encontradas = 0
+    vistos = []  # Artículos examinados (pasaran o no los filtros)
+    ventana_completa = False
+    consultada = False
+    llegadas = 0  # Noticias posteriores a la marca en las páginas pedidas
+    
+    try:
+        # GNews devuelve lo más reciente primero: se pagina mientras falten noticias
+        # y la página venga llena, hasta llegar a la marca de la ejecución anterior
+        for pagina in range(1, MAX_PAGINAS_GNEWS + 1):
+            articulos = _pedir_titulares_gnews(categoria, max_noticias, desde, pagina)
+            if articulos is None:
+                break
+            consultada = True
+            fechas = [fecha_gnews(a.get("publishedAt")) for a in articulos]
+            if marca is not None:
+                llegadas += sum(1 for fecha in fechas if fecha is not None and fecha >= marca)
             
-            # CRITERIOS MÁS FLEXIBLES - REDUCIDOS
-            if (url_noticia not in urls_existentes and 
-                url_noticia not in urls_encontradas and
-                len(titulo) > 10 and  # REDUCIDO de 15 a 10
-                len(descripcion) > MIN_PALABRAS_DESCRIPCION and  # Usando la nueva variable
-                not db.noticia_existe(titulo, url_noticia)):
+            examinados = 0
+            for articulo in articulos:
+                examinados += 1
+                vistos.append(articulo)
+                if not all([articulo.get("url"), articulo.get("title"), articulo.get("description")]):
+                    continue
+                    
+                url_noticia = articulo.get("url")
                 
-                articulo['categoria_asignada'] = CATEGORIAS.get(categoria, "General")
-                noticias_nuevas.append(articulo)
-                urls_encontradas.add(url_noticia)
+                descripcion = articulo.get("description", "").strip()
+                titulo = articulo.get("title", "").strip()
                 
-                if len(noticias_nuevas) >= max_noticias:
-                    break
+                # CRITERIOS MÁS FLEXIBLES - REDUCIDOS
+                if (len(titulo) > 10 and  # REDUCIDO de 15 a 10
+                    len(descripcion) > MIN_PALABRAS_DESCRIPCION and  # Usando la nueva variable
+                    indice_dedup.reservar(titulo, url_noticia, descripcion)):
+                    
+                    articulo['categoria_asignada'] = CATEGORIAS.get(categoria, "General")
+                    articulo['categoria_gnews'] = categoria  # Para retener la marca si se difiere
+                    encontradas += 1
+                    yield articulo
+                    
+                    if encontradas >= max_noticias:
+                        break
+            
+            # Fin de la ventana: página incompleta o (por si la API ignora `from`) una noticia anterior a la marca
+            fin_de_ventana = len(articulos) < max_noticias * 4 or (
+                marca is not None and any(fecha is not None and fecha < marca for fecha in fechas)
+            )
+            # Lo que quedó sin examinar en la página solo puede ignorarse si es anterior a la marca
+            sin_pendientes = all(
+                marca is not None and fecha is not None and fecha < marca for fecha in fechas[examinados:]
+            )
+            if fin_de_ventana and sin_pendientes:
+                ventana_completa = True
+            if encontradas >= max_noticias or fin_de_ventana:
+                break
+        
+        # La marca solo avanza si se examinó todo lo publicado desde la anterior: si el
+        # corte por `max_noticias` dejó noticias sin ver, avanzarla las saltearía para siempre.
+        # Sin marca previa se inicializa con lo examinado.
+        if marcas_gnews is not None and (ventana_completa or marca is None):
+            marcas_gnews.actualizar(categoria, vistos)
+        elif marcas_gnews is not None:
+            print(f"🔖 Quedaron noticias de '{categoria}' sin examinar: la marca se mantiene")
         
     except requests.exceptions.Timeout:
         print(f"⏰ Timeout al obtener noticias de {categoria}")
     except requests.exceptions.RequestException as e:
         print(f"❌ Error de conexión con GNews para '{categoria}': {e}")
-    except Exception as e:
-        print(f"⚠️ Error inesperado en {categoria}: {e}")
+    finally:
+        # Sin la ventana completa las llegadas son solo un mínimo (quedaron páginas sin pedir)
+        if ejecucion is not None and consultada:
+            ejecucion.registrar_consulta_gnews(categoria, llegadas if marca is not None else None,
+                                               censurada=not ventana_completa)
     
-    print(f"✅ Encontradas {len(noticias_nuevas)} noticias válidas para '{CATEGORIAS.get(categoria, categoria)}'")
-    return noticias_nuevas
+    print(f"✅ Encontradas {encontradas} noticias válidas para '{CATEGORIAS.get(categoria, categoria)}'")
 
-def scrapear_texto_robusto(url, fallback_description=None):
-    """Scraping robusto con múltiples métodos de extracción - CRITERIOS MÁS FLEXIBLES"""
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
-    
-    # Trafilatura - CON UMBRAL MÁS BAJO
+def obtener_noticias_por_categoria(categoria, max_noticias=MAX_NOTICIAS_POR_CATEGORIA, indice_dedup=None):
     try:
-        downloaded = trafilatura.fetch_url(url) 
-        if downloaded:
-            content = trafilatura.extract(
-                downloaded, 
-                include_comments=False, 
-                include_tables=False,
-                no_fallback=True
-            )
-            if content and len(content.split()) > 50:  # REDUCIDO de 100 a 50
-                print(f"✅ Trafilatura: {len(content.split())} palabras")
-                return ' '.join(content.split()[:MAX_PALABRAS_SCRAPING])
+        return list(iterar_noticias_por_categoria(categoria, max_noticias, indice_dedup))
     except Exception as e:
-        print(f"⚠️ Trafilatura falló: {e}")
+        print(f"⚠️ Error inesperado en {categoria}: {e}")
+        return []
 
-    # BeautifulSoup - CON UMBRALES MÁS BAJOS
+def _iterar_categoria_segura(indice, total, categoria_api, indice_dedup, ejecucion):
+    """Genera las noticias de una categoría sin propagar errores y registra cuántas aportó."""
+    print(f"\n📍 Procesando categoría {indice+1}/{total}: {categoria_api}")
+    cantidad = 0
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        selectores = [
-            'article .article-content', 'article .story-content', '.news-content',
-            '.entry-content', '.post-content', '[class*="content"]',
-            'article p', '.article-body', '.news-body', '.story-text', '.news-text'
-        ]
-        
-        for selector in selectores:
-            elements = soup.select(selector)
-            if elements:
-                text_content = ' '.join([elem.get_text(strip=True) for elem in elements])
-                if len(text_content.split()) > 50:  # REDUCIDO de 100 a 50
-                    print(f"✅ BeautifulSoup con selector '{selector}': {len(text_content.split())} palabras")
-                    return ' '.join(text_content.split()[:MAX_PALABRAS_SCRAPING])
-        
-        # Párrafos individuales - MÁS FLEXIBLE
-        paragraphs = soup.find_all('p')
-        if paragraphs:
-            text_content = ' '.join([p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 30])  # REDUCIDO de 50 a 30
-            if len(text_content.split()) > 40:  # REDUCIDO de 100 a 40
-                print(f"✅ Fallback párrafos: {len(text_content.split())} palabras")
-                return ' '.join(text_content.split()[:MAX_PALABRAS_SCRAPING])
-                
+        for articulo in iterar_noticias_por_categoria(
+            categoria_api,
+            max_noticias=MAX_NOTICIAS_POR_CATEGORIA,
+            indice_dedup=indice_dedup,
+            ejecucion=ejecucion
+        ):
+            cantidad += 1
+            yield articulo
     except Exception as e:
-        print(f"⚠️ BeautifulSoup falló: {e}")
+        print(f"❌ Error procesando categoría {categoria_api}: {e}")
+    finally:
+        ejecucion.registrar_categoria(categoria_api, cantidad)
 
-    # Regex cleaning - MÁS PERMISIVO
+_FIN_CATEGORIA = object()
+
+def iterar_noticias_de_todas_las_categorias(indice_dedup, ejecucion, categorias=None):
+    """
+    Genera las noticias nuevas de `categorias` (por defecto todas) a medida que llegan.
+    
+    En modo concurrente cada categoría se pide en su propio hilo y sus
+    artículos pasan por una cola acotada: el pipeline empieza a scrapear la
+    primera categoría que responde mientras las demás siguen en vuelo, y si
+    el consumidor se atrasa los hilos de fetch se frenan en lugar de
+    acumular noticias. El ritmo de GNews lo impone `limitador_gnews`.
+    """
+    categorias = list(categorias or CATEGORIAS.keys())
+    
+    if not FETCH_CATEGORIAS_CONCURRENTE:
+        for i, categoria_api in enumerate(categorias):
+            yield from _iterar_categoria_segura(i, len(categorias), categoria_api, indice_dedup, ejecucion)
+        return
+    
+    print(f"⚡ Fetch concurrente de {len(categorias)} categorías ({GNEWS_REQUESTS_POR_SEGUNDO} req/s)")
+    cola = queue.Queue(maxsize=TAMANO_COLA_PIPELINE)
+    cancelado = threading.Event()
+    
+    def producir(i, categoria_api):
+        try:
+            if cancelado.is_set():
+                return
+            for articulo in _iterar_categoria_segura(i, len(categorias), categoria_api, indice_dedup, ejecucion):
+                while not cancelado.is_set():
+                    try:
+                        cola.put(articulo, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if cancelado.is_set():
+                    return
+        finally:
+            cola.put(_FIN_CATEGORIA)
+    
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS_GNEWS)
+    enviadas = terminadas = 0
     try:
-        response = requests.get(url, headers=headers, timeout=8)
-        response.raise_for_status()
+        for i, categoria_api in enumerate(categorias):
+            executor.submit(producir, i, categoria_api)
+            enviadas += 1
         
-        clean = re.compile('<.*?>|&([a-z0-9]+|#[0-9]{1,6}|#x[0-9a-f]{1,6});')
-        text = re.sub(clean, ' ', response.text)
-        
-        text = ' '.join(text.split())
-        
-        if len(text.split()) > 80:  # REDUCIDO de 300 a 80
-            print(f"✅ Regex cleaning (fallback robusto): {len(text.split())} palabras")
-            return ' '.join(text.split()[:500])  # REDUCIDO el límite
+        while terminadas < enviadas:
+            articulo = cola.get()
+            if articulo is _FIN_CATEGORIA:
+                terminadas += 1
+            else:
+                yield articulo
+    finally:
+        # Si el consumidor cortó antes, se liberan los hilos que esperan lugar en la cola
+        cancelado.set()
+        while terminadas < enviadas:
+            if cola.get() is _FIN_CATEGORIA:
+                terminadas += 1
+        executor.shutdown(wait=True)
+
+def _obtener_sesion_http(url):
+    """Devuelve la sesión keep-alive del host de `url`, creándola si hace falta."""
+    host = urlsplit(url).netloc.lower()
+    with _lock_sesiones_http:
+        sesion = _sesiones_http.get(host)
+        if sesion is None:
+            sesion = requests.Session()
+            sesion.headers.update(HEADERS_SCRAPING)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, WORKERS_SCRAPING))
+            sesion.mount("http://", adapter)
+            sesion.mount("https://", adapter)
+            _sesiones_http[host] = sesion
+        return sesion
+
+def cerrar_sesiones_http():
+    """Cierra las conexiones abiertas por el scraper."""
+    with _lock_sesiones_http:
+        for sesion in _sesiones_http.values():
+            sesion.close()
+        _sesiones_http.clear()
+
+def dominio_de(url):
+    """Dominio del medio, sin `www.`, para agrupar métricas."""
+    host = urlsplit(url or "").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def descargar_pagina(url):
+    """
+    Descarga la página una sola vez con la sesión del host, pasando por el
+    caché en disco si está activo. Devuelve una PaginaDescargada o None.
+    """
+    sesion = _obtener_sesion_http(url)
+    dominio = dominio_de(url)
+    
+    def _get(headers):
+        # Solo las descargas reales (no los hits de caché) pasan por el turno del dominio
+        with planificador_dominios.turno(dominio) as turno:
+            response = sesion.get(url, headers=headers, timeout=TIMEOUT_SCRAPING)
+            turno.exito = not es_respuesta_fallida(response.status_code)
+        return response
+    
+    with metricas_crawl.medir("descarga", dominio) as medicion:
+        try:
+            if cache_paginas is not None:
+                return cache_paginas.obtener(url, _get)
+            response = _get({})
+            response.raise_for_status()
+            return PaginaDescargada.desde_response(response)
+        except Exception as e:
+            print(f"⚠️ Descarga falló: {e}")
+            medicion.exito = False
+            return None
+
+def _pool_extraccion():
+    """ProcessPoolExecutor de la extracción (se crea al primer uso); None si está apagado."""
+    global _pool
+    if PROCESOS_EXTRACCION <= 0:
+        return None
+    with _lock_pool:
+        if _pool is None:
+            # spawn: hacer fork de un proceso con hilos (sesiones, pipeline) no es seguro
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESOS_EXTRACCION,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def cerrar_pool_extraccion():
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def _extraer_texto(contenido, codificacion, metodos, selectores):
+    """Corre la cadena de extractores en el pool de procesos, o en este hilo si no hay pool."""
+    argumentos = (contenido, codificacion, metodos, selectores, MAX_PALABRAS_SCRAPING)
+    pool = _pool_extraccion()
+    if pool is not None:
+        try:
+            return pool.submit(extraer_cadena, *argumentos).result()
+        except BrokenProcessPool as e:
+            print(f"⚠️ Pool de extracción caído, se extrae en el hilo: {e}")
+            cerrar_pool_extraccion()
+    return extraer_cadena(*argumentos)
+
+def _informar_intento(intento):
+    metodo, palabras = intento["metodo"], intento["palabras"]
+    if intento["error"]:
+        print(f"⚠️ Extractor {metodo} falló: {intento['error']}")
+    elif intento["exito"]:
+        if metodo == "trafilatura":
+            print(f"✅ Trafilatura: {palabras} palabras")
+        elif metodo == "selectores":
+            print(f"✅ Selector '{intento['selector']}': {palabras} palabras")
+        elif metodo == "parrafos":
+            print(f"✅ Fallback párrafos: {palabras} palabras")
         else:
-            print(f"⚠️ Regex cleaning: contenido insuficiente/ruido ({len(text.split())} palabras)")
-            
-    except Exception as e:
-        print(f"⚠️ Regex cleaning falló: {e}")
+            print(f"✅ Regex cleaning (fallback robusto): {palabras} palabras")
+    elif metodo == "regex":
+        print(f"⚠️ Regex cleaning: contenido insuficiente/ruido")
+
+def scrapear_texto_robusto(url, fallback_description=None):
+    """
+    Scraping robusto con múltiples métodos de extracción - CRITERIOS MÁS FLEXIBLES
+    
+    El orden de los métodos (trafilatura, selectores, párrafos, regex) sale
+    del perfil del dominio: primero el que suele funcionar, y los que nunca
+    funcionan se saltean. Si no queda ninguno, o el circuito del dominio está
+    abierto, ni siquiera se descarga la página.
+    """
+    dominio = dominio_de(url)
+    metodos = perfiles_extractores.orden_metodos(dominio) if perfiles_extractores else list(METODOS_EXTRACCION)
+    
+    response = None
+    if not metodos:
+        print(f"⏭️ Ningún extractor funciona para {dominio}, se usa la descripción")
+    elif not planificador_dominios.permitir(dominio):
+        print(f"⛔ Circuito abierto para {dominio}, se usa la descripción")
+    else:
+        response = descargar_pagina(url)
+    
+    if response is not None:
+        selectores = perfiles_extractores.orden_selectores(dominio, SELECTORES) if perfiles_extractores else SELECTORES
+        try:
+            texto, intentos = _extraer_texto(response.content, response.encoding, metodos, selectores)
+        except Exception as e:
+            print(f"⚠️ Extracción falló: {e}")
+            texto, intentos = None, []
+        
+        # Los intentos se registran acá porque la cadena puede haber corrido en otro proceso
+        for intento in intentos:
+            _informar_intento(intento)
+            metricas_crawl.registrar(f"extractor_{intento['metodo']}", intento["segundos"], dominio, intento["exito"])
+            if perfiles_extractores is not None:
+                perfiles_extractores.registrar(dominio, intento["metodo"], intento["exito"], intento["selector"])
+        if texto:
+            return texto
 
     # FALLBACK MÁS PERMISIVO
     if fallback_description and len(fallback_description.split()) >= 20:  # REDUCIDO de 30 a 20
@@ -237,74 +687,109 @@ def scrapear_texto_robusto(url, fallback_description=None):
     print(f"❌ Todos los métodos fallaron, contenido insuficiente")
     return None
 
-def validar_contenido_noticia(texto, titulo):
+def puntuar_texto_noticia(texto):
+    """Puntaje de calidad del texto con los umbrales del crawler."""
+    return puntuar_contenido(texto, MIN_PALABRAS_CONTENIDO_VALIDO)
+
+def validar_contenido_noticia(texto, titulo, puntaje=None):
     """Valida que el contenido sea realmente una noticia - FILTROS MUY FLEXIBLES"""
+    if puntaje is None:
+        puntaje = puntuar_texto_noticia(texto)
     
-    if not texto or len(texto.split()) < MIN_PALABRAS_CONTENIDO_VALIDO:
-        print(f"⚠️ Contenido muy corto: {len(texto.split()) if texto else 0} palabras")
-        return False
-    
-    # PATRONES MUCHO MÁS ESPECÍFICOS para evitar falsos positivos
-    patrones_no_deseados = [
-        r'<!DOCTYPE', r'<html', r'<head>', r'<body>', 
-        r'function\s*\(', r'classList\.', r'addEventListener',
-        r'@media', r'font-family', r'background-color',
-        r'window\.', r'document\.', r'\.getElementById',
-        r'\.querySelector', r'\.addClass', r'\.removeClass'
-    ]
-    
-    # Solo buscar patrones si aparecen múltiples veces (evitar falsos positivos)
-    for patron in patrones_no_deseados:
-        matches = re.findall(patron, texto, re.IGNORECASE)
-        if len(matches) > 2:  # Solo rechazar si aparece más de 2 veces
-            print(f"⚠️ Contenido rechazado por patrón múltiple: {patron} ({len(matches)} veces)")
-            return False
-    
-    # ELIMINAR patrones que causan falsos positivos con lenguaje natural
-    patrones_problematicos = [
-        r'var\s+', r'const\s+', r'let\s+',  # DEMASIADOS FALSOS POSITIVOS
-        r'padding:', r'margin:', r'display:\s*(flex|block|inline)',
-        r'position:', r'z-index:'
-    ]
-    
-    # PALABRAS CLAVE MÁS FLEXIBLES
-    palabras_clave_noticia = [
-        'anunció', 'confirmó', 'informó', 'declaró', 'según', 'fuentes', 
-        'investigación', 'estudio', 'datos', 'informe', 'autoridades',
-        'gobierno', 'empresa', 'mercado', 'economía', 'política',
-        'afirmó', 'señaló', 'explicó', 'indicó', 'manifestó',
-        'expresó', 'reveló', 'destacó', 'comentó', 'mencionó',
-        'país', 'ciudad', 'presidente', 'ministro', 'director',
-        'año', 'mes', 'día', 'semana', 'horas', 'minutos'
-    ]
-    
-    palabras_encontradas = sum(1 for palabra in palabras_clave_noticia if palabra in texto.lower())
-    
-    # ACEPTAR incluso si tiene solo 1 palabra clave (para noticias muy cortas)
-    tiene_suficientes_palabras_clave = palabras_encontradas >= 1
-    
-    # Verificar que sea texto legible (no código)
-    es_texto_legible = (
-        len(re.findall(r'[.!?]', texto)) > 2 or  # Tiene puntuación
-        len(re.findall(r'\b[a-zA-Záéíóúñ]{4,}\b', texto)) > 20  # Palabras largas
-    )
+    if not puntaje.es_valido and puntaje.motivo.startswith(("Contenido muy corto", "Contenido rechazado")):
+        print(f"⚠️ {puntaje.motivo}")
     
-    return tiene_suficientes_palabras_clave and es_texto_legible
+    return puntaje.es_valido
 
-def resumir_texto_robusto(texto, titulo):
-    """Genera resúmenes robustos con validación de contenido MÁS FLEXIBLE"""
+def _preparar_texto_para_resumen(texto, titulo, puntaje=None):
+    """Valida y recorta el texto. Devuelve (texto, None) o (None, resumen_invalido)."""
+    if puntaje is None:
+        puntaje = puntuar_texto_noticia(texto)
     
-    if not validar_contenido_noticia(texto, titulo):
+    if not validar_contenido_noticia(texto, titulo, puntaje):
         print("❌ Contenido no válido para resumir")
-        return "Resumen no disponible - contenido insuficiente"
+        return None, "Resumen no disponible - contenido insuficiente"
 
-    if len(texto.split()) < MIN_PALABRAS_RESUMEN_SIGNIFICATIVO:  # Ahora 40 palabras mínimo
-        return "Contenido insuficiente para generar un resumen significativo."
+    if puntaje.palabras < MIN_PALABRAS_RESUMEN_SIGNIFICATIVO:  # Ahora 40 palabras mínimo
+        return None, "Contenido insuficiente para generar un resumen significativo."
 
-    if len(texto.split()) > MAX_PALABRAS_SCRAPING:
+    if puntaje.palabras > MAX_PALABRAS_SCRAPING:
         texto = ' '.join(texto.split()[:MAX_PALABRAS_SCRAPING])
         print(f"✂️ Texto recortado para resumen a {MAX_PALABRAS_SCRAPING} palabras.")
 
+    return texto, None
+
+def _verificar_resumen_generado(resumen):
+    """Lanza ValueError si el resumen del modelo no cumple los límites."""
+    # CRITERIOS DE VALIDACIÓN MÁS FLEXIBLES
+    palabras = len(resumen.split())
+    if (palabras < 30 or  # REDUCIDO de 50 a 30
+        palabras > MAX_PALABRAS_RESUMEN or
+        any(invalido in resumen for invalido in RESUMENES_INVALIDOS)):
+        raise ValueError(f"Resumen inválido o fuera de límites ({palabras} palabras)")
+
+def _resumen_de_respaldo(texto):
+    """Primeras oraciones con contenido, para cuando Gemini falla."""
+    # FALLBACK MÁS PERMISIVO
+    if len(texto.split()) > 30:  # REDUCIDO de 100 a 30
+        sentences = re.split(r'[.!?]+', texto)
+        meaningful_sentences = [s.strip() for s in sentences if len(s.split()) > 5][:4]  # REDUCIDO umbral
+        fallback = ". ".join(meaningful_sentences) + "."
+        if len(fallback) > 50:  # REDUCIDO de 80 a 50
+            return fallback
+    
+    return "Resumen no disponible - contenido insuficiente"
+
+def resumir_texto_robusto(texto, titulo, puntaje=None):
+    """Genera resúmenes robustos con validación de contenido MÁS FLEXIBLE"""
+    
+    texto, resumen_invalido = _preparar_texto_para_resumen(texto, titulo, puntaje)
+    if resumen_invalido:
+        return resumen_invalido
+    
+    resumen = _buscar_resumen_en_cache(texto)
+    if resumen:
+        return resumen
+    
+    return _generar_resumen_individual(texto, titulo)
+
+def _buscar_resumen_en_cache(texto):
+    if cache_resumenes is None:
+        return None
+    resumen = cache_resumenes.obtener(texto)
+    if resumen:
+        print(f"♻️ Resumen reutilizado desde caché ({len(resumen.split())} palabras)")
+    return resumen
+
+def _llamar_gemini(etapa, prompt, **kwargs):
+    """
+    Un request a Gemini dentro de la cuota (ver planificador_gemini). Lanza
+    SinCuotaGemini si no queda cuota del día o si Gemini sigue respondiendo 429.
+    """
+    for _ in range(2):
+        if not cuota_gemini.reservar():
+            raise SinCuotaGemini("Sin cuota de Gemini disponible")
+        try:
+            with metricas_crawl.medir(etapa):
+                response = model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            if not es_error_de_cuota(e):
+                raise
+            if es_cuota_diaria(e):
+                cuota_gemini.agotar_dia()
+                raise SinCuotaGemini(f"Cuota diaria de Gemini agotada: {e}") from e
+            print(f"⏳ Gemini respondió 429, pausa de {PAUSA_429_GEMINI:.0f}s")
+            cuota_gemini.pausar(PAUSA_429_GEMINI)
+            continue
+        metricas_crawl.sumar_tokens(getattr(response, "usage_metadata", None))
+        return response
+    raise SinCuotaGemini("Gemini sigue respondiendo 429")
+
+def _generar_resumen_individual(texto, titulo):
+    """
+    Un request a Gemini para un texto ya validado y recortado. Sin cuota lanza
+    SinCuotaGemini en lugar de devolver el resumen de respaldo.
+    """
     # PROMPT ADAPTADO PARA TEXTOS MÁS CORTOS
     prompt = f"""
 # CONTEXTO Y ROL
@@ -342,30 +827,112 @@ Si el texto original es breve, crea un resumen conciso pero informativo que expa
 """
     
     try:
-        response = model.generate_content(prompt)
+        response = _llamar_gemini("gemini", prompt)
         resumen = response.text.strip()
-        
-        # CRITERIOS DE VALIDACIÓN MÁS FLEXIBLES
-        if (len(resumen.split()) < 30 or  # REDUCIDO de 50 a 30
-            len(resumen.split()) > MAX_PALABRAS_RESUMEN or
-            any(invalido in resumen for invalido in RESUMENES_INVALIDOS)):
-            raise ValueError(f"Resumen inválido o fuera de límites ({len(resumen.split())} palabras)")
+        _verificar_resumen_generado(resumen)
             
         print(f"✅ Resumen generado: {len(resumen.split())} palabras")
+        if cache_resumenes is not None:
+            cache_resumenes.guardar(texto, resumen)
         return resumen
         
+    except SinCuotaGemini:
+        raise
     except Exception as e:
         print(f"⚠️ Error al generar resumen con Gemini: {repr(e)}")
-        
-        # FALLBACK MÁS PERMISIVO
-        if len(texto.split()) > 30:  # REDUCIDO de 100 a 30
-            sentences = re.split(r'[.!?]+', texto)
-            meaningful_sentences = [s.strip() for s in sentences if len(s.split()) > 5][:4]  # REDUCIDO umbral
-            fallback = ". ".join(meaningful_sentences) + "."
-            if len(fallback) > 50:  # REDUCIDO de 80 a 50
-                return fallback
-        
-        return "Resumen no disponible - contenido insuficiente"
+        return _resumen_de_respaldo(texto)
+
+def resumir_lote_textos(articulos, puntajes=None):
+    """
+    Resume varios artículos con un solo request a Gemini.
+    
+    Args:
+        articulos: lista de tuplas (titulo, texto).
+        puntajes: puntajes de calidad ya calculados, en el mismo orden.
+    
+    Returns:
+        Lista de resúmenes en el mismo orden. Cada resumen del lote se valida
+        igual que en `resumir_texto_robusto`; los que faltan o no pasan la
+        validación se piden de nuevo de a uno. None donde no hubo cuota de
+        Gemini (el artículo se difiere).
+    """
+    resumenes = [None] * len(articulos)
+    pendientes = {}
+    
+    if puntajes is None:
+        puntajes = puntuar_lote([texto for _, texto in articulos], MIN_PALABRAS_CONTENIDO_VALIDO)
+    
+    for i, ((titulo, texto), puntaje) in enumerate(zip(articulos, puntajes)):
+        texto, resumen_invalido = _preparar_texto_para_resumen(texto, titulo, puntaje)
+        if resumen_invalido:
+            resumenes[i] = resumen_invalido
+            continue
+        resumen = _buscar_resumen_en_cache(texto)
+        if resumen:
+            resumenes[i] = resumen
+        else:
+            pendientes[str(i + 1)] = (i, titulo, texto)
+    
+    if len(pendientes) > 1:
+        noticias_prompt = "\n\n".join(
+            f"## ARTÍCULO id={articulo_id}\nTÍTULO: {titulo}\nTEXTO:\n{texto}"
+            for articulo_id, (_, titulo, texto) in pendientes.items()
+        )
+        prompt = f"""
+# CONTEXTO Y ROL
+Eres un periodista senior especializado en crear resúmenes ejecutivos para medios de comunicación. Vas a recibir {len(pendientes)} noticias independientes y debes resumir cada una por separado.
+
+# INSTRUCCIONES ESTRICTAS PARA CADA RESUMEN
+- EXCLUSIVAMENTE un párrafo continuo, sin saltos de línea, viñetas ni encabezados
+- LONGITUD: 100-330 palabras, adaptada al contenido disponible
+- Lenguaje 100% en español, formal pero accesible y objetivo
+- Aplica la técnica de las 5W+H de forma implícita: QUÉ, QUIÉN y CONTEXTO esencial
+- No mezcles información entre artículos
+
+# FORMATO DE RESPUESTA
+Devuelve SOLO un array JSON con un objeto por artículo:
+[{{"id": "<id del artículo>", "resumen": "<resumen>"}}]
+
+# ARTÍCULOS
+{noticias_prompt}
+"""
+        try:
+            response = _llamar_gemini(
+                "gemini_lote",
+                prompt,
+                generation_config={"response_mime_type": "application/json"}
+            )
+            for entrada in json.loads(response.text):
+                articulo_id = str(entrada.get("id", "")).strip()
+                if articulo_id not in pendientes:
+                    continue
+                resumen = str(entrada.get("resumen", "")).strip()
+                try:
+                    _verificar_resumen_generado(resumen)
+                except ValueError as e:
+                    print(f"⚠️ Resumen del lote descartado (id={articulo_id}): {e}")
+                    continue
+                if es_resumen_valido(resumen):
+                    i, _, texto = pendientes.pop(articulo_id)
+                    resumenes[i] = resumen
+                    if cache_resumenes is not None:
+                        cache_resumenes.guardar(texto, resumen)
+            print(f"✅ Lote de resúmenes: {len(articulos) - len(pendientes)}/{len(articulos)} resueltos en un request")
+        except SinCuotaGemini as e:
+            print(f"⏳ {e}: el lote se difiere")
+            return resumenes
+        except Exception as e:
+            print(f"⚠️ Error en resumen por lote con Gemini: {repr(e)}")
+    
+    # Lo que el lote no resolvió se resume de a uno
+    for i, titulo, texto in pendientes.values():
+        try:
+            resumenes[i] = _generar_resumen_individual(texto, titulo)
+        except SinCuotaGemini as e:
+            print(f"⏳ {e}: se difieren los resúmenes restantes del lote")
+            break
+    
+    return resumenes
 
 def es_resumen_valido(resumen):
     """🔥 VALIDA si el resumen es aceptable - CRITERIOS MÁS FLEXIBLES"""
@@ -381,9 +948,471 @@ def es_resumen_valido(resumen):
     
     return True
 
-def procesar_y_guardar_noticias():
-    """Proceso principal robusto de obtención y procesamiento de noticias - MÁS PERMISIVO"""
+class ContadoresProcesamiento:
+    """Contadores de resultado por artículo, seguros para usar desde varios hilos."""
+    
+    def __init__(self):
+        self.guardadas = 0
+        self.rechazadas = 0
+        self.fallidas = 0
+        self.duplicadas = 0
+        self.diferidas = 0
+        self.barra = None
+        self._lock = threading.Lock()
+    
+    def sumar(self, resultado):
+        """Registra el resultado final de un artículo: 'guardadas', 'rechazadas', 'fallidas', 'duplicadas' o 'diferidas'."""
+        with self._lock:
+            setattr(self, resultado, getattr(self, resultado) + 1)
+            if self.barra is not None:
+                self.barra.update(1)
+
+class BufferInserciones:
+    """
+    Acumula noticias y las escribe con `db.upsert_noticias_lote`.
+    
+    Vacía el buffer al llegar a `tam_lote` noticias o cuando la más antigua
+    lleva `intervalo` segundos esperando. `al_resolver(noticia, resultado)`
+    recibe el resultado de cada fila: "insertada", "duplicada" o "fallida".
+    """
+    
+    def __init__(self, al_resolver, tam_lote=TAMANO_LOTE_INSERCION, intervalo=INTERVALO_FLUSH_INSERCION):
+        self.al_resolver = al_resolver
+        self.tam_lote = max(1, tam_lote)
+        self.intervalo = intervalo
+        self._pendientes = []
+        self._primera_pendiente = None
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._vaciar_periodicamente, name="buffer-inserciones", daemon=True)
+        self._hilo.start()
+    
+    def agregar(self, noticia):
+        with self._lock:
+            if not self._pendientes:
+                self._primera_pendiente = time.monotonic()
+            self._pendientes.append(noticia)
+            lleno = len(self._pendientes) >= self.tam_lote
+        if lleno:
+            self.vaciar()
+    
+    def vaciar(self):
+        """Escribe todo lo pendiente en un único request."""
+        with self._lock_escritura:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, []
+                self._primera_pendiente = None
+            if not lote:
+                return
+            
+            try:
+                with metricas_crawl.medir("db_escritura"):
+                    resultados = db.upsert_noticias_lote(lote)
+            except Exception as e:
+                print(f"❌ Error escribiendo lote de {len(lote)} noticias: {e}")
+                resultados = ["fallida"] * len(lote)
+            
+            for noticia, resultado in zip(lote, resultados):
+                self.al_resolver(noticia, resultado)
+    
+    def _vaciar_periodicamente(self):
+        while not self._cerrado.wait(min(1.0, self.intervalo)):
+            with self._lock:
+                vencido = (self._primera_pendiente is not None and
+                           time.monotonic() - self._primera_pendiente >= self.intervalo)
+            if vencido:
+                self.vaciar()
+    
+    def cerrar(self):
+        self._cerrado.set()
+        self._hilo.join()
+        self.vaciar()
+
+class EjecucionCrawl:
+    """Estado compartido por las etapas durante una ejecución del crawler."""
+    
+    def __init__(self, indice_dedup=None, diario=None, al_progresar=None, presupuesto=None):
+        self.contadores = ContadoresProcesamiento()
+        self.indice_dedup = indice_dedup
+        self.diario = diario
+        self.al_progresar = al_progresar
+        self.presupuesto = presupuesto
+        self.buffer_inserciones = BufferInserciones(self._resolver_insercion)
+        self.noticias_recibidas = 0
+        self.categorias_procesadas = 0
+        # Para la frecuencia adaptativa: categorías que GNews respondió y noticias llegadas desde la marca
+        self.categorias_consultadas = []
+        self.llegadas = {}
+        self.llegadas_censuradas = []
+        self._lock = threading.Lock()
+    
+    def registrar_categoria(self, categoria_api, cantidad):
+        with self._lock:
+            self.noticias_recibidas += cantidad
+            if cantidad:
+                self.categorias_procesadas += 1
+        if cantidad:
+            print(f"✅ Categoría {categoria_api}: {cantidad} noticias nuevas")
+        else:
+            print(f"⚠️ Categoría {categoria_api}: 0 noticias nuevas")
+        self.notificar_progreso()
+    
+    def registrar_consulta_gnews(self, categoria_api, llegadas=None, censurada=False):
+        """`llegadas` None: la categoría no tenía marca y no hay con qué contar."""
+        with self._lock:
+            self.categorias_consultadas.append(categoria_api)
+            if llegadas is not None:
+                self.llegadas[categoria_api] = llegadas
+                if censurada:
+                    self.llegadas_censuradas.append(categoria_api)
+    
+    def registrar_resultado(self, url, resultado):
+        """Cuenta el resultado final de un artículo y lo cierra en el diario."""
+        self.contadores.sumar(resultado)
+        if self.diario is not None:
+            self.diario.marcar(url, "guardado" if resultado == "guardadas" else "descartado")
+        self.notificar_progreso()
+    
+    def alcanza_para(self, etapa):
+        """Sin presupuesto siempre alcanza; con presupuesto se compara contra la estimación de la etapa."""
+        return self.presupuesto is None or self.presupuesto.alcanza(_estimar_segundos(etapa))
+    
+    def diferir(self, trabajo, etapa, motivo="presupuesto"):
+        """
+        Deja el artículo para la próxima ejecución: en el diario sigue pendiente
+        y la marca de GNews de su categoría no pasa de él, así se vuelve a pedir
+        aunque el diario esté desactivado (CRAWLER_DIARIO=false).
+        """
+        art = trabajo["art"]
+        if self.diario is not None:
+            self.diario.marcar_diferido(art.get("url"))
+        if marcas_gnews is not None:
+            marcas_gnews.retener(art.get("categoria_gnews"), art.get("publishedAt"), con_diario=self.diario is not None)
+        if self.presupuesto is not None:
+            self.presupuesto.diferir(etapa, art.get("title"), art.get("url"))
+        self.contadores.sumar("diferidas")
+        destino = "queda en el diario" if self.diario is not None else "se vuelve a pedir a GNews en la próxima ejecución"
+        print(f"⏳ Sin {motivo} para {etapa}, se difiere ({destino}): {(art.get('title') or '')[:60]}...")
+        self.notificar_progreso()
+    
+    def progreso(self):
+        contadores = self.contadores
+        return {
+            "noticias_recibidas": self.noticias_recibidas,
+            "categorias_procesadas": self.categorias_procesadas,
+            "guardadas": contadores.guardadas,
+            "rechazadas": contadores.rechazadas,
+            "fallidas": contadores.fallidas,
+            "duplicadas": contadores.duplicadas,
+            "diferidas": contadores.diferidas,
+            "procesadas": (contadores.guardadas + contadores.rechazadas + contadores.fallidas
+                           + contadores.duplicadas + contadores.diferidas),
+        }
+    
+    def notificar_progreso(self, **extra):
+        """Pasa los contadores a `al_progresar` (si hay); un error ahí no corta el crawl."""
+        if self.al_progresar is None:
+            return
+        try:
+            self.al_progresar({**self.progreso(), **extra})
+        except Exception as e:
+            print(f"⚠️ Error notificando progreso: {e}")
+    
+    def _resolver_insercion(self, noticia, resultado):
+        if resultado == "insertada":
+            self.registrar_resultado(noticia["url"], "guardadas")
+            print(f"✅ Guardada: {noticia['titulo'][:70]}...")
+        elif resultado == "duplicada":
+            self.registrar_resultado(noticia["url"], "duplicadas")
+            print(f"⚠️ Noticia duplicada: {noticia['titulo'][:70]}...")
+        else:
+            self.registrar_resultado(noticia["url"], "fallidas")
+            print(f"❌ Error guardando noticia: {noticia['titulo'][:70]}...")
+    
+    def finalizar(self):
+        self.buffer_inserciones.cerrar()
+
+def _estimar_segundos(etapa):
+    """Cuánto puede tardar un artículo en `etapa`: p90 de la ejecución o la estimación inicial."""
+    if etapa == "scraping":
+        descarga = metricas_crawl.percentil_etapa("descarga", 90)
+        if descarga is None:
+            return ESTIMACION_INICIAL_SCRAPING
+        return descarga + (metricas_crawl.percentil_etapa("extractor_trafilatura", 90) or 0)
+    nombre = "gemini_lote" if RESUMEN_POR_LOTES and MODO_PIPELINE else "gemini"
+    return metricas_crawl.percentil_etapa(nombre, 90) or ESTIMACION_INICIAL_GEMINI
+
+def _etapa_scraping(trabajo, ejecucion):
+    art = trabajo["art"]
+    
+    texto_completo = trabajo.get("texto")
+    if not texto_completo and not ejecucion.alcanza_para("scraping"):
+        ejecucion.diferir(trabajo, "scraping")
+        return None
+    # Sin cuota de Gemini se scrapea igual: el HTML puede estar en la caché de páginas y el
+    # resumen en la de resúmenes, que no gastan cuota. Si no, se difiere en la etapa de resumen
+    # con el texto ya guardado en el diario.
+    
+    print(f"\n🔍 Procesando: {art.get('title')[:60]}...")
+    if texto_completo:
+        print(f"⏯️ Texto recuperado del diario: {len(texto_completo.split())} palabras")
+    else:
+        texto_completo = scrapear_texto_robusto(
+            art.get("url"), 
+            art.get("description")
+        )
+        
+        if not texto_completo:
+            print(f"⚠️ Sin contenido para: {art.get('title')[:60]}...")
+            if ejecucion.indice_dedup is not None:
+                ejecucion.indice_dedup.liberar(art.get("url"))
+            ejecucion.registrar_resultado(art.get("url"), "fallidas")
+            return None
+            
+        print(f"✅ Contenido obtenido: {len(texto_completo.split())} palabras")
+    
+    if ejecucion.indice_dedup is not None and ejecucion.indice_dedup.es_texto_casi_duplicado(art.get("url"), texto_completo):
+        ejecucion.registrar_resultado(art.get("url"), "duplicadas")
+        return None
+    
+    if ejecucion.diario is not None and not trabajo.get("texto"):
+        ejecucion.diario.registrar_texto(art.get("url"), texto_completo)
+    trabajo["texto"] = texto_completo
+    return trabajo
+
+def _etapa_validacion(trabajo, ejecucion):
+    """Descarta el contenido que no parece una noticia antes de que llegue a la cola de Gemini."""
+    with metricas_crawl.medir("validacion", dominio_de(trabajo["art"].get("url"))):
+        puntaje = puntuar_texto_noticia(trabajo["texto"])
+    
+    if not validar_contenido_noticia(trabajo["texto"], trabajo["art"].get("title"), puntaje):
+        print(f"🚫 Contenido no válido - Rechazando noticia: {trabajo['art'].get('title')[:50]}...")
+        if ejecucion.indice_dedup is not None:
+            ejecucion.indice_dedup.liberar(trabajo["art"].get("url"))
+        ejecucion.registrar_resultado(trabajo["art"].get("url"), "rechazadas")
+        return None
+    
+    trabajo["puntaje"] = puntaje
+    return trabajo
+
+def _aceptar_resumen(trabajo, resumen, ejecucion):
+    """Valida el resumen de un trabajo y lo registra en el diario. Devuelve el trabajo o None."""
+    art = trabajo["art"]
+    if not es_resumen_valido(resumen):
+        print(f"🚫 RESUMEN INVÁLIDO - Rechazando noticia: {resumen[:50]}...")
+        ejecucion.registrar_resultado(art.get("url"), "rechazadas")
+        return None
+    
+    if ejecucion.diario is not None:
+        ejecucion.diario.registrar_resumen(art.get("url"), resumen)
+    trabajo["resumen"] = resumen
+    return trabajo
+
+def _etapa_resumen(trabajo, ejecucion):
+    if trabajo.get("resumen"):
+        return trabajo  # Resumen recuperado del diario
+    if not ejecucion.alcanza_para("resumen"):
+        ejecucion.diferir(trabajo, "resumen")
+        return None
+    
+    art = trabajo["art"]
+    try:
+        resumen = resumir_texto_robusto(trabajo["texto"], art.get("title"), trabajo.get("puntaje"))
+    except SinCuotaGemini:
+        ejecucion.diferir(trabajo, "resumen", "cuota de Gemini")
+        return None
+    return _aceptar_resumen(trabajo, resumen, ejecucion)
+
+def _etapa_resumen_lote(trabajos, ejecucion):
+    """
+    Versión por lotes de `_etapa_resumen`: un request a Gemini para varios artículos.
+    
+    Los errores se registran por artículo y nunca se propagan: si el pipeline
+    recibiera la excepción marcaría como fallido todo el lote, incluidos los
+    artículos que ya se contaron como diferidos o rechazados.
+    """
+    a_resumir = [t for t in trabajos if not t.get("resumen")]
+    if a_resumir and not ejecucion.alcanza_para("resumen"):
+        for trabajo in a_resumir:
+            try:
+                ejecucion.diferir(trabajo, "resumen")
+            except Exception as e:
+                _registrar_error_articulo(trabajo, ejecucion, e)
+        return [t if t.get("resumen") else None for t in trabajos]
+    
+    try:
+        resumenes = resumir_lote_textos(
+            [(t["art"].get("title"), t["texto"]) for t in a_resumir],
+            [t.get("puntaje") or puntuar_texto_noticia(t["texto"]) for t in a_resumir]
+        ) if a_resumir else []
+    except Exception as e:
+        # Todavía no se contó ninguno: fallan los que necesitaban resumen y siguen los que ya lo tenían
+        for trabajo in a_resumir:
+            _registrar_error_articulo(trabajo, ejecucion, e)
+        return [t if t.get("resumen") else None for t in trabajos]
     
+    for trabajo, resumen in zip(a_resumir, resumenes):
+        try:
+            if resumen is None:
+                trabajo["rechazado"] = True
+                ejecucion.diferir(trabajo, "resumen", "cuota de Gemini")
+            elif _aceptar_resumen(trabajo, resumen, ejecucion) is None:
+                trabajo["rechazado"] = True
+        except Exception as e:
+            trabajo["rechazado"] = True
+            _registrar_error_articulo(trabajo, ejecucion, e)
+    return [None if t.get("rechazado") else t for t in trabajos]
+
+def _etapa_insercion(trabajo, ejecucion):
+    art = trabajo["art"]
+    
+    if not all([art.get("title"), art.get("url"), art.get("publishedAt")]):
+        print(f"⚠️ Datos incompletos para: {art.get('title')[:60]}...")
+        ejecucion.registrar_resultado(art.get("url"), "fallidas")
+        return None
+
+    try:
+        fecha_obj = datetime.strptime(art.get("publishedAt"), "%Y-%m-%dT%H:%M:%SZ")
+        fecha_formateada = fecha_obj.strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        fecha_formateada = datetime.now().strftime("%Y-%m-%d")
+
+    noticia = {
+        "titulo": art.get("title").strip(),
+        "url": art.get("url"),
+        "categoria": art.get("categoria_asignada", "General"),
+        "imagen": art.get("image", ""),
+        "fuente": art.get("source", {}).get("name", "Desconocida"),
+        "fecha": fecha_formateada,
+        "resumen": trabajo["resumen"],
+        "titulo_hash": generar_hash_titulo(art.get("title"))
+    }
+
+    # El resultado (guardada/duplicada/fallida) se contabiliza al vaciar el lote
+    ejecucion.buffer_inserciones.agregar(noticia)
+    return trabajo
+
+def _registrar_error_articulo(trabajo, ejecucion, e):
+    print(f"❌ Error guardando noticia: {e}")
+    ejecucion.registrar_resultado(trabajo["art"].get("url"), "fallidas")
+
+def procesar_articulo(trabajo, ejecucion):
+    """Procesa un artículo completo (scraping → validación → resumen → inserción) en el hilo actual."""
+    try:
+        for etapa in (_etapa_scraping, _etapa_validacion, _etapa_resumen, _etapa_insercion):
+            trabajo = etapa(trabajo, ejecucion)
+            if trabajo is None:
+                return
+    except Exception as e:
+        _registrar_error_articulo(trabajo, ejecucion, e)
+
+def _trabajos_de_la_ejecucion(pendientes, articulos, diario):
+    """Primero los trabajos retomados del diario, después las noticias nuevas de GNews."""
+    yield from pendientes
+    for art in articulos:
+        if diario is not None:
+            diario.registrar_candidato(art)
+        yield {"art": art}
+
+def priorizar_trabajos(trabajos, popularidad=None):
+    """
+    Ordena los candidatos para que, si el presupuesto o la cuota de Gemini no
+    alcanzan, lo que quede afuera sea lo menos valioso: primero lo retomado
+    del diario que ya tiene resumen (no gasta Gemini), después por valor
+    (frescura, popularidad esperada y CRAWLER_PRIORIDAD_CATEGORIAS)
+    intercalando categorías. Espera a que termine el fetch de GNews (unos
+    segundos con el token bucket) para poder ordenar todo el conjunto.
+    """
+    trabajos = list(trabajos)
+    prioritarias = [CATEGORIAS.get(c, c) for c in PRIORIDAD_CATEGORIAS]
+    con_resumen = [t for t in trabajos if t.get("resumen")]
+    sin_resumen = [t for t in trabajos if not t.get("resumen")]
+    return con_resumen + ordenar_por_valor(sin_resumen, popularidad, prioritarias)
+
+def procesar_articulos_en_pipeline(trabajos, ejecucion):
+    """
+    Procesa los artículos con un pool de hilos por etapa y colas acotadas entre ellas.
+    
+    `trabajos` ({"art", "texto", "resumen"}) puede ser un generador: se
+    consume a medida que el pipeline tiene lugar, así que los artículos se
+    procesan mientras siguen llegando.
+    El tiempo total queda dominado por la etapa más lenta en lugar de por la
+    suma de scraping + Gemini + Supabase de cada artículo. Cada artículo
+    termina en exactamente uno de los contadores.
+    """
+    print(f"⚙️ Pipeline: scraping x{WORKERS_SCRAPING}, resumen x{WORKERS_RESUMEN}, "
+          f"inserción x{WORKERS_INSERCION} (cola {TAMANO_COLA_PIPELINE})")
+    
+    if RESUMEN_POR_LOTES:
+        etapa_resumen = Etapa("resumen", lambda lote: _etapa_resumen_lote(lote, ejecucion), WORKERS_RESUMEN,
+                              tam_lote=TAMANO_LOTE_RESUMEN, espera_lote=ESPERA_LOTE_RESUMEN)
+    else:
+        etapa_resumen = Etapa("resumen", lambda t: _etapa_resumen(t, ejecucion), WORKERS_RESUMEN)
+    
+    pipeline = PipelineConcurrente(
+        [
+            Etapa("scraping", lambda t: _etapa_scraping(t, ejecucion), WORKERS_SCRAPING),
+            Etapa("validacion", lambda t: _etapa_validacion(t, ejecucion)),
+            etapa_resumen,
+            Etapa("insercion", lambda t: _etapa_insercion(t, ejecucion), WORKERS_INSERCION),
+        ],
+        tam_cola=TAMANO_COLA_PIPELINE,
+        al_fallar=lambda trabajo, etapa, e: _registrar_error_articulo(trabajo, ejecucion, e)
+    )
+    pipeline.ejecutar(trabajos)
+
+def _notificar_fase(al_progresar, fase):
+    if al_progresar is not None:
+        try:
+            al_progresar({"fase": fase})
+        except Exception as e:
+            print(f"⚠️ Error notificando progreso: {e}")
+
+def _persistir_estado_crawl():
+    """
+    Guarda el estado que aprende el crawler (perfiles de extractores, marcas
+    de GNews, cuota de Gemini, circuitos por dominio e índice de la caché de
+    páginas). Cada uno por separado: que falle uno no impide guardar el resto.
+    """
+    estados = [
+        ("perfiles de extractores", perfiles_extractores),
+        ("marcas de GNews", marcas_gnews),
+        ("cuota de Gemini", cuota_gemini),
+        ("circuitos por dominio", planificador_dominios),
+        ("caché de páginas", cache_paginas),
+    ]
+    for nombre, estado in estados:
+        if estado is None:
+            continue
+        try:
+            estado.persistir()
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar {nombre}: {e}")
+
+def procesar_y_guardar_noticias(al_progresar=None, presupuesto_segundos=None, categorias=None):
+    """
+    Proceso principal robusto de obtención y procesamiento de noticias - MÁS PERMISIVO
+    
+    `al_progresar(dict)` recibe la fase y los contadores a medida que avanza.
+    Con `presupuesto_segundos` (por defecto CRAWLER_PRESUPUESTO_SEGUNDOS; 0 es
+    sin límite) se procesa primero lo más valioso y se difiere lo que no entra.
+    `categorias` (nombres de la API) limita el crawl a esas categorías; en
+    ese caso el mantenimiento de toda la tabla solo corre si está vencido
+    (ver HORAS_MANTENIMIENTO_PARCIAL).
+    """
+    global _popularidad_reciente
+    categorias = [c for c in categorias if c in CATEGORIAS] if categorias else list(CATEGORIAS.keys())
+    mantenimiento = len(categorias) == len(CATEGORIAS) or _mantenimiento_vencido()
+    if presupuesto_segundos is None:
+        presupuesto_segundos = PRESUPUESTO_CRAWL_SEGUNDOS
+    presupuesto = PresupuestoCrawl(presupuesto_segundos, MARGEN_CIERRE_PRESUPUESTO) if presupuesto_segundos else None
+    
+    _notificar_fase(al_progresar, "preparando")
+    metricas_crawl.reiniciar()
+    planificador_dominios.reiniciar_contadores()
+    if marcas_gnews is not None:
+        marcas_gnews.comenzar_ejecucion()
     db.inicializar_db()
     
     print("🕒 Iniciando proceso de obtención de noticias...")
@@ -391,113 +1420,153 @@ def procesar_y_guardar_noticias():
     print(f"📊 Hora de ejecución: {datetime.now()}")
     print(f"🎯 UMBRALES FLEXIBLES: Mínimo {MIN_PALABRAS_CONTENIDO_VALIDO} palabras para contenido válido")
     
-    noticias_eliminadas = limpiar_noticias_existentes_invalidas()
-    
-    urls_existentes = db.obtener_urls_existentes()
-    print(f"📊 Noticias existentes en la base de datos: {len(urls_existentes)}")
-   
-    todas_las_noticias = []
-    categorias_procesadas = 0
+    diario = None
+    try:
+        if mantenimiento:
+            noticias_eliminadas = limpiar_noticias_existentes_invalidas()
+            indice_dedup = IndiceDeduplicacion.desde_db()
+            print(f"📊 Noticias existentes en la base de datos: {len(indice_dedup)}")
+            _registrar_mantenimiento()
+        else:
+            # GNews solo trae lo publicado desde la marca; lo más viejo lo frena el índice único al insertar
+            noticias_eliminadas = 0
+            indice_dedup = IndiceDeduplicacion.desde_db(dias=DIAS_INDICE_PARCIAL)
+            print(f"📊 Crawl parcial sin mantenimiento: índice de deduplicación con {len(indice_dedup)} "
+                  f"noticias de los últimos {DIAS_INDICE_PARCIAL} días")
 
-    for i, categoria_api in enumerate(CATEGORIAS.keys()):
-        print(f"\n📍 Procesando categoría {i+1}/{len(CATEGORIAS)}: {categoria_api}")
-        
+        diario = DiarioCrawl(DIARIO_CRAWL_RUTA, DIARIO_CRAWL_MAX_HORAS_REANUDAR) if DIARIO_CRAWL_ACTIVO else None
+        pendientes = diario.reanudar_o_iniciar() if diario is not None else []
+        if diario is not None and diario.reanudada:
+            print(f"⏯️ Reanudando ejecución {diario.ejecucion_id}: {len(pendientes)} artículos pendientes en el diario")
+            # Que GNews no vuelva a entregar como nuevas las noticias que ya están en curso
+            for trabajo in pendientes:
+                art = trabajo["art"]
+                indice_dedup.reservar(art.get("title", ""), art.get("url"), art.get("description", ""))
+
+        print(f"\n📝 Procesando y guardando NOTICIAS NUEVAS a medida que llegan de GNews...\n")
+
+        ejecucion = EjecucionCrawl(indice_dedup, diario, al_progresar, presupuesto)
+        contadores = ejecucion.contadores
+        articulos = iterar_noticias_de_todas_las_categorias(indice_dedup, ejecucion, categorias)
         try:
-            noticias_de_categoria = obtener_noticias_por_categoria(
-                categoria_api,
-                max_noticias=MAX_NOTICIAS_POR_CATEGORIA,
-                urls_existentes=urls_existentes
-            )
+            ejecucion.noticias_recibidas += len(pendientes)
+            ejecucion.notificar_progreso(fase="procesando")
+            if len(categorias) < len(CATEGORIAS):
+                print(f"🗂️ Categorías de esta ejecución: {', '.join(categorias)}")
+            trabajos = _trabajos_de_la_ejecucion(pendientes, articulos, diario)
+            # Si el tiempo o la cuota de Gemini pueden no alcanzar para todo, se ordena por valor
+            restantes_gemini = cuota_gemini.restantes_hoy()
+            max_candidatos = len(pendientes) + MAX_NOTICIAS_POR_CATEGORIA * len(categorias)
+            # Con resúmenes por lotes, un request de Gemini cubre hasta TAMANO_LOTE_RESUMEN noticias
+            por_request = TAMANO_LOTE_RESUMEN if RESUMEN_POR_LOTES and MODO_PIPELINE else 1
+            requests_necesarios = -(-max_candidatos // max(1, por_request))
+            cuota_escasa = restantes_gemini < requests_necesarios
+            if presupuesto is not None:
+                print(f"⏱️ Presupuesto: {presupuesto.restante():.0f}s restantes, se procesa primero lo más valioso")
+            if cuota_escasa:
+                print(f"🎟️ Cuota de Gemini: quedan {restantes_gemini} requests hoy y hasta {max_candidatos} noticias "
+                      f"necesitan {requests_necesarios}, "
+                      f"se resume primero lo más valioso y el resto se difiere")
+            if presupuesto is not None or cuota_escasa:
+                if mantenimiento or _popularidad_reciente is None:
+                    _popularidad_reciente = PopularidadEsperada(db.obtener_clics_recientes(DIAS_POPULARIDAD))
+                trabajos = priorizar_trabajos(trabajos, _popularidad_reciente)
             
-            if noticias_de_categoria:
-                todas_las_noticias.extend(noticias_de_categoria)
-                categorias_procesadas += 1
-                print(f"✅ Categoría {categoria_api}: {len(noticias_de_categoria)} noticias nuevas")
-            else:
-                print(f"⚠️ Categoría {categoria_api}: 0 noticias nuevas")
-                
-            if i < len(CATEGORIAS) - 1:
-                sleep(2)
-                
-        except Exception as e:
-            print(f"❌ Error procesando categoría {categoria_api}: {e}")
-            continue
+            # Sin total: la cantidad de noticias se conoce recién cuando termina el fetch
+            with tqdm(desc="Procesando noticias", unit="noticia") as barra:
+                contadores.barra = barra
+                if MODO_PIPELINE:
+                    procesar_articulos_en_pipeline(trabajos, ejecucion)
+                else:
+                    for trabajo in trabajos:
+                        procesar_articulo(trabajo, ejecucion)
+        finally:
+            articulos.close()
+            ejecucion.finalizar()
+        
+        # Solo se compacta si el procesamiento terminó sin diferir nada; si no, la próxima ejecución lo retoma
+        if diario is not None and not contadores.diferidas:
+            diario.finalizar({
+                "guardadas": contadores.guardadas,
+                "rechazadas": contadores.rechazadas,
+                "fallidas": contadores.fallidas,
+                "duplicadas": contadores.duplicadas,
+            })
+    finally:
+        if diario is not None:
+            diario.cerrar()
+        cerrar_sesiones_http()
+        cerrar_pool_extraccion()
+        # Lo aprendido hasta acá se guarda aunque la ejecución haya terminado con un error
+        _persistir_estado_crawl()
+    
+    estadisticas_cuota_gemini = cuota_gemini.estadisticas()
+    print(f"🎟️ Cuota de Gemini: {estadisticas_cuota_gemini['usados_hoy']}/{CUOTA_GEMINI_DIARIA} requests usados hoy")
+    
+    estadisticas_dominios = planificador_dominios.estadisticas()
+    if estadisticas_dominios["circuitos_abiertos"]:
+        print(f"⛔ Circuitos abiertos: {', '.join(estadisticas_dominios['circuitos_abiertos'])} "
+              f"({estadisticas_dominios['articulos_saltados']} artículos sin descargar)")
     
-    if not todas_las_noticias:
+    estadisticas_cache = None
+    if cache_paginas is not None:
+        estadisticas_cache = cache_paginas.estadisticas()
+        print(f"💾 Caché de páginas: {estadisticas_cache['hits']} hits, "
+              f"{estadisticas_cache['misses']} misses, {estadisticas_cache['revalidaciones']} revalidadas (304)")
+    
+    estadisticas_cache_resumenes = None
+    if cache_resumenes is not None:
+        estadisticas_cache_resumenes = cache_resumenes.estadisticas()
+        print(f"♻️ Caché de resúmenes: {estadisticas_cache_resumenes['hits']} hits, "
+              f"{estadisticas_cache_resumenes['misses']} misses (hit rate {estadisticas_cache_resumenes['hit_rate']})")
+    
+    categorias_procesadas = ejecucion.categorias_procesadas
+    # Para la frecuencia adaptativa: qué categorías respondió GNews y cuántas noticias nuevas trajo de cada una
+    frecuencia = {
+        "categorias_crawleadas": ejecucion.categorias_consultadas,
+        "llegadas_por_categoria": ejecucion.llegadas,
+        "llegadas_censuradas": ejecucion.llegadas_censuradas,
+    }
+    
+    if not ejecucion.noticias_recibidas:
         print("❌ No se encontraron noticias NUEVAS válidas para procesar.")
         return {
             "nuevas_guardadas": 0, 
             "existentes_eliminadas": noticias_eliminadas, 
             "mensaje": "No se encontraron noticias nuevas válidas",
             "categorias_procesadas": 0,
+            **frecuencia,
             "timestamp": datetime.now().isoformat()
         }
     
-    print(f"\n📝 Procesando y guardando {len(todas_las_noticias)} NOTICIAS NUEVAS...\n")
-    
-    noticias_guardadas = 0
-    noticias_fallidas = 0
-    noticias_rechazadas = 0  
-    
-    for art in tqdm(todas_las_noticias, desc="Procesando noticias"):
+    noticias_guardadas = contadores.guardadas
+    noticias_rechazadas = contadores.rechazadas
+    noticias_fallidas = contadores.fallidas
+    noticias_duplicadas = contadores.duplicadas
+    noticias_diferidas = contadores.diferidas
+
+    reporte_purga = None
+    _notificar_fase(al_progresar, "purga")
+    # La purga es incremental: con presupuesto se acota a lo que queda y, si no queda nada, sigue la próxima vez
+    segundos_purga = MAX_SEGUNDOS_PURGA
+    if presupuesto is not None:
+        segundos_purga = min(segundos_purga, presupuesto.restante())
+    if not mantenimiento:
+        print("\n⏭️ Crawl parcial: la limpieza de noticias antiguas queda para el próximo mantenimiento")
+    elif segundos_purga > 0:
         try:
-            print(f"\n🔍 Procesando: {art.get('title')[:60]}...")
-            
-            texto_completo = scrapear_texto_robusto(
-                art.get("url"), 
-                art.get("description")
+            print("\n🗑️  Ejecutando limpieza de noticias antiguas...")
+            reporte_purga = db.purgar_noticias_antiguas(
+                max_months=6,
+                tamano_lote=TAMANO_LOTE_PURGA,
+                max_segundos=segundos_purga
             )
-            
-            if not texto_completo:
-                print(f"⚠️ Sin contenido para: {art.get('title')[:60]}...")
-                noticias_fallidas += 1
-                continue
-                
-            print(f"✅ Contenido obtenido: {len(texto_completo.split())} palabras")
-            
-            resumen = resumir_texto_robusto(texto_completo, art.get("title"))
-            
-            if not es_resumen_valido(resumen):
-                print(f"🚫 RESUMEN INVÁLIDO - Rechazando noticia: {resumen[:50]}...")
-                noticias_rechazadas += 1
-                continue
-            
-            if not all([art.get("title"), art.get("url"), art.get("publishedAt")]):
-                print(f"⚠️ Datos incompletos para: {art.get('title')[:60]}...")
-                noticias_fallidas += 1
-                continue
-
-            try:
-                fecha_obj = datetime.strptime(art.get("publishedAt"), "%Y-%m-%dT%H:%M:%SZ")
-                fecha_formateada = fecha_obj.strftime("%Y-%m-%d")
-            except (ValueError, TypeError):
-                fecha_formateada = datetime.now().strftime("%Y-%m-%d")
-
-            noticia = {
-                "titulo": art.get("title").strip(),
-                "url": art.get("url"),
-                "categoria": art.get("categoria_asignada", "General"),
-                "imagen": art.get("image", ""),
-                "fuente": art.get("source", {}).get("name", "Desconocida"),
-                "fecha": fecha_formateada,
-                "resumen": resumen,
-                "titulo_hash": generar_hash_titulo(art.get("title"))
-            }
-
-            db.insert_noticia(noticia)
-            noticias_guardadas += 1
-            print(f"✅ Guardada: {art.get('title')[:70]}...")
-            
+            print(f"🗑️  Purga: {reporte_purga['eliminadas']} eliminadas en {reporte_purga['lotes']} lotes "
+                  f"({reporte_purga['segundos']}s, quedan {reporte_purga['restantes']})")
         except Exception as e:
-            print(f"❌ Error guardando noticia: {e}")
-            noticias_fallidas += 1
-            continue
-
-    try:
-        print("\n🗑️  Ejecutando limpieza de noticias antiguas...")
-        db.delete_old_noticias(max_months=6)
-    except Exception as e:
-        print(f"⚠️ Error en limpieza: {e}")
+            print(f"⚠️ Error en limpieza: {e}")
+    else:
+        print("\n⏳ Sin presupuesto para la limpieza de noticias antiguas, queda para la próxima ejecución")
     
     print(f"\n🎯 PROCESO COMPLETADO")
     print("=" * 50)
@@ -505,47 +1574,89 @@ def procesar_y_guardar_noticias():
     print(f"🧹 Noticias existentes eliminadas: {noticias_eliminadas}")
     print(f"🚫 Noticias rechazadas (resumen inválido): {noticias_rechazadas}")
     print(f"❌ Noticias fallidas: {noticias_fallidas}")
-    print(f"📊 Categorías procesadas: {categorias_procesadas}/{len(CATEGORIAS)}")
+    print(f"🧬 Noticias duplicadas (casi-duplicados o ya existentes): {noticias_duplicadas}")
+    if noticias_diferidas or presupuesto is not None:
+        uso = f" ({presupuesto.transcurrido():.0f}s de {presupuesto.segundos:.0f}s)" if presupuesto is not None else ""
+        print(f"⏳ Noticias diferidas (presupuesto o cuota de Gemini): {noticias_diferidas}{uso}")
+    print(f"📊 Categorías procesadas: {categorias_procesadas}/{len(categorias)}")
     
-    stats = db.get_stats()
-    print(f"📈 Total en base de datos: {stats['total_noticias']} noticias")
-    print(f"👆 Total de clics: {stats['total_clics']}")
-    print(f"📅 Noticias hoy: {stats['noticias_hoy']}")
+    stats = {"total_noticias": None, "total_clics": None, "noticias_hoy": None}
+    if mantenimiento:
+        stats = db.get_stats()
+        print(f"📈 Total en base de datos: {stats['total_noticias']} noticias")
+        print(f"👆 Total de clics: {stats['total_clics']}")
+        print(f"📅 Noticias hoy: {stats['noticias_hoy']}")
     
     return {
         "nuevas_guardadas": noticias_guardadas,
         "existentes_eliminadas": noticias_eliminadas,
         "noticias_rechazadas": noticias_rechazadas,
         "noticias_fallidas": noticias_fallidas,
+        "noticias_duplicadas": noticias_duplicadas,
+        "noticias_diferidas": noticias_diferidas,
         "categorias_procesadas": categorias_procesadas,
+        **frecuencia,
         "total_noticias": stats['total_noticias'],
         "total_clics": stats['total_clics'],
         "noticias_hoy": stats['noticias_hoy'],
+        "cache_paginas": estadisticas_cache,
+        "cache_resumenes": estadisticas_cache_resumenes,
+        "circuitos_dominios": estadisticas_dominios,
+        "purga_antiguas": reporte_purga,
+        "presupuesto": presupuesto.reporte() if presupuesto is not None else None,
+        "cuota_gemini": estadisticas_cuota_gemini,
         "timestamp": datetime.now().isoformat(),
         "proceso_exitoso": True
     }
 
-def ejecutar_crawler():
-    """Función que ejecuta el crawler y retorna resultados para el endpoint."""
+def _registrar_crawl_run(resultado, iniciado):
+    """Agrega las métricas por etapa al resultado y lo persiste en crawl_runs."""
+    metricas = metricas_crawl.reporte()
+    resultado["metricas"] = metricas
+    
+    etapas_mas_lentas = sorted(metricas["etapas"].items(), key=lambda item: item[1]["total_s"], reverse=True)[:5]
+    for etapa, datos in etapas_mas_lentas:
+        print(f"⏱️ {etapa}: {datos['n']} x p50 {datos['p50_ms']}ms / p95 {datos['p95_ms']}ms "
+              f"(total {datos['total_s']}s)")
+    tokens = metricas["tokens_gemini"]
+    print(f"🔢 Tokens Gemini: {tokens['entrada']} entrada + {tokens['salida']} salida en {tokens['requests']} requests")
+    
+    try:
+        db.guardar_crawl_run(iniciado, resultado)
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar el reporte de la ejecución: {e}")
+
+def ejecutar_crawler(al_progresar=None, presupuesto_segundos=None, categorias=None):
+    """
+    Función que ejecuta el crawler y retorna resultados para el endpoint.
+    `al_progresar`, `presupuesto_segundos` y `categorias` se pasan a
+    procesar_y_guardar_noticias (ver trabajos_crawl, presupuesto_crawl y
+    frecuencia_categorias).
+    """
     print("🚀 INICIANDO CRAWLER DESDE ENDPOINT")
     print("=" * 60)
+    iniciado = datetime.now()
     
     try:
-        resultado = procesar_y_guardar_noticias()
+        resultado = procesar_y_guardar_noticias(al_progresar, presupuesto_segundos, categorias)
         print("🎯 CRAWLER COMPLETADO EXITOSAMENTE")
-        return resultado
     except Exception as e:
         print(f"❌ ERROR EN CRAWLER: {e}")
-        return {
+        resultado = {
             "error": str(e), 
             "nuevas_guardadas": 0,
             "existentes_eliminadas": 0,
             "noticias_rechazadas": 0,
             "noticias_fallidas": 0,
+            "noticias_duplicadas": 0,
+            "noticias_diferidas": 0,
             "categorias_procesadas": 0,
             "timestamp": datetime.now().isoformat(),
             "proceso_exitoso": False
         }
+    
+    _registrar_crawl_run(resultado, iniciado)
+    return resultado
 
 if __name__ == "__main__":
     ejecutar_crawler()
\ No newline at end of file
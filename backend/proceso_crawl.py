@@ -0,0 +1,93 @@
+"""
+Ejecución del crawler en un proceso aparte.
+
+El parseo de HTML (trafilatura, lxml, BeautifulSoup) es CPU y retiene el GIL:
+si el crawl corre en un hilo del mismo proceso que Flask, la latencia de la
+API se dispara mientras dura. Acá el crawler corre en un proceso hijo
+(arrancado con spawn, sin heredar hilos ni conexiones del servidor) y el
+progreso y el resultado vuelven por una cola de multiprocessing.
+"""
+import sys
+import queue
+import logging
+import multiprocessing
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_SONDEO = 1.0  # Segundos entre chequeos de que el hijo siga vivo
+
+
+def _correr_en_hijo(cola, presupuesto_segundos=None, categorias=None):
+    """Punto de entrada del proceso hijo."""
+    # Sin esto los prints del crawler quedan en el buffer hasta que termina el proceso
+    sys.stdout.reconfigure(line_buffering=True)
+
+    def al_progresar(progreso):
+        cola.put(("progreso", progreso))
+
+    try:
+        from procesar_y_guardar_db import ejecutar_crawler
+        resultado = ejecutar_crawler(al_progresar=al_progresar, presupuesto_segundos=presupuesto_segundos,
+                                     categorias=categorias)
+    except BaseException as e:
+        resultado = {"error": f"{type(e).__name__}: {e}", "proceso_exitoso": False}
+    cola.put(("resultado", resultado))
+
+
+def _resultado_de_error(mensaje: str) -> Dict[str, Any]:
+    return {
+        "error": mensaje,
+        "nuevas_guardadas": 0,
+        "categorias_procesadas": 0,
+        "timestamp": datetime.now().isoformat(),
+        "proceso_exitoso": False,
+    }
+
+
+def ejecutar_crawler_en_proceso(al_progresar: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                presupuesto_segundos: Optional[float] = None,
+                                categorias: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Igual que `ejecutar_crawler`, pero en un proceso hijo. Bloquea hasta que
+    termina y devuelve su resultado; si el hijo muere sin responder, devuelve
+    un resultado con "error".
+    """
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_correr_en_hijo, args=(cola, presupuesto_segundos, categorias), name="crawler")
+    proceso.start()
+    logger.info(f"🧵 Crawler iniciado en el proceso {proceso.pid}")
+
+    resultado = None
+    try:
+        while resultado is None:
+            try:
+                tipo, datos = cola.get(timeout=INTERVALO_SONDEO)
+            except queue.Empty:
+                if not proceso.is_alive():
+                    # Último intento: el hijo pudo escribir justo antes de salir
+                    try:
+                        tipo, datos = cola.get(timeout=INTERVALO_SONDEO)
+                    except queue.Empty:
+                        break
+                else:
+                    continue
+
+            if tipo == "resultado":
+                resultado = datos
+            elif al_progresar is not None:
+                try:
+                    al_progresar(datos)
+                except Exception as e:
+                    logger.warning(f"⚠️ Error notificando progreso: {e}")
+    finally:
+        if resultado is None and proceso.is_alive():
+            proceso.terminate()
+        proceso.join()
+        cola.close()
+
+    if resultado is None:
+        return _resultado_de_error(f"El proceso del crawler terminó sin resultado (código {proceso.exitcode})")
+    return resultado
@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import requests
 import datetime
@@ -8,6 +8,7 @@ import random
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import pytz
 import threading
 import time
@@ -15,7 +16,13 @@ import atexit
 
 # Importaciones de módulos locales (asumo que existen)
 import db 
-from procesar_y_guardar_db import ejecutar_crawler
+from config_crawler import (
+    CATEGORIAS, CUOTA_GEMINI_DIARIA, DIRECTORIO_CACHE, MAX_NOTICIAS_POR_CATEGORIA, MAX_PAGINAS_GNEWS
+)
+from frecuencia_categorias import FrecuenciaCategorias
+from metricas_crawl import agregar_reportes
+from proceso_crawl import ejecutar_crawler_en_proceso
+from trabajos_crawl import GestorTrabajosCrawl
 from chatbot_service import chatbot_service
 
 
@@ -116,6 +123,86 @@ def mantener_servidor_activo():
         except Exception as e:
             print(f"⚠️ Error en ping anti-sleep: {e}")
 
+# ---------------------------
+#   TRABAJOS DE CRAWL (UNO POR VEZ)
+# ---------------------------
+
+# El crawl corre en un proceso aparte para que el parseo de HTML no compita por el GIL con la API
+CRAWL_EN_PROCESO_APARTE = os.getenv("CRAWLER_PROCESO_AISLADO", "true").lower() == "true"
+
+# Frecuencia adaptativa: cada categoría se crawlea según su tasa de noticias nuevas,
+# repartiendo los crawls que permiten las cuotas diarias de GNews y Gemini
+FRECUENCIA_ADAPTATIVA = os.getenv("CRAWLER_FRECUENCIA_ADAPTATIVA", "true").lower() == "true"
+FRECUENCIA_CATEGORIAS_RUTA = os.getenv(
+    "CRAWLER_FRECUENCIA_RUTA", os.path.join(DIRECTORIO_CACHE, "frecuencia_categorias.json")
+)
+CUOTA_DIARIA_GNEWS = int(os.getenv("GNEWS_CUOTA_DIARIA", "100"))
+MINUTOS_REVISION_CATEGORIAS = int(os.getenv("CRAWLER_REVISION_MINUTOS", "15"))
+MIN_CRAWLS_CATEGORIA_DIA = float(os.getenv("CRAWLER_MIN_CRAWLS_CATEGORIA_DIA", "1"))
+MAX_CRAWLS_CATEGORIA_DIA = float(os.getenv("CRAWLER_MAX_CRAWLS_CATEGORIA_DIA", "24"))
+
+# Un crawl de categoría gasta hasta MAX_PAGINAS_GNEWS requests de GNews y un resumen por noticia
+CRAWLS_CATEGORIA_POR_DIA = min(
+    CUOTA_DIARIA_GNEWS / max(MAX_PAGINAS_GNEWS, 1),
+    CUOTA_GEMINI_DIARIA / max(MAX_NOTICIAS_POR_CATEGORIA, 1)
+)
+
+frecuencia_categorias = FrecuenciaCategorias(
+    FRECUENCIA_CATEGORIAS_RUTA,
+    CATEGORIAS.keys(),
+    crawls_por_dia=CRAWLS_CATEGORIA_POR_DIA,
+    min_por_dia=MIN_CRAWLS_CATEGORIA_DIA,
+    max_por_dia=MAX_CRAWLS_CATEGORIA_DIA
+)
+
+def _registrar_frecuencia(resultado):
+    """
+    Anota el crawl en las tasas por categoría (también los crawls completos de
+    /procesar). Solo cuentan las categorías que GNews respondió: si el crawl
+    falló, las categorías siguen vencidas y se reintentan en la próxima revisión.
+    """
+    try:
+        resultado = resultado if isinstance(resultado, dict) else {}
+        crawleadas = resultado.get("categorias_crawleadas") or []
+        if not crawleadas:
+            return
+        frecuencia_categorias.registrar_crawl(
+            crawleadas,
+            resultado.get("llegadas_por_categoria") or {},
+            censuradas=resultado.get("llegadas_censuradas") or ()
+        )
+        frecuencia_categorias.persistir()
+    except Exception as e:
+        print(f"⚠️ No se pudo actualizar la frecuencia de categorías: {e}")
+
+def _correr_crawl(al_progresar, presupuesto_segundos=None, categorias=None):
+    """
+    Ejecuta el crawler dentro de un trabajo, con el anti-sleep activo mientras
+    dura. `presupuesto_segundos` None usa CRAWLER_PRESUPUESTO_SEGUNDOS;
+    `categorias` None crawlea todas.
+    """
+    activar_anti_sleep()
+    resultado = None
+    try:
+        if CRAWL_EN_PROCESO_APARTE:
+            resultado = ejecutar_crawler_en_proceso(
+                al_progresar=al_progresar, presupuesto_segundos=presupuesto_segundos, categorias=categorias
+            )
+        else:
+            # Import diferido: procesar_y_guardar_db levanta el estado del crawler al importarse
+            from procesar_y_guardar_db import ejecutar_crawler
+            resultado = ejecutar_crawler(
+                al_progresar=al_progresar, presupuesto_segundos=presupuesto_segundos, categorias=categorias
+            )
+        return resultado
+    finally:
+        _registrar_frecuencia(resultado)
+        # El trabajo ya terminó: no hace falta mantener el servidor despierto un tiempo fijo de más
+        desactivar_anti_sleep()
+
+# Executor propio de un hilo: el cron externo y el scheduler comparten el mismo trabajo
+trabajos_crawl = GestorTrabajosCrawl(_correr_crawl)
+
 # ---------------------------
 #   SISTEMA DE FRASE DEL DÍA OPTIMIZADO
 # ---------------------------
@@ -171,7 +258,11 @@ def actualizar_frase_del_dia():
 # ---------------------------
 
 def iniciar_scheduler():
-    """Inicia el scheduler para ejecutar el crawler 4 veces al día y actualizar la frase."""
+    """
+    Inicia el scheduler del crawler y de la frase del día. Con frecuencia
+    adaptativa revisa cada pocos minutos qué categorías tocan; si no, corre
+    el crawler completo 4 veces al día.
+    """
     
 
     global scheduler 
@@ -189,6 +280,16 @@ def iniciar_scheduler():
         (17, 55, 18, 0, 'tarde')
     ]
     
+    if FRECUENCIA_ADAPTATIVA:
+        horarios_crawler = []
+        scheduler.add_job(
+            revisar_categorias_vencidas,
+            trigger=IntervalTrigger(minutes=MINUTOS_REVISION_CATEGORIAS, timezone=tz_argentina),
+            id='crawler_adaptativo',
+            max_instances=1,
+            coalesce=True
+        )
+    
     for hora_activar, minuto_activar, hora_crawler, minuto_crawler, nombre in horarios_crawler:
 
         scheduler.add_job(
@@ -213,7 +314,11 @@ def iniciar_scheduler():
     
     scheduler.start()
     APP_STATE["scheduler"] = scheduler
-    print("✅ Scheduler iniciado - 4 ejecuciones diarias + Frase diaria.")
+    if FRECUENCIA_ADAPTATIVA:
+        print(f"✅ Scheduler iniciado - Crawl adaptativo por categoría (revisión cada {MINUTOS_REVISION_CATEGORIAS} min, "
+              f"{CRAWLS_CATEGORIA_POR_DIA:.0f} crawls de categoría por día) + Frase diaria.")
+    else:
+        print("✅ Scheduler iniciado - 4 ejecuciones diarias + Frase diaria.")
     return scheduler
 
 def ejecutar_crawler_desde_scheduler():
@@ -224,24 +329,37 @@ def ejecutar_crawler_desde_scheduler():
         print(f"📅 Fecha/Hora: {datetime.datetime.now()}")
         print("="*60)
         
-        resultado = ejecutar_crawler()
+        # Si el cron externo ya disparó un crawl, se espera a ese en lugar de lanzar otro
+        trabajo, nuevo = trabajos_crawl.encolar("scheduler")
+        if not nuevo:
+            print(f"⏳ Ya hay un crawl en curso ({trabajo['id']}), se espera a que termine")
+        trabajo = trabajos_crawl.esperar(trabajo["id"])
+        resultado = trabajo["resultado"] or {"error": trabajo["error"]}
         
         print("="*60)
         print("✅ CRAWLER AUTOMÁTICO COMPLETADO")
         print(f"📊 Resultado: {resultado}")
         print("="*60 + "\n")
         
-
-        threading.Timer(600, desactivar_anti_sleep).start()
-        print("⏰ Anti-sleep se desactivará automáticamente en 10 minutos")
-        
         return resultado
         
     except Exception as e:
         print(f"❌ ERROR en crawler automático: {e}")
-        threading.Timer(600, desactivar_anti_sleep).start()
         return {"error": str(e)}
 
+def revisar_categorias_vencidas():
+    """Encola un crawl liviano con las categorías a las que ya les toca, si no hay otro en curso."""
+    try:
+        if trabajos_crawl.activo() is not None:
+            return
+        vencidas = frecuencia_categorias.vencidas()
+        if not vencidas:
+            return
+        print(f"🕒 Crawl adaptativo: {', '.join(vencidas)}")
+        trabajos_crawl.encolar("scheduler_adaptativo", categorias=vencidas)
+    except Exception as e:
+        print(f"❌ ERROR revisando categorías vencidas: {e}")
+
 # ---------------------------
 #   FUNCIONES AUXILIARES MEJORADAS
 # ---------------------------
@@ -469,7 +587,14 @@ def get_posts_by_source():
 
 @app.route('/procesar', methods=['GET'])
 def procesar_noticias_externo():
-    """Endpoint para ejecutar el crawler de noticias desde externo."""
+    """
+    Encola el crawler de noticias y devuelve el id del trabajo (202).
+    Con ?esperar=1 bloquea hasta que termine y responde como antes; eso
+    necesita el worker con hilos del Procfile (gthread), porque un worker
+    sync se mata al pasar su timeout. Tiene que ser un solo worker: el
+    scheduler y los trabajos de crawl viven en el proceso.
+    Con ?presupuesto=N el crawl dura como mucho N segundos (lo que no entra se difiere).
+    """
     
     secret_key = request.headers.get('X-Secret-Key')
     expected_key = os.getenv('CRON_SECRET')
@@ -478,26 +603,133 @@ def procesar_noticias_externo():
         return jsonify({"error": "Acceso denegado"}), 403
 
     try:
-        print("🔄 Iniciando proceso de crawler desde endpoint externo...")
-        
-        activar_anti_sleep()
-        resultado = ejecutar_crawler()
-        threading.Timer(600, desactivar_anti_sleep).start()
-        
-        if "error" in resultado:
-            return jsonify({"error": f"Error en el crawler: {resultado['error']}"}), 500
+        print("🔄 Encolando crawler desde endpoint externo...")
+        opciones = {}
+        presupuesto = request.args.get('presupuesto', type=float)
+        if presupuesto is not None:
+            opciones["presupuesto_segundos"] = max(presupuesto, 0)
+        trabajo, nuevo = trabajos_crawl.encolar("endpoint", **opciones)
+        
+        if request.args.get('esperar') in ('1', 'true'):
+            trabajo = trabajos_crawl.esperar(trabajo["id"])
+            if trabajo["estado"] == "error":
+                return jsonify({"error": f"Error en el crawler: {trabajo['error']}"}), 500
+            return jsonify({
+                "mensaje": "Crawler ejecutado con éxito", 
+                "data": trabajo["resultado"],
+                "job_id": trabajo["id"],
+                "timestamp": datetime.datetime.now().isoformat()
+            }), 200
         
         return jsonify({
-            "mensaje": "Crawler ejecutado con éxito", 
-            "data": resultado,
+            "mensaje": "Crawler encolado" if nuevo else "Ya hay un crawl en curso; se devuelve ese trabajo",
+            "job_id": trabajo["id"],
+            "estado": trabajo["estado"],
+            "status_url": f"/procesar/{trabajo['id']}",
             "timestamp": datetime.datetime.now().isoformat()
-        }), 200
+        }), 202
         
     except Exception as e:
-        print(f"❌ Error ejecutando crawler: {str(e)}")
-        threading.Timer(600, desactivar_anti_sleep).start()
+        print(f"❌ Error encolando crawler: {str(e)}")
         return jsonify({"error": f"Error al ejecutar el crawler: {str(e)}"}), 500
 
+# Cada conexión SSE dura menos que el timeout del worker de gunicorn; después el cliente reconecta
+SSE_MAX_SEGUNDOS = float(os.getenv("SSE_MAX_SEGUNDOS", "25"))
+SSE_REINTENTO_MS = 1000
+
+@app.route('/procesar/<job_id>', methods=['GET'])
+def estado_procesar(job_id):
+    """
+    Estado de un trabajo de crawl. Con `Accept: text/event-stream` (o
+    ?stream=1) envía los contadores por Server-Sent Events durante hasta
+    SSE_MAX_SEGUNDOS y cierra. EventSource se reconecta solo (campo `retry`)
+    y recibe el estado actual, así ninguna request queda abierta todo el crawl.
+    """
+    
+    secret_key = request.headers.get('X-Secret-Key')
+    expected_key = os.getenv('CRON_SECRET')
+    
+    if expected_key and secret_key != expected_key:
+        return jsonify({"error": "Acceso denegado"}), 403
+    
+    trabajo = trabajos_crawl.obtener(job_id)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    
+    quiere_stream = request.args.get('stream') in ('1', 'true') or \
+        'text/event-stream' in request.headers.get('Accept', '')
+    if not quiere_stream:
+        return jsonify(trabajo)
+    
+    def eventos():
+        limite = time.monotonic() + SSE_MAX_SEGUNDOS
+        actual = trabajo
+        yield f"retry: {SSE_REINTENTO_MS}\n\n"
+        while True:
+            evento = "fin" if actual["finalizado"] else "progreso"
+            yield f"id: {actual['version']}\nevent: {evento}\ndata: {json.dumps(actual, default=str)}\n\n"
+            if actual["finalizado"]:
+                return
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return  # El cliente se reconecta y sigue recibiendo desde el estado actual
+            # Sin cambios en un rato se reenvía el estado para mantener viva la conexión
+            actual = trabajos_crawl.esperar_cambio(job_id, actual["version"], timeout=min(15, restante))
+            if actual is None:
+                return
+    
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/crawl-runs', methods=['GET'])
+def get_crawl_runs():
+    """Últimas ejecuciones del crawler con sus métricas por etapa y por dominio."""
+    
+    secret_key = request.headers.get('X-Secret-Key')
+    expected_key = os.getenv('CRON_SECRET')
+    
+    if expected_key and secret_key != expected_key:
+        return jsonify({"error": "Acceso denegado"}), 403
+    
+    try:
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        runs = db.get_crawl_runs(limit)
+        return jsonify({
+            "runs": runs,
+            # Qué etapas y qué medios dominan el tiempo de crawl en esas ejecuciones
+            "resumen": agregar_reportes(run.get("metricas") for run in runs)
+        })
+    except Exception as e:
+        print(f"❌ Error obteniendo crawl runs: {e}")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
+@app.route('/api/crawl-plan', methods=['GET'])
+def get_crawl_plan():
+    """Plan de crawl por categoría: tasa de noticias nuevas, crawls por día y próximo crawl."""
+    
+    secret_key = request.headers.get('X-Secret-Key')
+    expected_key = os.getenv('CRON_SECRET')
+    
+    if expected_key and secret_key != expected_key:
+        return jsonify({"error": "Acceso denegado"}), 403
+    
+    try:
+        plan = frecuencia_categorias.plan()
+        for datos in plan.values():
+            for campo in ("ultimo", "proximo"):
+                if datos[campo] is not None:
+                    datos[campo] = datetime.datetime.fromtimestamp(datos[campo]).isoformat()
+        return jsonify({
+            "modo": "adaptativo" if FRECUENCIA_ADAPTATIVA else "fijo (4 veces al día)",
+            "crawls_categoria_por_dia": round(CRAWLS_CATEGORIA_POR_DIA, 1),
+            "cuotas_diarias": {"gnews": CUOTA_DIARIA_GNEWS, "gemini": CUOTA_GEMINI_DIARIA},
+            "revision_minutos": MINUTOS_REVISION_CATEGORIAS,
+            "categorias": plan
+        })
+    except Exception as e:
+        print(f"❌ Error obteniendo el plan de crawl: {e}")
+        return jsonify({"error": "Error interno del servidor"}), 500
+
 # ---------------------------
 #   RUTA FRASE DEL DÍA OPTIMIZADA
 # ---------------------------
@@ -666,6 +898,7 @@ def health_check():
 
         scheduler_status = "running" if scheduler and scheduler.running else "stopped"
         anti_sleep_status = "active" if APP_STATE["anti_sleep_activo"] else "inactive"
+        crawl_activo = trabajos_crawl.activo()
         frase_status = "cached" if APP_STATE["frase_cache"]["frase"] else "empty"
         
         return jsonify({
@@ -675,6 +908,7 @@ def health_check():
             "chatbot": chat_status,
             "scheduler": scheduler_status,
             "anti_sleep": anti_sleep_status,
+            "crawl_en_curso": crawl_activo["id"] if crawl_activo else None,
             "frase_cache": frase_status,
             "ultimo_ping": APP_STATE["ultimo_ping"].isoformat() if APP_STATE["ultimo_ping"] else None,
             "environment": os.getenv("ENVIRONMENT", "development"),
@@ -704,7 +938,7 @@ def home():
             "chatbot": "AntiBot Assistant con Gemini",
             "apod": "Astronomy Picture of the Day",
             "frase_del_dia": "Frase inspiradora diaria (optimizada)",
-            "crawler_auto": "Ejecución automática 4x/día con redundancia",
+            "crawler_auto": "Frecuencia adaptativa por categoría" if FRECUENCIA_ADAPTATIVA else "Ejecución automática 4x/día con redundancia",
             "anti_sleep": "Sistema anti-dormancia inteligente"
         },
         "endpoints": {
@@ -717,7 +951,10 @@ def home():
             "frase_del_dia": "/api/frase-del-dia",
             "stats": "/api/stats",
             "health": "/api/health",
-            "procesar": "/procesar (GET) - Ejecuta el crawler de noticias"
+            "procesar": "/procesar (GET) - Encola el crawler de noticias y devuelve un job_id",
+            "procesar_estado": "/procesar/<job_id> (GET) - Estado del crawl (SSE con ?stream=1)",
+            "crawl_runs": "/api/crawl-runs (GET) - Últimas ejecuciones del crawler con métricas",
+            "crawl_plan": "/api/crawl-plan (GET) - Frecuencia de crawl por categoría"
         },
         "system_optimizations": {
             "crawler_schedule": "4 ejecuciones diarias con redundancia",
@@ -757,11 +994,14 @@ def ejecutar_aplicacion():
     print("🔋 Sistema Anti-Sleep: INTELIGENTE con cancelación de threads")
     
     print("\n🕒 SISTEMA REDUNDANTE PROGRAMADO:")
-    print("   CRAWLER (4 ejecuciones diarias):")
-    print("   - 11:55 AM (Anti-Sleep) / 12:00 PM (Crawler)")
-    print("   - 23:55 PM (Anti-Sleep) / 12:00 AM (Crawler)")
-    print("   - 5:55 AM  (Anti-Sleep) / 6:00 AM  (Crawler)")
-    print("   - 17:55 PM (Anti-Sleep) / 18:00 PM (Crawler)")
+    if FRECUENCIA_ADAPTATIVA:
+        print(f"   CRAWLER adaptativo: revisión cada {MINUTOS_REVISION_CATEGORIAS} min (plan en /api/crawl-plan)")
+    else:
+        print("   CRAWLER (4 ejecuciones diarias):")
+        print("   - 11:55 AM (Anti-Sleep) / 12:00 PM (Crawler)")
+        print("   - 23:55 PM (Anti-Sleep) / 12:00 AM (Crawler)")
+        print("   - 5:55 AM  (Anti-Sleep) / 6:00 AM  (Crawler)")
+        print("   - 17:55 PM (Anti-Sleep) / 18:00 PM (Crawler)")
     print("   FRASE DEL DÍA: 00:05 AM")
     
     port = int(os.environ.get("PORT", 5000))
@@ -0,0 +1,166 @@
+"""
+Trabajos de crawl asíncronos con protección single-flight.
+
+`/procesar` y el scheduler ya no corren el crawler dentro del hilo que los
+dispara: encolan un trabajo en un executor propio de un solo hilo y reciben
+un id para consultar su estado. Si ya hay un crawl en cola o en curso, el
+pedido se une a ese trabajo en lugar de lanzar otro, así el cron externo y
+el scheduler nunca corren dos crawls a la vez.
+"""
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_FINALES = ("completado", "error")
+
+
+class TrabajoCrawl:
+    """Estado de un trabajo; `version` crece con cada cambio para el streaming."""
+
+    def __init__(self, origen: str, opciones: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.origen = origen
+        self.opciones = opciones or {}
+        self.estado = "en_cola"
+        self.creado = time.time()
+        self.iniciado: Optional[float] = None
+        self.finalizado: Optional[float] = None
+        self.progreso: Dict[str, Any] = {}
+        self.resultado: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.version = 0
+
+    def a_dict(self) -> Dict[str, Any]:
+        fin = self.finalizado or time.time()
+        return {
+            "id": self.id,
+            "origen": self.origen,
+            "opciones": dict(self.opciones),
+            "estado": self.estado,
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "finalizado": self.finalizado,
+            "segundos": round(fin - self.iniciado, 1) if self.iniciado else None,
+            "progreso": dict(self.progreso),
+            "resultado": self.resultado,
+            "error": self.error,
+            "version": self.version,
+        }
+
+
+class GestorTrabajosCrawl:
+    """
+    Ejecuta `ejecutar(al_progresar, **opciones)` como trabajo de fondo, uno por vez.
+
+    `ejecutar` recibe una función a la que puede pasarle diccionarios con
+    contadores de progreso, más las opciones del pedido que creó el trabajo,
+    y devuelve el resultado del crawl (un dict; si trae la clave "error" el
+    trabajo termina en estado error).
+    """
+
+    def __init__(self, ejecutar: Callable[..., Dict[str, Any]],
+                 max_historial: int = 20):
+        self._ejecutar = ejecutar
+        self.max_historial = max_historial
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl")
+        self._cambios = threading.Condition()
+        self._trabajos: "OrderedDict[str, TrabajoCrawl]" = OrderedDict()
+        self._activo: Optional[TrabajoCrawl] = None
+
+    def encolar(self, origen: str, **opciones) -> Tuple[Dict[str, Any], bool]:
+        """
+        Devuelve (trabajo, nuevo). Si ya hay uno activo se devuelve ese con
+        nuevo=False y las `opciones` de este pedido se ignoran.
+        """
+        with self._cambios:
+            if self._activo is not None:
+                logger.info(f"⏳ Crawl {self._activo.id} ya en curso, '{origen}' se une a ese trabajo")
+                return self._activo.a_dict(), False
+
+            trabajo = TrabajoCrawl(origen, opciones)
+            self._activo = trabajo
+            self._trabajos[trabajo.id] = trabajo
+            while len(self._trabajos) > self.max_historial:
+                self._trabajos.popitem(last=False)
+
+        self._executor.submit(self._correr, trabajo)
+        logger.info(f"📥 Crawl {trabajo.id} encolado desde '{origen}'")
+        return trabajo.a_dict(), True
+
+    def _actualizar(self, trabajo: TrabajoCrawl, **cambios):
+        with self._cambios:
+            progreso = cambios.pop("progreso", None)
+            if progreso:
+                trabajo.progreso.update(progreso)
+            for campo, valor in cambios.items():
+                setattr(trabajo, campo, valor)
+            trabajo.version += 1
+            self._cambios.notify_all()
+
+    def _correr(self, trabajo: TrabajoCrawl):
+        self._actualizar(trabajo, estado="en_curso", iniciado=time.time())
+        try:
+            resultado = self._ejecutar(lambda progreso: self._actualizar(trabajo, progreso=progreso),
+                                       **trabajo.opciones)
+            if isinstance(resultado, dict) and "error" in resultado:
+                self._actualizar(trabajo, estado="error", error=str(resultado["error"]), resultado=resultado)
+            else:
+                self._actualizar(trabajo, estado="completado", resultado=resultado)
+        except Exception as e:
+            logger.error(f"❌ Crawl {trabajo.id} falló: {e}")
+            self._actualizar(trabajo, estado="error", error=str(e))
+        finally:
+            with self._cambios:
+                trabajo.finalizado = time.time()
+                trabajo.version += 1
+                if self._activo is trabajo:
+                    self._activo = None
+                self._cambios.notify_all()
+
+    def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        with self._cambios:
+            trabajo = self._trabajos.get(trabajo_id)
+            return trabajo.a_dict() if trabajo else None
+
+    def activo(self) -> Optional[Dict[str, Any]]:
+        with self._cambios:
+            return self._activo.a_dict() if self._activo else None
+
+    def esperar_cambio(self, trabajo_id: str, version: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Bloquea hasta que el trabajo pase de `version` (o venza `timeout`)
+        y devuelve su estado. None si el id no existe.
+        """
+        limite = time.monotonic() + timeout
+        with self._cambios:
+            while True:
+                trabajo = self._trabajos.get(trabajo_id)
+                if trabajo is None:
+                    return None
+                restante = limite - time.monotonic()
+                if trabajo.version > version or trabajo.finalizado or restante <= 0:
+                    return trabajo.a_dict()
+                self._cambios.wait(restante)
+
+    def esperar(self, trabajo_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Bloquea hasta que el trabajo termine; devuelve su estado final."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cambios:
+            while True:
+                trabajo = self._trabajos.get(trabajo_id)
+                if trabajo is None or trabajo.finalizado:
+                    return trabajo.a_dict() if trabajo else None
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return trabajo.a_dict()
+                self._cambios.wait(restante)
+
+    def listar(self) -> list:
+        with self._cambios:
+            return [trabajo.a_dict() for trabajo in reversed(self._trabajos.values())]